@@ -0,0 +1,100 @@
+"""Add content excerpt and word count
+
+Revision ID: 002_add_content_excerpt
+Revises: 001_complete_initial_setup
+Create Date: 2026-10-17 09:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002_add_content_excerpt'
+down_revision = '001_complete_initial_setup'
+branch_labels = None
+depends_on = None
+
+BACKFILL_BATCH_SIZE = 500
+
+# Frozen copy of utils.text_utils at the time of this revision, so later
+# changes to the application code do not alter what this migration writes.
+EXCERPT_LENGTH = 200
+
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`([^`]*)`")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_LINE_PREFIX_RE = re.compile(r"^\s{0,3}(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+\.\s+)", re.MULTILINE)
+_EMPHASIS_RES = (
+    re.compile(r"(\*\*|~~)(?=\S)(?P<text>.+?)(?<=\S)\1"),
+    re.compile(r"(?<!\w)__(?=\S)(?P<text>.+?)(?<=\S)__(?!\w)"),
+    re.compile(r"\*(?=\S)(?P<text>.+?)(?<=\S)\*"),
+    re.compile(r"(?<!\w)_(?=\S)(?P<text>.+?)(?<=\S)_(?!\w)"),
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+_LATIN_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:['’\-][A-Za-z0-9]+)*")
+_CJK_CHAR_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]")
+
+
+def _strip_markdown(markdown: str) -> str:
+    text = _CODE_BLOCK_RE.sub(" ", markdown or "")
+    text = _INLINE_CODE_RE.sub(r"\1", text)
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _LINE_PREFIX_RE.sub("", text)
+    for pattern in _EMPHASIS_RES:
+        text = pattern.sub(r"\g<text>", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def _make_excerpt(markdown: str) -> str:
+    text = _strip_markdown(markdown)
+    if len(text) <= EXCERPT_LENGTH:
+        return text
+    return text[:EXCERPT_LENGTH - 1].rstrip() + "…"
+
+
+def _count_words(markdown: str) -> int:
+    text = _strip_markdown(markdown)
+    return len(_LATIN_WORD_RE.findall(text)) + len(_CJK_CHAR_RE.findall(text))
+
+
+def upgrade() -> None:
+    op.add_column('contents', sa.Column('excerpt', sa.String(length=255), nullable=True))
+    op.add_column('contents', sa.Column('word_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill excerpt and word count for existing contents in batches
+    contents = sa.table(
+        'contents',
+        sa.column('id', sa.Integer),
+        sa.column('content', sa.Text),
+        sa.column('excerpt', sa.String),
+        sa.column('word_count', sa.Integer),
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(contents.c.id, contents.c.content)
+            .where(contents.c.id > last_id)
+            .order_by(contents.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        for row in rows:
+            connection.execute(
+                contents.update()
+                .where(contents.c.id == row.id)
+                .values(excerpt=_make_excerpt(row.content), word_count=_count_words(row.content))
+            )
+        last_id = rows[-1].id
+
+
+def downgrade() -> None:
+    op.drop_column('contents', 'word_count')
+    op.drop_column('contents', 'excerpt')
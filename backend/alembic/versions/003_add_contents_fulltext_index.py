@@ -0,0 +1,30 @@
+"""Add FULLTEXT index on contents title and content
+
+Revision ID: 003_add_contents_fulltext_index
+Revises: 002_add_content_excerpt
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003_add_contents_fulltext_index'
+down_revision = '002_add_content_excerpt'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # ngram parser is required to tokenize Japanese text (MySQL only)
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.execute(
+        "ALTER TABLE contents "
+        "ADD FULLTEXT INDEX ft_contents_title_content (title, content) WITH PARSER ngram"
+    )
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'mysql':
+        return
+    op.drop_index('ft_contents_title_content', table_name='contents')
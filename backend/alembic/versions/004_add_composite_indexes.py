@@ -0,0 +1,46 @@
+"""Add composite indexes for soft-delete listing queries
+
+Revision ID: 004_add_composite_indexes
+Revises: 003_add_contents_fulltext_index
+Create Date: 2026-10-17 11:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004_add_composite_indexes'
+down_revision = '003_add_contents_fulltext_index'
+branch_labels = None
+depends_on = None
+
+# (index name, table, columns)
+INDEXES = [
+    # Public listings: deleted_at IS NULL AND is_published ORDER BY created_at
+    ('ix_contents_deleted_published_created', 'contents', ['deleted_at', 'is_published', 'created_at']),
+    # Member admin listings: author_id = ? AND deleted_at IS NULL ORDER BY created_at
+    ('ix_contents_author_deleted_created', 'contents', ['author_id', 'deleted_at', 'created_at']),
+    # Admin listings: deleted_at IS NULL ORDER BY created_at
+    ('ix_contents_deleted_created', 'contents', ['deleted_at', 'created_at']),
+    # Category listings: join from category_id to content_id
+    ('ix_content_categories_category_content', 'content_categories', ['category_id', 'content_id']),
+    # Category list: deleted_at IS NULL ORDER BY sort_order
+    ('ix_categories_deleted_sort', 'categories', ['deleted_at', 'sort_order']),
+    # File lookups by stored filename
+    ('ix_files_filename_deleted', 'files', ['filename', 'deleted_at']),
+    # Member file listings: uploaded_by = ? AND deleted_at IS NULL ORDER BY created_at
+    ('ix_files_uploaded_by_deleted_created', 'files', ['uploaded_by', 'deleted_at', 'created_at']),
+    # Admin file listings: deleted_at IS NULL ORDER BY created_at
+    ('ix_files_deleted_created', 'files', ['deleted_at', 'created_at']),
+    # User management list: deleted_at IS NULL ORDER BY created_at
+    ('ix_users_deleted_created', 'users', ['deleted_at', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    for name, table, columns in INDEXES:
+        op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
@@ -0,0 +1,23 @@
+"""Add avatars filename index for upload path resolution
+
+Revision ID: 005_add_avatars_filename_index
+Revises: 004_add_composite_indexes
+Create Date: 2026-10-17 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005_add_avatars_filename_index'
+down_revision = '004_add_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # GET /uploads/... resolves avatar (and thumbnail) names by filename
+    op.create_index('ix_avatars_filename_deleted', 'avatars', ['filename', 'deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_avatars_filename_deleted', table_name='avatars')
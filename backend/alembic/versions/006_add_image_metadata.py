@@ -0,0 +1,35 @@
+"""Add image dimensions and placeholder columns to files and avatars
+
+Revision ID: 006_add_image_metadata
+Revises: 005_add_avatars_filename_index
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_add_image_metadata'
+down_revision = '005_add_avatars_filename_index'
+branch_labels = None
+depends_on = None
+
+TABLES = ('files', 'avatars')
+
+
+def upgrade() -> None:
+    # Filled in by thumbnail generation; existing rows are backfilled with
+    # `python -m scripts.backfill_image_metadata` (reads the files on disk)
+    for table in TABLES:
+        op.add_column(table, sa.Column('width', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('height', sa.Integer(), nullable=True))
+        op.add_column(table, sa.Column('dominant_color', sa.String(length=7), nullable=True))
+        op.add_column(table, sa.Column('blurhash', sa.String(length=64), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, 'blurhash')
+        op.drop_column(table, 'dominant_color')
+        op.drop_column(table, 'height')
+        op.drop_column(table, 'width')
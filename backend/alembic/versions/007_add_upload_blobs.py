@@ -0,0 +1,48 @@
+"""Add upload_blobs table for content-addressed upload deduplication
+
+Revision ID: 007_add_upload_blobs
+Revises: 006_add_image_metadata
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_add_upload_blobs'
+down_revision = '006_add_image_metadata'
+branch_labels = None
+depends_on = None
+
+TABLES = ('files', 'avatars')
+
+
+def upgrade() -> None:
+    op.create_table('upload_blobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(length=16), nullable=False),
+    sa.Column('sha256', sa.String(length=64), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('file_size', sa.Integer(), nullable=False),
+    sa.Column('mime_type', sa.String(length=100), nullable=False),
+    sa.Column('ref_count', sa.Integer(), nullable=False, server_default='0'),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kind', 'sha256', name='uq_upload_blobs_kind_sha256')
+    )
+    op.create_index(op.f('ix_upload_blobs_id'), 'upload_blobs', ['id'], unique=False)
+
+    # Existing rows keep blob_id NULL and own their file as before
+    for table in TABLES:
+        op.add_column(table, sa.Column('blob_id', sa.Integer(), nullable=True))
+        op.create_index(op.f(f'ix_{table}_blob_id'), table, ['blob_id'], unique=False)
+        op.create_foreign_key(f'fk_{table}_blob_id', table, 'upload_blobs', ['blob_id'], ['id'])
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_constraint(f'fk_{table}_blob_id', table, type_='foreignkey')
+        op.drop_index(op.f(f'ix_{table}_blob_id'), table_name=table)
+        op.drop_column(table, 'blob_id')
+    op.drop_index(op.f('ix_upload_blobs_id'), table_name='upload_blobs')
+    op.drop_table('upload_blobs')
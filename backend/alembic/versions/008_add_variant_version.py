@@ -0,0 +1,29 @@
+"""Add variant_version to files and avatars
+
+Revision ID: 008_add_variant_version
+Revises: 007_add_upload_blobs
+Create Date: 2026-10-17 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_add_variant_version'
+down_revision = '007_add_upload_blobs'
+branch_labels = None
+depends_on = None
+
+TABLES = ('files', 'avatars')
+
+
+def upgrade() -> None:
+    # Set by thumbnail generation; NULL rows are rebuilt by
+    # `python -m scripts.regenerate_thumbnails`
+    for table in TABLES:
+        op.add_column(table, sa.Column('variant_version', sa.Integer(), nullable=True))
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        op.drop_column(table, 'variant_version')
@@ -1,4 +1,5 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from presentation.api.auth_router import router as auth_router
 from presentation.api.content_router import router as content_router
@@ -7,8 +8,10 @@ from presentation.api.upload_router import router as upload_router
 from presentation.api.backup_router import router as backup_router
 from presentation.api.user_management_router import router as user_management_router
 from config import settings
+from infrastructure.thumbnail_jobs import thumbnail_jobs
+from utils.auth_utils import PasswordHasherBusyError
 
-app = FastAPI(title="mav API", version="1.0.0")
+app = FastAPI(title="mav API", version="1.0.0", default_response_class=ORJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -19,6 +22,19 @@ app.add_middleware(
     expose_headers=["content-disposition"],
 )
 
+@app.exception_handler(PasswordHasherBusyError)
+async def password_hasher_busy_handler(request: Request, exc: PasswordHasherBusyError):
+    # ログイン集中時はプロセスを詰まらせずに再試行を促す
+    return ORJSONResponse(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        content={"detail": "Server is busy, please retry shortly"},
+        headers={"Retry-After": "1"}
+    )
+
+@app.on_event("shutdown")
+def shutdown_thumbnail_jobs():
+    thumbnail_jobs.shutdown()
+
 app.include_router(auth_router, prefix="/auth", tags=["認証"])
 app.include_router(content_router, prefix="/contents", tags=["コンテンツ"])
 app.include_router(category_router, prefix="/categories", tags=["カテゴリ"])
@@ -24,11 +24,38 @@ class Settings:
         self.JWT_ALGORITHM: str = "HS256"
         self.JWT_EXPIRE_HOURS: int = int(os.getenv("JWT_EXPIRE_HOURS") or "0")
         
+        # Password hashing (bcrypt worker pool)
+        self.PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS") or "2")
+        self.PASSWORD_HASH_QUEUE_SIZE: int = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE") or "32")
+        
         # File Upload
         self.UPLOAD_DIR: Path = Path(os.getenv("UPLOAD_DIR"))
         self.MAX_FILE_SIZE: int = 10 * 1024 * 1024  # 10MB
         self.ALLOWED_EXTENSIONS: set = {".jpg", ".jpeg", ".png", ".gif", ".webp"}
         
+        # nginx X-Accel-Redirect offload for GET /uploads/... (empty = serve from Python)
+        self.UPLOAD_ACCEL_REDIRECT_PREFIX: str = (os.getenv("UPLOAD_ACCEL_REDIRECT_PREFIX") or "").rstrip("/")
+        
+        # Thumbnail generation (process pool)
+        self.THUMBNAIL_WORKERS: int = int(os.getenv("THUMBNAIL_WORKERS") or "2")
+        self.THUMBNAIL_QUEUE_SIZE: int = int(os.getenv("THUMBNAIL_QUEUE_SIZE") or "64")
+        
+        # On-demand image variants (GET /uploads/...?w=&h=&fit=)
+        self.IMAGE_VARIANT_SIZES: list = sorted({
+            int(size)
+            for size in (os.getenv("IMAGE_VARIANT_SIZES") or "160,320,480,640,960,1280,1920").split(",")
+            if size.strip()
+        })
+        self.IMAGE_VARIANT_CACHE_MAX_BYTES: int = int(os.getenv("IMAGE_VARIANT_CACHE_MAX_BYTES") or str(512 * 1024 * 1024))
+        
+        # Cache
+        self.CONTENT_CACHE_MAX_ENTRIES: int = int(os.getenv("CONTENT_CACHE_MAX_ENTRIES") or "256")
+        self.UPLOAD_PATH_CACHE_MAX_ENTRIES: int = int(os.getenv("UPLOAD_PATH_CACHE_MAX_ENTRIES") or "4096")
+        self.AVATAR_CACHE_MAX_ENTRIES: int = int(os.getenv("AVATAR_CACHE_MAX_ENTRIES") or "4096")
+        self.AUTH_CACHE_ENABLED: bool = (os.getenv("AUTH_CACHE_ENABLED") or "true").lower() == "true"
+        self.AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES") or "1024")
+        self.AUTH_CACHE_TTL_SECONDS: int = int(os.getenv("AUTH_CACHE_TTL_SECONDS") or "60")
+        
         # CORS
         self.CORS_ORIGINS: list = [
             origin.strip() 
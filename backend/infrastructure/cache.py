@@ -0,0 +1,325 @@
+"""In-process caches shared across requests."""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional, Set
+
+from config import settings
+
+_MISSING = object()
+
+
+class VersionedLRUCache:
+    """
+    Bounded LRU cache whose entries are tied to a global data version.
+
+    Every write to the underlying data calls bump_version(); entries loaded
+    under an older version are never served again. Writes that only affect
+    a few keys can call invalidate() instead to keep the other entries.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._instance_id = uuid.uuid4().hex
+        self._version = 0
+        # invalidate()のたびに増える（その間に読み込んだ値はキャッシュしない）
+        self._generation = 0
+        self._last_modified = datetime.now(timezone.utc)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    @property
+    def version(self) -> int:
+        return self._version
+
+    @property
+    def version_tag(self) -> str:
+        """Process-unique version identifier usable as an ETag component."""
+        return f"{self._instance_id}-{self._version}"
+
+    @property
+    def last_modified(self) -> datetime:
+        """Time of the last bump_version() (or process start)."""
+        return self._last_modified
+
+    def bump_version(self) -> None:
+        """Invalidate all cached entries after a write."""
+        with self._lock:
+            self._version += 1
+            self._last_modified = datetime.now(timezone.utc)
+            self._entries.clear()
+
+    def invalidate(self, predicate: Callable[[Hashable, Any], bool]) -> None:
+        """Drop the entries for which predicate(key, value) is true, keeping the version."""
+        with self._lock:
+            self._generation += 1
+            for key in [key for key, entry in self._entries.items() if predicate(key, entry[1])]:
+                del self._entries[key]
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any]) -> Any:
+        """Return the cached value for key, calling loader() on a miss."""
+        if not self.enabled:
+            return loader()
+
+        with self._lock:
+            version, generation = self._version, self._generation
+            entry = self._entries.get(key, _MISSING)
+            if entry is not _MISSING and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        # DBアクセスはロック外で行う
+        value = loader()
+
+        with self._lock:
+            # 読み込み中に更新があった場合は古い値をキャッシュしない
+            if (version, generation) == (self._version, self._generation):
+                self._put(key, version, value)
+
+        return value
+
+    def get_many_or_load(
+        self,
+        keys: Iterable[Hashable],
+        loader: Callable[[List[Hashable]], Dict[Hashable, Any]]
+    ) -> Dict[Hashable, Any]:
+        """
+        Return the cached values for keys, loading all misses with one loader() call.
+
+        loader receives the missing keys and returns a dict; keys it leaves
+        out are cached (and returned) as None.
+        """
+        keys = list(dict.fromkeys(keys))
+        if not self.enabled:
+            values = loader(keys) if keys else {}
+            return {key: values.get(key) for key in keys}
+
+        result: Dict[Hashable, Any] = {}
+        missing = []
+        with self._lock:
+            version, generation = self._version, self._generation
+            for key in keys:
+                entry = self._entries.get(key, _MISSING)
+                if entry is not _MISSING and entry[0] == version:
+                    self._entries.move_to_end(key)
+                    result[key] = entry[1]
+                else:
+                    missing.append(key)
+            self.hits += len(result)
+            self.misses += len(missing)
+
+        if missing:
+            # DBアクセスはロック外で行う
+            values = loader(missing)
+            with self._lock:
+                for key in missing:
+                    result[key] = values.get(key)
+                    if (version, generation) == (self._version, self._generation):
+                        self._put(key, version, result[key])
+
+        return {key: result[key] for key in keys}
+
+    def _put(self, key: Hashable, version: int, value: Any) -> None:
+        # ロック取得済みで呼び出すこと
+        self._entries[key] = (version, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "version": self._version,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+class AuthPrincipal:
+    """
+    Detached snapshot of an authenticated user.
+
+    Exposes the same attributes the routers and services read from
+    UserModel, without holding on to a Session.
+    """
+
+    __slots__ = ("id", "username", "email", "role", "profile", "timezone")
+
+    def __init__(self, id: int, username: str, email: str, role: int, profile: Optional[str], timezone: int):
+        self.id = id
+        self.username = username
+        self.email = email
+        self.role = role
+        self.profile = profile
+        self.timezone = timezone
+
+    @classmethod
+    def from_user(cls, user) -> "AuthPrincipal":
+        return cls(
+            id=user.id,
+            username=user.username,
+            email=user.email,
+            role=user.role,
+            profile=user.profile,
+            timezone=user.timezone,
+        )
+
+
+class PrincipalCache:
+    """
+    Bounded TTL cache of access token -> AuthPrincipal.
+
+    Entries expire after ttl_seconds (or at the token's own expiry, if
+    earlier) and are dropped as soon as the user is changed or deleted.
+    Callers take generation() before loading the user and pass it to put(),
+    so a principal loaded before an invalidate_user() is never cached.
+    """
+
+    def __init__(self, enabled: bool, max_entries: int, ttl_seconds: int):
+        self.enabled = enabled and max_entries > 0 and ttl_seconds > 0
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._tokens_by_user: Dict[int, Set[str]] = {}
+        self._lock = threading.Lock()
+        # invalidate_user()/clear()のたびに増える世代と、ユーザーごとの最後の無効化時の世代
+        self._generation = 0
+        self._invalidated_at: Dict[int, int] = {}
+        self._cleared_at = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, token: str) -> Optional[AuthPrincipal]:
+        """Return the cached principal for token, or None."""
+        if not self.enabled:
+            return None
+
+        with self._lock:
+            entry = self._entries.get(token)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, principal = entry
+            if expires_at <= time.monotonic():
+                self._remove(token)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(token)
+            self.hits += 1
+            return principal
+
+    def generation(self) -> int:
+        """Return the current invalidation generation (take it before loading the user)."""
+        with self._lock:
+            return self._generation
+
+    def put(
+        self,
+        token: str,
+        principal: AuthPrincipal,
+        token_expires_at: Optional[float] = None,
+        generation: Optional[int] = None
+    ) -> None:
+        """
+        Cache principal for token. token_expires_at is the JWT exp (epoch seconds).
+
+        If generation is given, the principal is not cached when the user was
+        invalidated (or the cache cleared) after that generation.
+        """
+        if not self.enabled:
+            return
+
+        ttl = self.ttl_seconds
+        if token_expires_at is not None:
+            ttl = min(ttl, token_expires_at - time.time())
+        if ttl <= 0:
+            return
+
+        with self._lock:
+            if generation is not None and max(
+                self._cleared_at, self._invalidated_at.get(principal.id, 0)
+            ) > generation:
+                # 読み込み後に変更・削除されたユーザーの古い情報はキャッシュしない
+                return
+            self._remove(token)
+            self._entries[token] = (time.monotonic() + ttl, principal)
+            self._tokens_by_user.setdefault(principal.id, set()).add(token)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_user(self, user_id: int) -> None:
+        """Drop every cached token of the given user."""
+        with self._lock:
+            self._generation += 1
+            self._invalidated_at[user_id] = self._generation
+            for token in self._tokens_by_user.pop(user_id, set()):
+                self._entries.pop(token, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._generation += 1
+            self._cleared_at = self._generation
+            self._invalidated_at.clear()
+            self._entries.clear()
+            self._tokens_by_user.clear()
+
+    def _remove(self, token: str) -> None:
+        # ロック取得済みで呼び出すこと
+        entry = self._entries.pop(token, None)
+        if entry is None:
+            return
+        tokens = self._tokens_by_user.get(entry[1].id)
+        if tokens is not None:
+            tokens.discard(token)
+            if not tokens:
+                del self._tokens_by_user[entry[1].id]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# 公開コンテンツ・カテゴリ読み取り用キャッシュ
+content_cache = VersionedLRUCache(settings.CONTENT_CACHE_MAX_ENTRIES)
+
+# アップロードファイル名 -> (種別, 保存ファイル名) の解決キャッシュ（見つからない場合はNoneを保持）
+upload_path_cache = VersionedLRUCache(settings.UPLOAD_PATH_CACHE_MAX_ENTRIES)
+
+# ユーザーID -> アバター情報（未設定の場合はNoneを保持）のキャッシュ
+avatar_cache = VersionedLRUCache(settings.AVATAR_CACHE_MAX_ENTRIES)
+
+# 認証済みユーザー（トークン -> プリンシパル）のキャッシュ
+auth_cache = PrincipalCache(
+    settings.AUTH_CACHE_ENABLED,
+    settings.AUTH_CACHE_MAX_ENTRIES,
+    settings.AUTH_CACHE_TTL_SECONDS,
+)
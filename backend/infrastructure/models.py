@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, UniqueConstraint, ForeignKey, Table, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, Text, Enum, UniqueConstraint, ForeignKey, Table, Boolean, Index
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from .database import Base
@@ -10,7 +10,8 @@ content_categories = Table(
     'content_categories', Base.metadata,
     Column('content_id', Integer, ForeignKey('contents.id'), primary_key=True),
     Column('category_id', Integer, ForeignKey('categories.id'), primary_key=True),
-    Column('created_at', DateTime(timezone=True), server_default=func.now())
+    Column('created_at', DateTime(timezone=True), server_default=func.now()),
+    Index('ix_content_categories_category_content', 'category_id', 'content_id')
 )
 
 class UserRole(enum.IntEnum):
@@ -145,6 +146,7 @@ class UserModel(Base):
 
     __table_args__ = (
         UniqueConstraint('email', 'deleted_at', name='uq_email_deleted_at'),
+        Index('ix_users_deleted_created', 'deleted_at', 'created_at'),
     )
 
 class CategoryModel(Base):
@@ -161,12 +163,18 @@ class CategoryModel(Base):
     # リレーション（多対多）
     contents = relationship("ContentModel", secondary=content_categories, back_populates="categories")
 
+    __table_args__ = (
+        Index('ix_categories_deleted_sort', 'deleted_at', 'sort_order'),
+    )
+
 class ContentModel(Base):
     __tablename__ = "contents"
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     content = Column(Text, nullable=False)
+    excerpt = Column(String(255), nullable=True)
+    word_count = Column(Integer, nullable=False, default=0, server_default='0')
     is_published = Column(Boolean, default=False, nullable=False)
     author_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -176,6 +184,36 @@ class ContentModel(Base):
     # カテゴリとの多対多リレーション
     categories = relationship("CategoryModel", secondary=content_categories, back_populates="contents")
 
+    __table_args__ = (
+        # 全文検索用（日本語対応のためngramパーサーを使用）
+        Index(
+            'ft_contents_title_content', 'title', 'content',
+            mysql_prefix='FULLTEXT', mysql_with_parser='ngram'
+        ),
+        # 論理削除・公開状態・作成者での絞り込み + 作成日時順の一覧用
+        Index('ix_contents_deleted_published_created', 'deleted_at', 'is_published', 'created_at'),
+        Index('ix_contents_author_deleted_created', 'author_id', 'deleted_at', 'created_at'),
+        Index('ix_contents_deleted_created', 'deleted_at', 'created_at'),
+    )
+
+class UploadBlobModel(Base):
+    """同じ内容のアップロードで共有する実ファイル（内容のSHA-256で重複を判定）"""
+    __tablename__ = "upload_blobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    kind = Column(String(16), nullable=False)  # "files" / "avatars"
+    sha256 = Column(String(64), nullable=False)
+    filename = Column(String(255), nullable=False)
+    file_size = Column(Integer, nullable=False)
+    mime_type = Column(String(100), nullable=False)
+    # 参照している未削除のfiles/avatarsの行数（0になった時点で行と実ファイルを削除）
+    ref_count = Column(Integer, nullable=False, default=0, server_default='0')
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint('kind', 'sha256', name='uq_upload_blobs_kind_sha256'),
+    )
+
 class FileModel(Base):
     __tablename__ = "files"
 
@@ -185,12 +223,27 @@ class FileModel(Base):
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
     uploaded_by = Column(Integer, ForeignKey('users.id'), nullable=False)
+    # 共有している実ファイル（重複排除の導入前のファイルはNULL）
+    blob_id = Column(Integer, ForeignKey('upload_blobs.id'), nullable=True, index=True)
+    # 画像の幅・高さ（向き補正後）と読み込み前に表示するプレースホルダー（サムネイル生成時に設定）
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    dominant_color = Column(String(7), nullable=True)  # "#rrggbb"
+    blurhash = Column(String(64), nullable=True)
+    # サムネイルを生成した時点のTHUMBNAIL_VERSION（未生成・導入前はNULL）
+    variant_version = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     # リレーション
     uploader = relationship("UserModel")
 
+    __table_args__ = (
+        Index('ix_files_filename_deleted', 'filename', 'deleted_at'),
+        Index('ix_files_uploaded_by_deleted_created', 'uploaded_by', 'deleted_at', 'created_at'),
+        Index('ix_files_deleted_created', 'deleted_at', 'created_at'),
+    )
+
 class AvatarModel(Base):
     __tablename__ = "avatars"
 
@@ -200,12 +253,19 @@ class AvatarModel(Base):
     original_filename = Column(String(255), nullable=False)
     file_size = Column(Integer, nullable=False)
     mime_type = Column(String(100), nullable=False)
+    blob_id = Column(Integer, ForeignKey('upload_blobs.id'), nullable=True, index=True)
+    width = Column(Integer, nullable=True)
+    height = Column(Integer, nullable=True)
+    dominant_color = Column(String(7), nullable=True)
+    blurhash = Column(String(64), nullable=True)
+    variant_version = Column(Integer, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     deleted_at = Column(DateTime(timezone=True), nullable=True)
 
     __table_args__ = (
         UniqueConstraint('user_id', 'deleted_at', name='uq_user_avatar_active'),
+        Index('ix_avatars_filename_deleted', 'filename', 'deleted_at'),
     )
 
     # リレーション
@@ -0,0 +1,253 @@
+"""Background thumbnail generation on a process pool."""
+import asyncio
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from config import settings
+from utils.image_utils import (
+    ALTERNATIVE_FORMATS,
+    THUMBNAIL_SIZES,
+    cleanup_thumbnails,
+    create_thumbnails,
+    generate_alternative_filename,
+    generate_thumbnail_filename,
+    is_image_file
+)
+
+STATUS_PENDING = "pending"
+STATUS_READY = "ready"
+STATUS_FAILED = "failed"
+STATUS_MISSING = "missing"
+STATUS_NONE = "none"
+
+# 失敗したジョブのエラーを保持する件数
+_MAX_FAILED_JOBS = 256
+
+
+class ThumbnailQueueFullError(Exception):
+    """Raised when the thumbnail job queue is full."""
+
+
+class ThumbnailJobQueue:
+    """
+    Runs create_thumbnails() in worker processes and tracks job status.
+
+    Only in-flight and failed jobs are kept in memory; once a job succeeds
+    (or after a restart) the status is derived from the files on disk.
+    """
+
+    def __init__(self, max_workers: int, queue_size: int):
+        self.max_workers = max_workers
+        self.queue_size = queue_size
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots = threading.BoundedSemaphore(max_workers + queue_size)
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], Future] = {}
+        self._failed: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is not None and self._executor._broken:
+                # ワーカーが異常終了（OOM killなど）したプールは以後使えないため作り直す
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+            if self._executor is None:
+                # スレッドを持つプロセスからのforkを避けるためspawnで起動
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._executor
+
+    def submit(
+        self,
+        kind: str,
+        image_path: Path,
+        on_complete: Optional[Callable[[str, str, Any], None]] = None
+    ) -> Future:
+        """
+        Queue thumbnail generation for an uploaded image.
+
+        on_complete(kind, filename, result) is called from a pool thread with
+        the (thumbnails, ImageMetadata) result when the job succeeds.
+
+        Raises:
+            ThumbnailQueueFullError: too many jobs are running or queued
+        """
+        key = (kind, image_path.name)
+        future = self.run(create_thumbnails, image_path, image_path.parent)
+
+        with self._lock:
+            self._pending[key] = future
+            self._failed.pop(key, None)
+        future.add_done_callback(lambda done: self._on_done(key, image_path, done, on_complete))
+        return future
+
+    def run(self, fn: Callable[..., Any], *args: Any) -> Future:
+        """
+        Run a picklable image task on the worker pool, sharing the queue limit.
+
+        Raises:
+            ThumbnailQueueFullError: too many jobs are running or queued
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ThumbnailQueueFullError("Thumbnail queue is full")
+
+        try:
+            executor = self._get_executor()
+            try:
+                future = executor.submit(fn, *args)
+            except BrokenProcessPool:
+                # 確認後に壊れた場合に備えて、新しいプールで一度だけ再試行する
+                self._discard_executor(executor)
+                future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+
+        future.add_done_callback(lambda done: self._slots.release())
+        return future
+
+    def _discard_executor(self, executor: Optional[ProcessPoolExecutor] = None) -> None:
+        """Shut down the pool (only if it is still the given one) so the next job starts a new one."""
+        with self._lock:
+            if executor is not None and self._executor is not executor:
+                return
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _on_done(
+        self,
+        key: Tuple[str, str],
+        image_path: Path,
+        future: Future,
+        on_complete: Optional[Callable[[str, str, Any], None]]
+    ) -> None:
+        error = None if future.cancelled() else future.exception()
+
+        with self._lock:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+            if error is not None:
+                self._failed[key] = str(error)
+                while len(self._failed) > _MAX_FAILED_JOBS:
+                    self._failed.popitem(last=False)
+
+        # 生成中に元画像が削除された場合は残ったサムネイルを片付ける
+        if not image_path.exists():
+            cleanup_thumbnails(image_path.name, image_path.parent)
+            return
+
+        if on_complete is not None and not future.cancelled() and error is None:
+            try:
+                on_complete(key[0], key[1], future.result())
+            except Exception:
+                # メタデータの保存に失敗してもサムネイルは利用できる（バックフィルで補完）
+                pass
+
+    def cancel(self, kind: str, filename: str) -> None:
+        """Cancel a queued job (e.g. when the upload is deleted)."""
+        with self._lock:
+            future = self._pending.get((kind, filename))
+            self._failed.pop((kind, filename), None)
+        if future is not None:
+            future.cancel()
+
+    def get_status(self, kind: str, image_path: Path) -> Dict[str, Any]:
+        """Return the variant status of an uploaded file."""
+        key = (kind, image_path.name)
+        with self._lock:
+            future = self._pending.get(key)
+            error = self._failed.get(key)
+
+        if not is_image_file(image_path.name):
+            status = STATUS_NONE
+        elif future is not None:
+            status = STATUS_PENDING
+        elif error is not None:
+            status = STATUS_FAILED
+        elif all(path.exists() for path in variant_paths(image_path).values()):
+            status = STATUS_READY
+        else:
+            # 再起動前に処理されなかった、または削除された
+            status = STATUS_MISSING
+
+        result: Dict[str, Any] = {"filename": image_path.name, "status": status}
+        if status == STATUS_READY:
+            result["variants"] = {
+                size_name: f"/uploads/{kind}/{path.name}?v={variant_token(path)}"
+                for size_name, path in variant_paths(image_path).items()
+            }
+            result["savings"] = variant_savings(image_path)
+        if status == STATUS_FAILED:
+            result["error"] = error
+        return result
+
+    async def wait(self, kind: str, filename: str, timeout: float) -> None:
+        """Wait up to timeout seconds for a pending job to finish."""
+        with self._lock:
+            future = self._pending.get((kind, filename))
+        if future is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except Exception:
+            # タイムアウト・失敗はget_status()で返す
+            pass
+
+    def shutdown(self) -> None:
+        self._discard_executor()
+
+
+def variant_paths(image_path: Path) -> Dict[str, Path]:
+    """Return the expected thumbnail paths of an image."""
+    return {
+        size_name: image_path.parent / generate_thumbnail_filename(image_path.name, size_name[0])
+        for size_name in THUMBNAIL_SIZES
+    }
+
+
+def variant_token(path: Path) -> Optional[str]:
+    """
+    Return a token that changes whenever a thumbnail is rebuilt.
+
+    Thumbnail URLs carrying the current token (?v=) are served as immutable;
+    without it they must be revalidated, since regeneration rewrites the file.
+    """
+    try:
+        return format(path.stat().st_mtime_ns, "x")
+    except FileNotFoundError:
+        return None
+
+
+def variant_savings(image_path: Path) -> Dict[str, Dict[str, Any]]:
+    """Return the size of each thumbnail and the bytes saved by its WebP/AVIF copies."""
+    savings = {}
+    for size_name, path in variant_paths(image_path).items():
+        try:
+            base_bytes = path.stat().st_size
+        except FileNotFoundError:
+            continue
+        formats = {}
+        for extension in ALTERNATIVE_FORMATS:
+            alternative_path = path.with_name(generate_alternative_filename(path.name, extension))
+            try:
+                alternative_bytes = alternative_path.stat().st_size
+            except FileNotFoundError:
+                continue
+            formats[extension.lstrip(".")] = {
+                "bytes": alternative_bytes,
+                "saved_bytes": base_bytes - alternative_bytes,
+                "saved_percent": round((base_bytes - alternative_bytes) * 100 / base_bytes, 1) if base_bytes else 0.0
+            }
+        savings[size_name] = {"bytes": base_bytes, "formats": formats}
+    return savings
+
+
+thumbnail_jobs = ThumbnailJobQueue(settings.THUMBNAIL_WORKERS, settings.THUMBNAIL_QUEUE_SIZE)
@@ -0,0 +1,187 @@
+"""On-demand resized image variants kept in a size-bounded on-disk LRU cache."""
+import asyncio
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Dict, Optional
+
+from config import settings
+from infrastructure.thumbnail_jobs import ThumbnailJobQueue, thumbnail_jobs
+from utils.image_utils import get_variant_format, render_variant
+
+# UPLOAD_DIR配下のキャッシュディレクトリ名（DBに登録されないため直接は配信されない）
+VARIANT_CACHE_DIRNAME = ".variant_cache"
+
+# これより古い一時ファイルは中断された生成の残骸とみなす（秒）
+_STALE_TEMP_SECONDS = 3600
+
+
+class VariantCache:
+    """
+    Renders resized variants of uploads on first request and keeps them on disk.
+
+    Files live at {directory}/{kind}/{filename}/{width}x{height}_{fit}{ext};
+    the extension selects the output format.
+    The total size is capped at max_bytes; the least recently used variants
+    are deleted first. Concurrent requests for the same variant share one
+    render job. The LRU order is tracked in memory and rebuilt from file
+    mtimes on the first access after a restart.
+    """
+
+    def __init__(self, directory: Path, max_bytes: int, jobs: ThumbnailJobQueue):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.jobs = jobs
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Path, int]" = OrderedDict()
+        self._total_bytes = 0
+        self._loaded = False
+        self._rendering: Dict[Path, Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def variant_path(
+        self,
+        kind: str,
+        filename: str,
+        width: int,
+        height: int,
+        fit: str,
+        extension: Optional[str] = None
+    ) -> Path:
+        if extension is None:
+            _, extension = get_variant_format(filename)
+        return self.directory / kind / filename / f"{width}x{height}_{fit}{extension}"
+
+    async def get(
+        self,
+        kind: str,
+        source_path: Path,
+        width: int,
+        height: int,
+        fit: str,
+        extension: Optional[str] = None
+    ) -> Path:
+        """
+        Return the path of a cached variant, rendering it on a miss.
+
+        Raises:
+            ThumbnailQueueFullError: the render could not be queued
+        """
+        path = self.variant_path(kind, source_path.name, width, height, fit, extension)
+
+        with self._lock:
+            self._ensure_loaded()
+            if path in self._entries and path.exists():
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return path
+
+            future = self._rendering.get(path)
+            started = future is None
+            if started:
+                self.misses += 1
+                future = self.jobs.run(render_variant, source_path, path, width, height, fit)
+                self._rendering[path] = future
+
+        if started:
+            # 既に完了している場合はこの場で呼ばれるため、ロックの外で登録する
+            future.add_done_callback(lambda done: self._on_rendered(path, done))
+
+        # 待機中のリクエストが切断されても他のリクエストの生成は継続させる
+        await asyncio.shield(asyncio.wrap_future(future))
+        return path
+
+    def _on_rendered(self, path: Path, future: Future) -> None:
+        with self._lock:
+            self._rendering.pop(path, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            self._add(path, future.result())
+            self._evict()
+
+    def discard(self, kind: str, filename: str) -> None:
+        """Delete all cached variants of an upload (e.g. when it is deleted)."""
+        directory = self.directory / kind / filename
+        with self._lock:
+            for path in [path for path in self._entries if path.parent == directory]:
+                self._total_bytes -= self._entries.pop(path)
+        shutil.rmtree(directory, ignore_errors=True)
+
+    def clear(self) -> None:
+        """Delete every cached variant (e.g. after restoring a backup)."""
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+            self._loaded = True
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def _add(self, path: Path, size: int) -> None:
+        previous = self._entries.pop(path, None)
+        if previous is not None:
+            self._total_bytes -= previous
+        self._entries[path] = size
+        self._total_bytes += size
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            self.evictions += 1
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            try:
+                # 空になった元画像ごとのディレクトリを片付ける
+                path.parent.rmdir()
+            except OSError:
+                pass
+
+    def _ensure_loaded(self) -> None:
+        """Index variants left on disk by a previous process (oldest first)."""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        found = []
+        for root, _, names in os.walk(self.directory):
+            for name in names:
+                path = Path(root) / name
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                if name.startswith("."):
+                    # 中断された生成の一時ファイル（他プロセスで生成中のものは残す）
+                    if time.time() - stat.st_mtime > _STALE_TEMP_SECONDS:
+                        path.unlink(missing_ok=True)
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(found):
+            self._add(path, size)
+        self._evict()
+
+
+variant_cache = VariantCache(
+    settings.UPLOAD_DIR / VARIANT_CACHE_DIRNAME,
+    settings.IMAGE_VARIANT_CACHE_MAX_BYTES,
+    thumbnail_jobs
+)
@@ -4,8 +4,9 @@ from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 
 from config import settings
+from infrastructure.cache import AuthPrincipal, auth_cache
 from infrastructure.database import get_db
-from infrastructure.models import UserModel, UserRole
+from infrastructure.models import UserRole
 from presentation.schemas.auth_schemas import LoginRequest, SetupRequest, LoginResponse, UserInfo
 from presentation.schemas.user_profile_schemas import UserProfileUpdate, PasswordChange, UserProfile
 from utils.auth_utils import verify_password, create_access_token, verify_token, hash_password
@@ -17,6 +18,7 @@ security = HTTPBearer()
 
 @router.post("/login", response_model=LoginResponse)
 def login(request: LoginRequest, db: Session = Depends(get_db)):
+    # DB問い合わせを含むためスレッドプールで実行（bcryptは専用のワーカープールで実行）
     user_service = UserService(db)
     user = user_service.authenticate_user(request.email, request.password)
     
@@ -35,8 +37,14 @@ def login(request: LoginRequest, db: Session = Depends(get_db)):
         role="admin" if user.role == UserRole.ADMIN else "member"
     )
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> UserModel:
+def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> AuthPrincipal:
     token = credentials.credentials
+    
+    # キャッシュ済みのトークンはJWT検証・DB問い合わせを省略
+    principal = auth_cache.get(token)
+    if principal is not None:
+        return principal
+    
     payload = verify_token(token)
     
     if payload is None:
@@ -52,6 +60,8 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             "Invalid token payload"
         )
     
+    # 読み込み中にユーザーが変更・削除された場合にキャッシュしないよう、読み込み前の世代を控える
+    generation = auth_cache.generation()
     user_service = UserService(db)
     user = user_service.get_user_by_email(email)
     if user is None:
@@ -60,9 +70,11 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
             "User not found"
         )
     
-    return user
+    principal = AuthPrincipal.from_user(user)
+    auth_cache.put(token, principal, payload.get("exp"), generation)
+    return principal
 
-def require_admin(current_user: UserModel = Depends(get_current_user)) -> UserModel:
+def require_admin(current_user: AuthPrincipal = Depends(get_current_user)) -> AuthPrincipal:
     if current_user.role != UserRole.ADMIN:
         raise create_error_response(
             status.HTTP_403_FORBIDDEN,
@@ -70,7 +82,7 @@ def require_admin(current_user: UserModel = Depends(get_current_user)) -> UserMo
         )
     return current_user
 
-def require_authenticated(current_user: UserModel = Depends(get_current_user)) -> UserModel:
+def require_authenticated(current_user: AuthPrincipal = Depends(get_current_user)) -> AuthPrincipal:
     """認証されたユーザー（admin or member）のみアクセス可能"""
     if current_user.role not in [UserRole.ADMIN, UserRole.MEMBER]:
         raise create_error_response(
@@ -80,7 +92,7 @@ def require_authenticated(current_user: UserModel = Depends(get_current_user)) -
     return current_user
 
 @router.get("/me", response_model=UserInfo)
-def get_me(current_user: UserModel = Depends(get_current_user)):
+def get_me(current_user: AuthPrincipal = Depends(get_current_user)):
     return UserInfo(
         id=current_user.id,
         username=current_user.username,
@@ -94,7 +106,7 @@ def get_me(current_user: UserModel = Depends(get_current_user)):
 def update_profile(
     profile_data: UserProfileUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_user)
 ):
     user_service = UserService(db)
     email_changed = False
@@ -123,6 +135,7 @@ def update_profile(
             updated_user.timezone = profile_data.timezone
             db.commit()
             db.refresh(updated_user)
+            auth_cache.invalidate_user(updated_user.id)
         
         current_user = updated_user
         
@@ -152,7 +165,7 @@ def update_profile(
 def change_password(
     password_data: PasswordChange,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(get_current_user)
+    current_user: AuthPrincipal = Depends(get_current_user)
 ):
     user_service = UserService(db)
     
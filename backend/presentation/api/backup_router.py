@@ -9,7 +9,7 @@ from fastapi.responses import FileResponse
 from sqlalchemy.orm import Session
 
 from infrastructure.database import get_db
-from infrastructure.models import UserModel
+from infrastructure.cache import AuthPrincipal
 from presentation.api.auth_router import get_current_user
 from services.backup_service import BackupService
 
@@ -19,7 +19,7 @@ router = APIRouter(prefix="/backup", tags=["backup"])
 
 @router.get("/download")
 async def download_backup(
-    current_user: UserModel = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """バックアップファイルをダウンロード"""
@@ -46,7 +46,7 @@ async def download_backup(
 @router.post("/restore")
 async def restore_backup(
     file: UploadFile = File(...),
-    current_user: UserModel = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """バックアップファイルから復元"""
@@ -82,7 +82,7 @@ async def restore_backup(
 
 @router.get("/info")
 async def get_backup_info(
-    current_user: UserModel = Depends(get_current_user),
+    current_user: AuthPrincipal = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     """バックアップ情報を取得"""
@@ -1,13 +1,17 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
 
+from infrastructure.cache import AuthPrincipal, content_cache
 from infrastructure.database import get_db
-from infrastructure.models import UserModel
 from presentation.api.auth_router import require_admin
+from presentation.api.content_router import to_content_list
 from presentation.schemas.category_schemas import CategoryCreate, CategoryUpdate, CategoryResponse
-from presentation.schemas.content_schemas import ContentResponse
+from presentation.schemas.content_schemas import ContentResponse, ContentSummaryResponse, ContentPage
 from services.category_service import CategoryService
+from utils.http_cache_utils import conditional_get, make_etag
+from utils.pagination_utils import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from utils.response_utils import dump_json, json_bytes_response
 
 router = APIRouter()
 
@@ -16,7 +20,7 @@ router = APIRouter()
 def create_category(
     request: CategoryCreate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     category_service = CategoryService(db)
     
@@ -62,7 +66,7 @@ def update_category(
     category_id: int,
     request: CategoryUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     category_service = CategoryService(db)
     
@@ -90,7 +94,7 @@ def update_category(
 def delete_category(
     category_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     category_service = CategoryService(db)
     
@@ -111,46 +115,78 @@ def delete_category(
 
 # 公開: カテゴリ一覧
 @router.get("/", response_model=List[CategoryResponse])
-def get_categories(db: Session = Depends(get_db)):
+def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    # クライアントのキャッシュが最新なら304を返す
+    etag = make_etag(content_cache.version_tag, "categories")
+    not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+    if not_modified:
+        return not_modified
+    
     category_service = CategoryService(db)
-    categories = category_service.get_all_categories()
-    return categories
+    
+    body = content_cache.get_or_load(
+        ("categories",),
+        lambda: dump_json([
+            CategoryResponse.model_validate(category).model_dump()
+            for category in category_service.get_all_categories()
+        ])
+    )
+    return json_bytes_response(body, response.headers)
 
 # 公開: 特定カテゴリのコンテンツ一覧
-@router.get("/{category_id}/contents", response_model=List[ContentResponse])
+@router.get("/{category_id}/contents", response_model=Union[List[ContentResponse], List[ContentSummaryResponse], ContentPage])
 def get_category_contents(
     category_id: int,
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^summary$"),
     db: Session = Depends(get_db)
 ):
-    from services.content_service import ContentService
-    
+    etag = make_etag(content_cache.version_tag, "category_contents", category_id, fields, limit, cursor)
     category_service = CategoryService(db)
-    content_service = ContentService(db)
+    
+    summary = fields == "summary"
     
     try:
-        # カテゴリの存在確認とコンテンツ取得
-        results = category_service.get_category_contents(category_id)
-        
-        # レスポンスを生成
-        content_list = []
-        for content, author_name in results:
-            category_names = ContentService.get_category_names(content)
+        # limit/cursor指定時はカーソルページング
+        if limit is not None or cursor is not None:
+            page_limit = limit or DEFAULT_PAGE_LIMIT
+            
+            def load_page():
+                results, next_cursor = category_service.get_category_contents_page(
+                    category_id, page_limit, cursor, summary
+                )
+                return dump_json({
+                    "items": to_content_list(results, summary),
+                    "next_cursor": next_cursor
+                })
             
-            content_list.append(ContentResponse(
-                id=content.id,
-                title=content.title,
-                content=content.content,
-                categories=category_names,
-                is_published=content.is_published,
-                author_name=author_name,
-                created_at=content.created_at,
-                updated_at=content.updated_at
-            ))
-        
-        return content_list
-        
+            body = content_cache.get_or_load(
+                ("category_contents", category_id, summary, page_limit, cursor), load_page
+            )
+        else:
+            # カテゴリの存在確認とコンテンツ取得し、エンコード済みレスポンスとしてキャッシュ
+            body = content_cache.get_or_load(
+                ("category_contents", category_id, summary),
+                lambda: dump_json(to_content_list(category_service.get_category_contents(category_id, summary), summary))
+            )
     except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=str(e)
-        )
\ No newline at end of file
+        if "見つかりません" in str(e):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=str(e)
+            )
+        else:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=str(e)
+            )
+    
+    # クライアントのキャッシュが最新なら304を返す
+    # （存在しないカテゴリに If-None-Match: * などで304を返さないよう、取得後に判定）
+    not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+    if not_modified:
+        return not_modified
+    return json_bytes_response(body, response.headers)
\ No newline at end of file
@@ -1,20 +1,68 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Any, Dict, List, Optional, Union
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
 from sqlalchemy.orm import Session
+from infrastructure.cache import AuthPrincipal, content_cache
 from infrastructure.database import get_db
-from infrastructure.models import UserModel
+from infrastructure.models import ContentModel
 from presentation.api.auth_router import get_current_user, require_admin, require_authenticated
-from presentation.schemas.content_schemas import ContentCreate, ContentUpdate, ContentResponse
-from services.content_service import ContentService
+from presentation.schemas.content_schemas import ContentCreate, ContentUpdate, ContentResponse, ContentSummaryResponse, ContentPage, ContentSearchPage
+from services.content_service import ContentService, ContentListItem
+from utils.http_cache_utils import conditional_get, make_etag
+from utils.pagination_utils import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from utils.response_utils import dump_json, json_bytes_response
 
 router = APIRouter()
 
+
+def to_content_dict(content: ContentModel, author_name: str, summary: bool = False) -> Dict[str, Any]:
+    """
+    コンテンツエンティティをレスポンス用の辞書に変換
+    
+    ContentResponse（summary時はContentSummaryResponse）と同じ形で、
+    pydanticの検証を経由せずにそのままJSONエンコードできる
+    """
+    item = {"id": content.id, "title": content.title}
+    if summary:
+        item["excerpt"] = content.excerpt or ""
+        item["word_count"] = content.word_count or 0
+    else:
+        item["content"] = content.content
+    item["categories"] = ContentService.get_category_names(content)
+    item["is_published"] = content.is_published
+    item["author_name"] = author_name
+    item["created_at"] = content.created_at
+    item["updated_at"] = content.updated_at
+    return item
+
+
+def to_content_item_dict(item: ContentListItem, summary: bool = False) -> Dict[str, Any]:
+    """一覧用DTOをレスポンス用の辞書に変換（キー順はto_content_dictと同じ、作者のアバターURLを追加）"""
+    result = {"id": item.id, "title": item.title}
+    if summary:
+        result["excerpt"] = item.excerpt or ""
+        result["word_count"] = item.word_count or 0
+    else:
+        result["content"] = item.content
+    result["categories"] = item.categories
+    result["is_published"] = item.is_published
+    result["author_name"] = item.author_name
+    result["author_avatar_url"] = item.author_avatar_url
+    result["created_at"] = item.created_at
+    result["updated_at"] = item.updated_at
+    return result
+
+
+def to_content_list(items: List[ContentListItem], summary: bool = False) -> List[Dict[str, Any]]:
+    """一覧用DTOのリストをレスポンス用の辞書のリストに変換"""
+    return [to_content_item_dict(item, summary) for item in items]
+
+
 # 認証済みユーザー: コンテンツ作成
 @router.post("/", response_model=ContentResponse)
 def create_content(
     request: ContentCreate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_authenticated)
+    current_user: AuthPrincipal = Depends(require_authenticated)
 ):
     content_service = ContentService(db)
     
@@ -58,7 +106,7 @@ def update_content(
     content_id: int,
     request: ContentUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_authenticated)
+    current_user: AuthPrincipal = Depends(require_authenticated)
 ):
     content_service = ContentService(db)
     
@@ -114,7 +162,7 @@ def update_content(
 def delete_content(
     content_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_authenticated)
+    current_user: AuthPrincipal = Depends(require_authenticated)
 ):
     content_service = ContentService(db)
     
@@ -153,36 +201,34 @@ def delete_content(
         )
 
 # 認証済みユーザー: 全コンテンツ一覧（管理画面用）
-@router.get("/admin", response_model=List[ContentResponse])
+@router.get("/admin", response_model=Union[List[ContentResponse], List[ContentSummaryResponse], ContentPage])
 def get_all_contents_admin(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^summary$"),
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_authenticated)
+    current_user: AuthPrincipal = Depends(require_authenticated)
 ):
     content_service = ContentService(db)
     
+    summary = fields == "summary"
+    
     try:
+        # limit/cursor指定時はカーソルページング
+        if limit is not None or cursor is not None:
+            results, next_cursor = content_service.get_all_contents_for_admin_page(
+                current_user, limit or DEFAULT_PAGE_LIMIT, cursor, summary
+            )
+            return json_bytes_response(dump_json({
+                "items": to_content_list(results, summary),
+                "next_cursor": next_cursor
+            }))
+        
         # コンテンツ一覧を取得（権限に応じてフィルタリング）
-        results = content_service.get_all_contents_for_admin(current_user)
+        results = content_service.get_all_contents_for_admin(current_user, summary)
         
         # エンティティをレスポンスに変換
-        result_list = []
-        for content, author_name in results:
-            # カテゴリ名を取得
-            category_names = ContentService.get_category_names(content)
-            # レスポンスに変換
-            content_response = ContentResponse(
-                id=content.id,
-                title=content.title,
-                content=content.content,
-                categories=category_names,
-                is_published=content.is_published,
-                author_name=author_name,
-                created_at=content.created_at,
-                updated_at=content.updated_at
-            )
-            result_list.append(content_response)
-        
-        return result_list
+        return json_bytes_response(dump_json(to_content_list(results, summary)))
         
     except ValueError as e:
         if "アクセス" in str(e):
@@ -201,13 +247,28 @@ def get_all_contents_admin(
             detail="コンテンツ一覧の取得に失敗しました"
         )
 
+# 管理者専用: 公開コンテンツキャッシュの統計
+@router.get("/cache/stats")
+def get_cache_stats(current_user: AuthPrincipal = Depends(require_admin)):
+    return content_cache.stats()
+
 # 公開: カテゴリ一覧
 @router.get("/categories", response_model=List[str])
-def get_categories(db: Session = Depends(get_db)):
+def get_categories(request: Request, response: Response, db: Session = Depends(get_db)):
+    # クライアントのキャッシュが最新なら304を返す
+    etag = make_etag(content_cache.version_tag, "category_names")
+    not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+    if not_modified:
+        return not_modified
+    
     content_service = ContentService(db)
     
     try:
-        return content_service.get_categories()
+        body = content_cache.get_or_load(
+            ("category_names",),
+            lambda: dump_json(content_service.get_categories())
+        )
+        return json_bytes_response(body, response.headers)
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -215,71 +276,131 @@ def get_categories(db: Session = Depends(get_db)):
         )
 
 # 公開: 全コンテンツ一覧（一般ユーザー用）
-@router.get("/", response_model=List[ContentResponse])
-def get_contents(db: Session = Depends(get_db)):
+@router.get("/", response_model=Union[List[ContentResponse], List[ContentSummaryResponse], ContentPage])
+def get_contents(
+    request: Request,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = Query(None, pattern="^summary$"),
+    db: Session = Depends(get_db)
+):
+    # クライアントのキャッシュが最新なら304を返す
+    etag = make_etag(content_cache.version_tag, "contents", fields, limit, cursor)
+    not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+    if not_modified:
+        return not_modified
+    
     content_service = ContentService(db)
     
+    summary = fields == "summary"
+    
     try:
-        # 公開されたコンテンツ一覧を取得
-        results = content_service.get_published_contents()
-        
-        # エンティティをレスポンスに変換
-        result_list = []
-        for content, author_name in results:
-            # カテゴリ名を取得
-            category_names = ContentService.get_category_names(content)
-            # レスポンスに変換
-            content_response = ContentResponse(
-                id=content.id,
-                title=content.title,
-                content=content.content,
-                categories=category_names,
-                is_published=content.is_published,
-                author_name=author_name,
-                created_at=content.created_at,
-                updated_at=content.updated_at
-            )
-            result_list.append(content_response)
+        # limit/cursor指定時はカーソルページング
+        if limit is not None or cursor is not None:
+            page_limit = limit or DEFAULT_PAGE_LIMIT
+            
+            def load_page():
+                results, next_cursor = content_service.get_published_contents_page(
+                    page_limit, cursor, summary
+                )
+                return dump_json({
+                    "items": to_content_list(results, summary),
+                    "next_cursor": next_cursor
+                })
+            
+            body = content_cache.get_or_load(("contents", summary, page_limit, cursor), load_page)
+            return json_bytes_response(body, response.headers)
         
-        return result_list
+        # 公開されたコンテンツ一覧を取得し、エンコード済みレスポンスとしてキャッシュ
+        body = content_cache.get_or_load(
+            ("contents", summary),
+            lambda: dump_json(to_content_list(content_service.get_published_contents(summary), summary))
+        )
+        return json_bytes_response(body, response.headers)
         
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="コンテンツ一覧の取得に失敗しました"
         )
 
+# 公開: コンテンツ全文検索（関連度順）
+@router.get("/search", response_model=ContentSearchPage)
+def search_contents(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    page: int = Query(1, ge=1),
+    per_page: int = Query(DEFAULT_PAGE_LIMIT, ge=1, le=MAX_PAGE_LIMIT),
+    fields: Optional[str] = Query(None, pattern="^summary$"),
+    db: Session = Depends(get_db)
+):
+    # クライアントのキャッシュが最新なら304を返す
+    etag = make_etag(content_cache.version_tag, "search", q, page, per_page, fields)
+    not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+    if not_modified:
+        return not_modified
+    
+    content_service = ContentService(db)
+    summary = fields == "summary"
+    
+    def load_results():
+        results, total = content_service.search_published_contents(q, page, per_page, summary)
+        return dump_json({
+            "items": to_content_list(results, summary),
+            "page": page,
+            "per_page": per_page,
+            "total": total,
+            "pages": (total + per_page - 1) // per_page
+        })
+    
+    try:
+        body = content_cache.get_or_load(("search", q, page, per_page, summary), load_results)
+        return json_bytes_response(body, response.headers)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="コンテンツの検索に失敗しました"
+        )
+
 # 公開: 個別コンテンツ取得
 @router.get("/{content_id}", response_model=ContentResponse)
-def get_content(content_id: int, db: Session = Depends(get_db)):
+def get_content(content_id: int, request: Request, response: Response, db: Session = Depends(get_db)):
+    etag = make_etag(content_cache.version_tag, "content", content_id)
     content_service = ContentService(db)
     
-    try:
+    def load_content():
         # 公開されたコンテンツを取得
         result = content_service.get_published_content_with_author(content_id)
-        
         if not result:
+            return None
+        
+        # エンティティをレスポンスに変換
+        content, author_name = result
+        return dump_json(to_content_dict(content, author_name))
+    
+    try:
+        body = content_cache.get_or_load(("content", content_id), load_content)
+        
+        if body is None:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="コンテンツが見つかりません"
             )
         
-        content, author_name = result
-        
-        # カテゴリ名を取得
-        category_names = ContentService.get_category_names(content)
+        # クライアントのキャッシュが最新なら304を返す
+        # （存在しない・非公開のコンテンツに If-None-Match: * などで304を返さないよう、取得後に判定）
+        not_modified = conditional_get(request, response, etag, content_cache.last_modified)
+        if not_modified:
+            return not_modified
         
-        # エンティティをレスポンスに変換
-        return ContentResponse(
-            id=content.id,
-            title=content.title,
-            content=content.content,
-            categories=category_names,
-            is_published=content.is_published,
-            author_name=author_name,
-            created_at=content.created_at,
-            updated_at=content.updated_at
-        )
+        return json_bytes_response(body, response.headers)
         
     except HTTPException:
         # HTTPExceptionは再スロー
@@ -1,56 +1,84 @@
 """File upload and management API endpoints."""
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from fastapi.responses import FileResponse
-import os
+from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, Query, Request, Response
+import urllib.parse
+from concurrent.futures import Future
+from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple, Union
 
 from config import settings
 from presentation.api.auth_router import require_admin, require_authenticated
-from infrastructure.models import UserModel
-from infrastructure.database import get_db
+from presentation.schemas.upload_schemas import FileInfoResponse, FilePage
+from infrastructure.cache import AuthPrincipal
+from infrastructure.database import SessionLocal, get_db
+from infrastructure.thumbnail_jobs import thumbnail_jobs, variant_token, ThumbnailQueueFullError, STATUS_MISSING, STATUS_NONE, STATUS_PENDING
+from infrastructure.variant_cache import variant_cache
 from sqlalchemy.orm import Session
-from services.file_service import FileService
+from starlette.concurrency import run_in_threadpool
+from services.file_service import FileFilter, FileService, UPLOAD_KINDS
+from services.reconcile_service import ReconcileInProgressError, reconcile_runner
 from utils.file_utils import (
     extract_original_filename, 
     is_allowed_file,
-    find_file_by_name,
-    ensure_upload_directories
+    ensure_upload_directories,
+    stream_upload_to_temp,
+    commit_upload,
+    UploadTooLargeError,
+    UnsupportedFileContentError
 )
+from utils.http_cache_utils import IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, accepted_media_types, file_response
+from utils.pagination_utils import DEFAULT_PAGE_LIMIT, MAX_PAGE_LIMIT
+from utils.response_utils import dump_json, json_bytes_response
 from utils.image_utils import (
     is_image_file,
-    create_thumbnails,
-    cleanup_thumbnails
+    find_smallest_alternative,
+    get_alternative_extensions,
+    has_alternatives,
+    ALTERNATIVE_FORMATS,
+    VARIANT_FITS
 )
 
 router = APIRouter()
 
-@router.get("/", response_model=List[Dict[str, Any]])
-async def list_files(
-    current_user: UserModel = Depends(require_authenticated),
+# サムネイル状態の待機時間の上限（秒）
+MAX_VARIANT_WAIT_SECONDS = 30
+
+# アバター一括取得で指定できるユーザー数の上限
+MAX_AVATAR_BATCH_SIZE = 100
+
+@router.get("/", response_model=Union[List[FileInfoResponse], FilePage])
+def list_files(
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_LIMIT),
+    cursor: Optional[str] = None,
+    mime_type: Optional[str] = Query(None, description="Exact MIME type, e.g. image/png"),
+    min_size: Optional[int] = Query(None, ge=0, description="Minimum file size in bytes"),
+    max_size: Optional[int] = Query(None, ge=0, description="Maximum file size in bytes"),
+    uploaded_by: Optional[int] = Query(None, description="Uploader user ID (members only see their own files)"),
+    created_from: Optional[datetime] = Query(None, description="Uploaded at or after this time"),
+    created_to: Optional[datetime] = Query(None, description="Uploaded before this time"),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
-    """Get list of uploaded files from database."""
+    """Get list of uploaded files from database, newest first."""
     file_service = FileService(db)
+    filters = FileFilter(mime_type, min_size, max_size, uploaded_by, created_from, created_to)
     
     try:
-        files = file_service.get_files_for_user(current_user)
-        file_list = []
-        
-        for file in files:
-            file_info = FileService.create_file_info_dict(file)
-            file_list.append(file_info)
-        
-        # UTC時刻でソート（タイムゾーンの問題を回避）
-        from datetime import datetime
-        
-        def parse_datetime(dt_str):
-            try:
-                return datetime.fromisoformat(dt_str.replace('Z', '+00:00'))
-            except:
-                return datetime.min
+        # limit/cursor指定時はカーソルページング
+        if limit is not None or cursor is not None:
+            files, next_cursor = file_service.get_files_for_user_page(
+                current_user, limit or DEFAULT_PAGE_LIMIT, cursor, filters
+            )
+            return json_bytes_response(dump_json({
+                "items": [FileService.create_file_info_dict(file) for file in files],
+                "next_cursor": next_cursor
+            }))
         
-        return sorted(file_list, key=lambda x: (parse_datetime(x["created_at"]), x["id"]), reverse=True)
+        # 並び順（作成日時・IDの降順）はクエリで指定済み
+        files = file_service.get_files_for_user(current_user, filters)
+        return json_bytes_response(dump_json([FileService.create_file_info_dict(file) for file in files]))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to list files: {str(e)}")
 
@@ -77,17 +105,19 @@ def _create_file_info(file_path: Path, uploader_name: str) -> Dict[str, Any]:
 @router.post("/upload")
 async def upload_image(
     file: UploadFile = File(...),
-    current_user: UserModel = Depends(require_authenticated),
+    wait_variants: float = Query(0, ge=0, le=MAX_VARIANT_WAIT_SECONDS),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
     """Upload a general image file."""
-    return await _upload_file(file, current_user, db, file_type="files")
+    return await _upload_file(file, current_user, db, file_type="files", wait_variants=wait_variants)
 
 
 @router.post("/upload/avatar")
 async def upload_avatar(
     file: UploadFile = File(...),
-    current_user: UserModel = Depends(require_authenticated),
+    wait_variants: float = Query(0, ge=0, le=MAX_VARIANT_WAIT_SECONDS),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
     """Upload an avatar image file."""
@@ -99,69 +129,53 @@ async def upload_avatar(
     # Ensure upload directories exist
     ensure_upload_directories(settings.UPLOAD_DIR)
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-    
-    # Check file size
-    if file_size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=413,
-            detail=f"File size too large. Maximum: {settings.MAX_FILE_SIZE / (1024 * 1024):.1f}MB"
-        )
-    
     # Generate unique filename for avatar
     unique_filename = FileService.generate_unique_filename(file.filename)
-    file_path = settings.UPLOAD_DIR / "avatars" / unique_filename
+    file_path = FileService.get_upload_path("avatars", unique_filename)
+    
+    # Stream file content to a temp file (size limit enforced while reading)
+    temp_path, file_size, mime_type, sha256 = await _receive_upload(file, file_path.parent, too_large_status=413)
+    created_paths = [temp_path]
     
     try:
-        # Ensure parent directory exists
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Generate thumbnails for avatar
-        thumbnails_generated = []
-        if is_image_file(file.filename):
-            try:
-                thumbnails = create_thumbnails(file_path, file_path.parent)
-                thumbnails_generated = list(thumbnails.values())
-            except Exception as e:
-                print(f"Failed to generate thumbnails for avatar {unique_filename}: {str(e)}")
+        # Move into place, or reuse the stored copy of identical content
+        file_path, blob, variants_status, thumbnail_job = await _store_upload(
+            file_service, "avatars", temp_path, file_path, file_size, mime_type, sha256, created_paths
+        )
         
-        # Remove old avatar file and thumbnails if exists
+        # Release the old avatar; its files are removed below if nothing else shares them
         existing_avatar = file_service.get_user_avatar(current_user.id)
-        if existing_avatar:
-            old_file_path = settings.UPLOAD_DIR / "avatars" / existing_avatar.filename
-            if old_file_path.exists():
-                old_file_path.unlink()
-            # Remove old thumbnails
-            cleanup_thumbnails(existing_avatar.filename, settings.UPLOAD_DIR / "avatars")
+        orphan = file_service.release_upload(existing_avatar) if existing_avatar else None
         
         # Save avatar info to database
-        mime_type = FileService.get_mime_type(file_path)
         avatar_record = file_service.save_avatar(
             user_id=current_user.id,
-            filename=unique_filename,
+            filename=file_path.name,
             original_filename=file.filename,
             file_size=file_size,
-            mime_type=mime_type
+            mime_type=mime_type,
+            blob_id=blob.id if blob else None
         )
+        _apply_finished_metadata(file_service, "avatars", file_path.name, thumbnail_job)
+        if orphan and orphan != file_path.name:
+            FileService.delete_upload_files("avatars", orphan)
         
         return {
-            "filename": unique_filename,
+            "filename": file_path.name,
             "original_filename": file.filename,
-            "url": f"/uploads/avatars/{unique_filename}",
-            "size": file_size
+            "url": f"/uploads/avatars/{file_path.name}",
+            "size": file_size,
+            **(await _variants_report("avatars", file_path, variants_status, wait_variants, thumbnail_job))
         }
     
+    except ThumbnailQueueFullError:
+        db.rollback()
+        _remove_paths(*created_paths)
+        raise _thumbnail_queue_full()
     except Exception as e:
         db.rollback()
         # Remove file if it was saved
-        if file_path.exists():
-            file_path.unlink()
+        _remove_paths(*created_paths)
         raise HTTPException(
             status_code=500,
             detail=f"Failed to upload avatar: {str(e)}"
@@ -169,59 +183,52 @@ async def upload_avatar(
 
 
 @router.get("/avatar/{user_id}")
-async def get_user_avatar(
+def get_user_avatar(
     user_id: int,
     db: Session = Depends(get_db)
 ):
     """Get user's avatar information (public access)."""
-    file_service = FileService(db)
-    
-    avatar = file_service.get_user_avatar(user_id)
-    
-    if not avatar:
-        return {"avatar_url": None}
+    avatar_info = FileService(db).get_avatar_infos([user_id])[user_id]
+    return avatar_info or {"avatar_url": None}
+
+
+@router.get("/avatars")
+def get_user_avatars(
+    user_ids: str = Query(..., description=f"Comma-separated user IDs (at most {MAX_AVATAR_BATCH_SIZE})"),
+    db: Session = Depends(get_db)
+):
+    """Get avatar information of several users at once, keyed by user ID (public access)."""
+    try:
+        ids = [int(user_id) for user_id in user_ids.split(",") if user_id.strip()]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="user_ids must be comma-separated integers")
+    if len(ids) > MAX_AVATAR_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"Too many user_ids. Maximum: {MAX_AVATAR_BATCH_SIZE}")
     
-    return {
-        "avatar_url": f"/uploads/avatars/{avatar.filename}",
-        "original_filename": avatar.original_filename,
-        "file_size": avatar.file_size,
-        "updated_at": avatar.updated_at.isoformat()
-    }
+    avatar_infos = FileService(db).get_avatar_infos(ids)
+    return {str(user_id): info or {"avatar_url": None} for user_id, info in avatar_infos.items()}
 
 
 @router.delete("/avatar")
 async def delete_avatar(
-    current_user: UserModel = Depends(require_authenticated),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
     """Delete user's avatar."""
     file_service = FileService(db)
     
     try:
-        # 現在のアバターを取得
-        avatar = file_service.get_user_avatar(current_user.id)
-        
-        if not avatar:
+        # データベースから削除（論理削除）、他から共有されていなければファイル・サムネイルも削除
+        if not file_service.delete_avatar(current_user.id):
             raise HTTPException(
                 status_code=404,
                 detail="Avatar not found"
             )
         
-        # ファイルシステムからファイルを削除
-        avatar_path = settings.UPLOAD_DIR / "avatars" / avatar.filename
-        if avatar_path.exists():
-            avatar_path.unlink()
-        
-        # サムネイルも削除
-        cleanup_thumbnails(avatar.filename, settings.UPLOAD_DIR / "avatars")
-        
-        # データベースから削除（論理削除）
-        from datetime import datetime, timezone
-        avatar.deleted_at = datetime.now(timezone.utc)
-        db.commit()
-        
         return {"message": "Avatar deleted successfully"}
         
+    except HTTPException:
+        raise
     except Exception as e:
         db.rollback()
         raise HTTPException(
@@ -232,9 +239,10 @@ async def delete_avatar(
 
 async def _upload_file(
     file: UploadFile,
-    current_user: UserModel,
+    current_user: AuthPrincipal,
     db: Session,
-    file_type: str = "files"
+    file_type: str = "files",
+    wait_variants: float = 0
 ):
     """Common file upload logic."""
     file_service = FileService(db)
@@ -245,66 +253,192 @@ async def _upload_file(
     # Ensure upload directories exist
     ensure_upload_directories(settings.UPLOAD_DIR)
     
-    # Read file content
-    content = await file.read()
-    file_size = len(content)
-    
-    # Check file size
-    if file_size > settings.MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File size too large. Maximum: {settings.MAX_FILE_SIZE / (1024 * 1024):.1f}MB"
-        )
-    
     # Generate unique filename
     unique_filename = FileService.generate_unique_filename(file.filename)
-    file_path = settings.UPLOAD_DIR / "files" / unique_filename
+    file_path = FileService.get_upload_path("files", unique_filename)
+    
+    # Stream file content to a temp file (size limit enforced while reading)
+    temp_path, file_size, mime_type, sha256 = await _receive_upload(file, file_path.parent, too_large_status=400)
+    created_paths = [temp_path]
     
     try:
-        # Ensure parent directory exists
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        
-        # Save file
-        with open(file_path, "wb") as buffer:
-            buffer.write(content)
-        
-        # Generate thumbnails for image files
-        thumbnails_generated = []
-        if is_image_file(file.filename):
-            try:
-                thumbnails = create_thumbnails(file_path, file_path.parent)
-                thumbnails_generated = list(thumbnails.values())
-            except Exception as e:
-                # サムネイル生成失敗時はログに記録するが処理は継続
-                print(f"Failed to generate thumbnails for {unique_filename}: {str(e)}")
+        # Move into place, or reuse the stored copy of identical content
+        file_path, blob, variants_status, thumbnail_job = await _store_upload(
+            file_service, "files", temp_path, file_path, file_size, mime_type, sha256, created_paths
+        )
         
         # Save file info to database
-        mime_type = FileService.get_mime_type(file_path)
         file_record = file_service.save_file(
-            filename=unique_filename,
+            filename=file_path.name,
             original_filename=file.filename,
             file_size=file_size,
             mime_type=mime_type,
-            uploaded_by=current_user.id
+            uploaded_by=current_user.id,
+            blob_id=blob.id if blob else None
         )
+        _apply_finished_metadata(file_service, "files", file_path.name, thumbnail_job)
         
         return {
-            "filename": unique_filename,
+            "filename": file_path.name,
             "original_filename": file.filename,
-            "url": f"/uploads/files/{unique_filename}",
-            "size": file_size
+            "url": f"/uploads/files/{file_path.name}",
+            "size": file_size,
+            **(await _variants_report("files", file_path, variants_status, wait_variants, thumbnail_job))
         }
     
+    except ThumbnailQueueFullError:
+        db.rollback()
+        _remove_paths(*created_paths)
+        raise _thumbnail_queue_full()
     except Exception as e:
         # Clean up on failure
-        if file_path.exists():
-            os.remove(file_path)
+        db.rollback()
+        _remove_paths(*created_paths)
         raise HTTPException(
             status_code=500, 
             detail=f"Failed to save file: {str(e)}"
         )
 
 
+async def _receive_upload(file: UploadFile, directory: Path, too_large_status: int):
+    """Stream an upload to a temp file in directory, mapping errors to HTTP responses."""
+    try:
+        return await stream_upload_to_temp(file, directory, settings.MAX_FILE_SIZE)
+    except UploadTooLargeError:
+        raise HTTPException(
+            status_code=too_large_status,
+            detail=f"File size too large. Maximum: {settings.MAX_FILE_SIZE / (1024 * 1024):.1f}MB"
+        )
+    except UnsupportedFileContentError:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported file content. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
+        )
+
+
+async def _store_upload(
+    file_service: FileService,
+    kind: str,
+    temp_path: Path,
+    file_path: Path,
+    file_size: int,
+    mime_type: str,
+    sha256: str,
+    created_paths: List[Path]
+) -> Tuple[Path, Any, str, Optional[Future]]:
+    """
+    Put a streamed upload in place, sharing the stored copy of identical content.
+
+    When a blob with the same SHA-256 exists, its reference count is raised
+    and the temp file discarded, so the bytes are stored and thumbnailed once.
+    Otherwise the temp file is moved to file_path and registered as a new blob.
+    Paths this call creates are appended to created_paths for cleanup on error.
+
+    Returns:
+        (stored path, blob or None, initial variant status, thumbnail job)
+    """
+    blob = file_service.acquire_blob(kind, sha256)
+    if blob is not None:
+        existing_path = FileService.find_upload_path(kind, blob.filename)
+        if existing_path is not None:
+            await run_in_threadpool(_remove_paths, temp_path)
+            status = thumbnail_jobs.get_status(kind, existing_path)["status"]
+            if status != STATUS_MISSING:
+                return existing_path, blob, status, None
+            # サムネイルが失われている場合のみ生成し直す
+            return (existing_path, blob) + _queue_thumbnails(kind, existing_path)
+        # 記録はあるが実ファイルが失われている場合は今回の内容で復元する
+        file_path = FileService.get_upload_path(kind, blob.filename)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+    
+    # Move into place atomically
+    await commit_upload(temp_path, file_path)
+    created_paths.append(file_path)
+    
+    # Queue thumbnail generation for image files (runs in a worker process)
+    variants_status, thumbnail_job = _queue_thumbnails(kind, file_path)
+    
+    if blob is None:
+        blob = file_service.register_blob(kind, sha256, file_path.name, file_size, mime_type)
+    return file_path, blob, variants_status, thumbnail_job
+
+
+def _queue_thumbnails(kind: str, file_path: Path) -> Tuple[str, Optional[Future]]:
+    """Queue thumbnail generation and return the initial variant status and the job."""
+    if not is_image_file(file_path.name):
+        return STATUS_NONE, None
+    return STATUS_PENDING, thumbnail_jobs.submit(kind, file_path, on_complete=_store_image_metadata)
+
+
+def _store_image_metadata(kind: str, filename: str, result) -> None:
+    """Save the dimensions/placeholder of a finished thumbnail job (runs on a pool thread)."""
+    _, metadata = result
+    db = SessionLocal()
+    try:
+        FileService(db).update_image_metadata(kind, filename, metadata)
+    finally:
+        db.close()
+
+
+def _apply_finished_metadata(file_service: FileService, kind: str, filename: str, job: Optional[Future]) -> None:
+    """
+    Save the metadata of a job that finished before the upload's row was committed.
+
+    The job's own callback cannot find the row in that case; otherwise the
+    callback runs after the commit and this is a no-op.
+    """
+    if job is None or not job.done() or job.cancelled() or job.exception() is not None:
+        return
+    _, metadata = job.result()
+    file_service.update_image_metadata(kind, filename, metadata)
+
+
+async def _variants_report(
+    kind: str,
+    file_path: Path,
+    variants_status: str,
+    wait: float,
+    job: Optional[Future]
+) -> Dict[str, Any]:
+    """
+    Build the variant part of an upload response.
+
+    With wait > 0 the thumbnails are awaited so the response can include their
+    versioned URLs, the bytes saved by each WebP/AVIF copy and the image
+    dimensions/placeholder; otherwise poll variants_url for them.
+    """
+    report: Dict[str, Any] = {
+        "variants_status": variants_status,
+        "variants_url": f"/uploads/variants/{kind}/{file_path.name}"
+    }
+    if wait and variants_status == STATUS_PENDING:
+        await thumbnail_jobs.wait(kind, file_path.name, wait)
+        status = thumbnail_jobs.get_status(kind, file_path)
+        report["variants_status"] = status["status"]
+        if "variants" in status:
+            report["variants"] = status["variants"]
+        if "savings" in status:
+            report["variant_savings"] = status["savings"]
+        if job is not None and job.done() and not job.cancelled() and job.exception() is None:
+            _, metadata = job.result()
+            report.update(metadata._asdict())
+    return report
+
+
+def _thumbnail_queue_full() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Thumbnail queue is full, please retry shortly",
+        headers={"Retry-After": "5"}
+    )
+
+
+def _remove_paths(*paths: Path) -> None:
+    for path in paths:
+        if path.exists():
+            path.unlink()
+
+
 def _validate_file(file: UploadFile) -> None:
     """Validate uploaded file."""
     if not file.filename:
@@ -319,22 +453,165 @@ def _validate_file(file: UploadFile) -> None:
             detail=f"Unsupported file format. Allowed: {', '.join(settings.ALLOWED_EXTENSIONS)}"
         )
 
+@router.get("/variants/{kind}/{filename}")
+async def get_variant_status(
+    kind: str,
+    filename: str,
+    wait: float = Query(0, ge=0, le=MAX_VARIANT_WAIT_SECONDS),
+    current_user: AuthPrincipal = Depends(require_authenticated)
+):
+    """Get thumbnail variant status of an uploaded file, optionally waiting until it is ready."""
+    if kind not in ("files", "avatars"):
+        raise HTTPException(status_code=404, detail="File not found")
+    if "/" in filename or "\\" in filename or ".." in filename:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    
+    file_path = FileService.find_upload_path(kind, filename)
+    if not file_path:
+        raise HTTPException(status_code=404, detail="File not found")
+    
+    if wait:
+        await thumbnail_jobs.wait(kind, filename, wait)
+    
+    return thumbnail_jobs.get_status(kind, file_path)
+
+
+@router.post("/reconcile", status_code=202)
+def reconcile_uploads(
+    dry_run: bool = Query(True, description="Only report; set to false to reclaim space"),
+    batch_size: int = Query(500, ge=1, le=5000),
+    pause: float = Query(0.1, ge=0, le=10, description="Seconds to sleep between batches"),
+    min_age: int = Query(3600, ge=0, description="Skip files modified within this many seconds"),
+    purge_deleted_days: Optional[int] = Query(None, ge=1, description="Also hard-delete rows soft-deleted more than this many days ago"),
+    current_user: AuthPrincipal = Depends(require_admin)
+):
+    """
+    Start comparing the uploads tree with the files/avatars tables in the background.
+
+    Orphans and dangling rows are reported (or removed with dry_run=false);
+    poll GET /uploads/reconcile for the progress and the report. For very
+    large trees prefer `python -m scripts.reconcile_uploads`.
+    """
+    purge_before = None
+    if purge_deleted_days is not None:
+        purge_before = datetime.now(timezone.utc) - timedelta(days=purge_deleted_days)
+    
+    try:
+        return reconcile_runner.start(dry_run, batch_size, pause, min_age, purge_before)
+    except ReconcileInProgressError:
+        raise HTTPException(status_code=409, detail="Reconciliation is already running")
+
+
+@router.get("/reconcile")
+def get_reconcile_status(current_user: AuthPrincipal = Depends(require_admin)):
+    """Get the status and the report of the last reconciliation started via the API."""
+    return reconcile_runner.status()
+
+
 @router.get("/{filename:path}")
-async def get_image(filename: str):
-    """Get uploaded image file."""
+async def get_image(
+    filename: str,
+    request: Request,
+    w: Optional[int] = Query(None, description="Resize to this width (must be one of IMAGE_VARIANT_SIZES)"),
+    h: Optional[int] = Query(None, description="Resize to this height (must be one of IMAGE_VARIANT_SIZES)"),
+    fit: str = Query("contain", description="contain or cover"),
+    db: Session = Depends(get_db)
+):
+    """Get uploaded image file, optionally resized on demand."""
     if ".." in filename:
         raise HTTPException(status_code=400, detail="Invalid filename")
     
-    file_path = find_file_by_name(settings.UPLOAD_DIR, filename)
+    # DBに登録されたファイルのみ解決（結果はメモリにキャッシュ、DB・ディスクの確認はスレッドプールで行う）
+    file_path = await run_in_threadpool(FileService(db).resolve_upload_path, filename)
     if not file_path:
         raise HTTPException(status_code=404, detail="File not found")
     
-    return FileResponse(file_path)
+    # ファイル名はUUIDで元ファイルの内容は変わらないため、長期間キャッシュさせる
+    # サムネイルは作り直されることがあるため、現在の版を指定したURL（?v=）のみ長期間キャッシュさせる
+    cache_control = IMMUTABLE_CACHE_CONTROL
+    if w is None and h is None and FileService.is_thumbnail(file_path.name):
+        if request.query_params.get("v") != variant_token(file_path):
+            cache_control = REVALIDATE_CACHE_CONTROL
+    
+    # Acceptで許可されたWebP/AVIFのうち最も小さいものを返す
+    accepted_types = accepted_media_types(request.headers.get("accept"))
+    vary = None
+    if w is not None or h is not None:
+        file_path = await _get_variant(file_path, w, h, fit, accepted_types)
+        if get_alternative_extensions():
+            vary = "Accept"
+    else:
+        alternative = find_smallest_alternative(file_path, accepted_types)
+        if alternative is not None:
+            file_path = alternative[0]
+            vary = "Accept"
+        elif has_alternatives(file_path):
+            vary = "Accept"
+    
+    if settings.UPLOAD_ACCEL_REDIRECT_PREFIX:
+        return _accel_redirect_response(file_path, vary, cache_control)
+    
+    # Range/304対応
+    return file_response(request, file_path, FileService.get_mime_type(file_path), cache_control, vary)
+
+
+async def _get_variant(
+    file_path: Path,
+    width: Optional[int],
+    height: Optional[int],
+    fit: str,
+    accepted_types: set
+) -> Path:
+    """Return the on-demand resized variant of an original upload."""
+    # 任意のサイズを許すとキャッシュを使い切られるため、許可リストのサイズのみ受け付ける
+    for size in (width, height):
+        if size is not None and size not in settings.IMAGE_VARIANT_SIZES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unsupported size. Allowed: {', '.join(map(str, settings.IMAGE_VARIANT_SIZES))}"
+            )
+    if fit not in VARIANT_FITS:
+        raise HTTPException(status_code=400, detail=f"Unsupported fit. Allowed: {', '.join(VARIANT_FITS)}")
+    
+    kind = file_path.relative_to(settings.UPLOAD_DIR).parts[0]
+    if kind not in UPLOAD_KINDS or not is_image_file(file_path.name):
+        # 画像以外はリサイズしない
+        raise HTTPException(status_code=400, detail="Resizing is only supported for images")
+    
+    # 受け付け可能な次世代フォーマットがあれば優先順（AVIF, WebP）で選ぶ
+    extension = next(
+        (ext for ext in get_alternative_extensions() if ALTERNATIVE_FORMATS[ext][1] in accepted_types),
+        None
+    )
+    
+    try:
+        return await variant_cache.get(kind, file_path, width or 0, height or 0, fit, extension)
+    except ThumbnailQueueFullError:
+        raise _thumbnail_queue_full()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resize image: {str(e)}")
+
+
+def _accel_redirect_response(
+    file_path: Path,
+    vary: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL
+) -> Response:
+    """Hand the file body off to nginx via its internal uploads location."""
+    relative_path = file_path.relative_to(settings.UPLOAD_DIR).as_posix()
+    headers = {
+        "X-Accel-Redirect": f"{settings.UPLOAD_ACCEL_REDIRECT_PREFIX}/{urllib.parse.quote(relative_path)}",
+        # nginxはCache-Controlをそのまま返し、ETag/Range/304は自身で処理する
+        "Cache-Control": cache_control
+    }
+    if vary:
+        headers["Vary"] = vary
+    return Response(headers=headers, media_type=FileService.get_mime_type(file_path))
 
 @router.delete("/id/{file_id}")
 async def delete_file_by_id(
     file_id: int,
-    current_user: UserModel = Depends(require_authenticated),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
     """Delete uploaded file by ID (secure method)."""
@@ -345,18 +622,8 @@ async def delete_file_by_id(
         if not file_record:
             raise HTTPException(status_code=404, detail="File not found in database")
         
-        # Delete from filesystem if exists (ignore if not found)
-        file_path = find_file_by_name(settings.UPLOAD_DIR, file_record.filename)
-        if file_path:
-            try:
-                os.remove(file_path)
-                # Delete thumbnails if it's an image file
-                if is_image_file(file_record.filename):
-                    cleanup_thumbnails(file_record.filename, Path(file_path).parent)
-            except FileNotFoundError:
-                pass  # File already deleted, continue with database deletion
-        
-        # Delete from database (logical delete)
+        # Delete from database (logical delete); the file and thumbnails are
+        # removed from the filesystem once no other upload shares them
         result = file_service.delete_file(file_id, current_user)
         
         if result:
@@ -379,7 +646,7 @@ async def delete_file_by_id(
 @router.delete("/{filename}")
 async def delete_file_by_name(
     filename: str,
-    current_user: UserModel = Depends(require_authenticated),
+    current_user: AuthPrincipal = Depends(require_authenticated),
     db: Session = Depends(get_db)
 ):
     """Delete uploaded file by filename (legacy method - deprecated)."""
@@ -394,18 +661,8 @@ async def delete_file_by_name(
         if not file_record:
             raise HTTPException(status_code=404, detail="File not found in database")
         
-        # Delete from filesystem if exists (ignore if not found)
-        file_path = find_file_by_name(settings.UPLOAD_DIR, filename)
-        if file_path:
-            try:
-                os.remove(file_path)
-                # Delete thumbnails if it's an image file
-                if is_image_file(filename):
-                    cleanup_thumbnails(filename, Path(file_path).parent)
-            except FileNotFoundError:
-                pass  # File already deleted, continue with database deletion
-        
-        # Delete from database (logical delete)
+        # Delete from database (logical delete); the file and thumbnails are
+        # removed from the filesystem once no other upload shares them
         result = file_service.delete_file_by_filename(filename, current_user)
         
         if result:
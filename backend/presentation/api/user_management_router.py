@@ -3,12 +3,13 @@ from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 from typing import List
 
+from infrastructure.cache import AuthPrincipal, auth_cache
 from infrastructure.database import get_db
 from infrastructure.models import UserModel, UserRole
 from presentation.schemas.auth_schemas import UserResponse, UserCreate, UserUpdate
 from presentation.api.auth_router import get_current_user, require_admin
 from services.user_service import UserService
-from utils.auth_utils import hash_password
+from utils.auth_utils import hash_password_async
 from utils.response_utils import create_error_response
 
 router = APIRouter(prefix="/users", tags=["user-management"])
@@ -16,7 +17,7 @@ router = APIRouter(prefix="/users", tags=["user-management"])
 @router.get("/")
 async def list_users(
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     """
     全ユーザーの一覧を取得します。
@@ -42,7 +43,7 @@ async def list_users(
 async def create_user(
     user_data: UserCreate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     """
     新しいユーザーを作成します。
@@ -82,7 +83,7 @@ async def create_user(
     user = UserModel(
         username=user_data.username,
         email=user_data.email,
-        password_hash=hash_password(user_data.password),
+        password_hash=await hash_password_async(user_data.password),
         role=UserRole.ADMIN if user_data.role == "admin" else UserRole.MEMBER
     )
     
@@ -103,7 +104,7 @@ async def create_user(
 async def get_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     """
     特定のユーザーの情報を取得します。
@@ -135,7 +136,7 @@ async def update_user(
     user_id: int,
     user_data: UserUpdate,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     """
     ユーザー情報を更新します。
@@ -187,9 +188,10 @@ async def update_user(
         
         # パスワード更新は別途処理
         if user_data.password is not None:
-            user.password_hash = hash_password(user_data.password)
+            user.password_hash = await hash_password_async(user_data.password)
             db.commit()
             db.refresh(user)
+            auth_cache.invalidate_user(user.id)
             
     except ValueError as e:
         raise create_error_response(
@@ -210,7 +212,7 @@ async def update_user(
 async def delete_user(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: UserModel = Depends(require_admin)
+    current_user: AuthPrincipal = Depends(require_admin)
 ):
     """
     ユーザーを削除します（論理削除）。
@@ -243,6 +245,7 @@ async def delete_user(
             )
     
     # 論理削除
+    user_service = UserService(db)
     success = user_service.delete_user(user_id)
     if not success:
         raise create_error_response(
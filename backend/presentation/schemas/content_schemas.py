@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 
 class ContentCreate(BaseModel):
@@ -21,8 +21,35 @@ class ContentResponse(BaseModel):
     categories: List[str] = []
     is_published: bool
     author_name: str
+    author_avatar_url: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class ContentSummaryResponse(BaseModel):
+    id: int
+    title: str
+    excerpt: str
+    word_count: int
+    categories: List[str] = []
+    is_published: bool
+    author_name: str
+    author_avatar_url: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class ContentPage(BaseModel):
+    items: List[Union[ContentResponse, ContentSummaryResponse]]
+    next_cursor: Optional[str] = None
+
+class ContentSearchPage(BaseModel):
+    items: List[Union[ContentResponse, ContentSummaryResponse]]
+    page: int
+    per_page: int
+    total: int
+    pages: int
@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Optional, List
+from datetime import datetime
+
+class FileInfoResponse(BaseModel):
+    id: int
+    filename: str
+    original_filename: str
+    file_size: int
+    mime_type: str
+    url: str
+    width: Optional[int] = None
+    height: Optional[int] = None
+    dominant_color: Optional[str] = None
+    blurhash: Optional[str] = None
+    created_at: datetime
+    uploaded_by: Optional[int] = None
+    uploader: str
+
+class FilePage(BaseModel):
+    items: List[FileInfoResponse]
+    next_cursor: Optional[str] = None
@@ -0,0 +1,93 @@
+"""
+Backfill width/height/dominant_color/blurhash for existing image uploads.
+
+New uploads get these columns from their thumbnail job; this fills in rows
+created before migration 006 (or whose job failed). Rows are processed in
+id order in batches, each batch decoded on a process pool and committed
+separately, so the script can be interrupted and re-run at any time.
+
+Usage (from backend/):
+    python -m scripts.backfill_image_metadata [--batch-size 200] [--workers 4] [--kind files]
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from infrastructure.database import SessionLocal  # noqa: E402
+from infrastructure.models import AvatarModel, FileModel  # noqa: E402
+from services.file_service import UPLOAD_KINDS, FileService  # noqa: E402
+from utils.image_utils import is_image_file, read_image_metadata  # noqa: E402
+
+MODELS = {"files": FileModel, "avatars": AvatarModel}
+
+
+def read_metadata(path: Path):
+    """Worker: return ImageMetadata, or the error message if the file can't be read."""
+    try:
+        return read_image_metadata(path)
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def backfill(kind: str, batch_size: int, pool: ProcessPoolExecutor) -> dict:
+    model = MODELS[kind]
+    counts = {"updated": 0, "missing": 0, "failed": 0}
+    last_id = 0
+
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.query(model.id, model.filename).filter(
+                model.id > last_id,
+                model.width.is_(None),
+                model.deleted_at.is_(None)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                return counts
+            last_id = rows[-1].id
+
+            targets = []
+            for row in rows:
+                if not is_image_file(row.filename):
+                    continue
+                path = FileService.find_upload_path(kind, row.filename)
+                if path is None:
+                    counts["missing"] += 1
+                    print(f"missing  {kind}/{row.filename}")
+                    continue
+                targets.append((row, path))
+
+            for (row, path), result in zip(targets, pool.map(read_metadata, [path for _, path in targets])):
+                if isinstance(result, str):
+                    counts["failed"] += 1
+                    print(f"failed   {kind}/{row.filename}: {result}")
+                    continue
+                db.query(model).filter(model.id == row.id).update(result._asdict(), synchronize_session=False)
+                counts["updated"] += 1
+            db.commit()
+        finally:
+            db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--kind", choices=UPLOAD_KINDS, action="append", help="limit to files or avatars")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for kind in args.kind or UPLOAD_KINDS:
+            counts = backfill(kind, args.batch_size, pool)
+            print(f"{kind}: {counts['updated']} updated, {counts['missing']} missing, {counts['failed']} failed")
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
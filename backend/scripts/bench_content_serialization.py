@@ -0,0 +1,120 @@
+"""
+Benchmark content listing serialization.
+
+Compares the previous path (pydantic response models -> jsonable_encoder ->
+json.dumps) with the current one (plain dicts -> orjson) for listings of
+1k-10k rows.
+
+Usage (from backend/):
+    python -m scripts.bench_content_serialization [--rows 1000 5000 10000] [--repeat 5]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+# ベンチマークはDBに接続しないため、設定の検証を通すためのダミー値
+for name, value in {
+    "MYSQL_USER": "bench",
+    "MYSQL_PASSWORD": "bench",
+    "MYSQL_HOST": "localhost",
+    "MYSQL_PORT": "3306",
+    "MYSQL_DATABASE": "bench",
+    "JWT_SECRET_KEY": "bench",
+    "JWT_EXPIRE_HOURS": "1",
+    "CORS_ORIGINS": "http://localhost",
+    "UPLOAD_DIR": "uploads",
+}.items():
+    os.environ.setdefault(name, value)
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from presentation.api.content_router import to_content_list  # noqa: E402
+from presentation.schemas.content_schemas import ContentResponse, ContentSummaryResponse  # noqa: E402
+from services.content_service import ContentListItem  # noqa: E402
+from utils.response_utils import dump_json  # noqa: E402
+from utils.text_utils import count_words, make_excerpt  # noqa: E402
+
+
+def make_rows(count: int) -> list:
+    """Build list rows shaped like ContentService listing results."""
+    categories = [f"カテゴリ{i}" for i in range(3)]
+    body = "# 見出し\n\n" + "本文のテキストです。Some **markdown** text. " * 40
+    base = datetime(2024, 1, 1, 12, 0, 0)
+    return [
+        ContentListItem(
+            id=i + 1,
+            title=f"タイトル {i}",
+            content=body,
+            excerpt=make_excerpt(body),
+            word_count=count_words(body),
+            is_published=True,
+            author_name=f"author{i % 10}",
+            created_at=base + timedelta(minutes=i),
+            updated_at=base + timedelta(minutes=i, seconds=30),
+            categories=categories[: i % 4] or ["未分類"],
+        )
+        for i in range(count)
+    ]
+
+
+def serialize_models(rows: list, summary: bool) -> bytes:
+    """Previous path: build pydantic models and let FastAPI encode them."""
+    items = []
+    for row in rows:
+        common = dict(
+            id=row.id,
+            title=row.title,
+            categories=row.categories,
+            is_published=row.is_published,
+            author_name=row.author_name,
+            created_at=row.created_at,
+            updated_at=row.updated_at,
+        )
+        if summary:
+            items.append(ContentSummaryResponse(excerpt=row.excerpt, word_count=row.word_count, **common))
+        else:
+            items.append(ContentResponse(content=row.content, **common))
+    return JSONResponse(jsonable_encoder(items)).body
+
+
+def serialize_dicts(rows: list, summary: bool) -> bytes:
+    """Current path: build plain dicts and encode them with orjson."""
+    return dump_json(to_content_list(rows, summary))
+
+
+def measure(func, rows: list, summary: bool, repeat: int) -> float:
+    """Return the median wall time in milliseconds."""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows, summary)
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>7} {'mode':>8} {'models (ms)':>12} {'orjson (ms)':>12} {'speedup':>8} {'bytes':>10}")
+    for count in args.rows:
+        rows = make_rows(count)
+        for summary in (False, True):
+            before = measure(serialize_models, rows, summary, args.repeat)
+            after = measure(serialize_dicts, rows, summary, args.repeat)
+            size = len(serialize_dicts(rows, summary))
+            mode = "summary" if summary else "full"
+            print(f"{count:>7} {mode:>8} {before:>12.1f} {after:>12.1f} {before / after:>7.1f}x {size:>10}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Benchmark thumbnail generation on large photos.
+
+Compares the previous pipeline (full decode, rotate(), one full-size copy per
+size) with the current one (single decode, exif_transpose in place,
+large -> medium -> small cascade) on synthetic JPEGs carrying an EXIF
+orientation. Each run happens in a fresh process so peak RSS is measured per
+pipeline; the RSS of a process that only imports Pillow is reported as the
+baseline.
+
+Usage (from backend/):
+    python -m scripts.bench_thumbnails [--megapixels 12 24 48] [--repeat 3] [--with-alternatives]
+"""
+import argparse
+import json
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from PIL import ExifTags, Image  # noqa: E402
+
+from utils import image_utils  # noqa: E402
+
+PIPELINES = ("previous", "current")
+
+
+def make_photo(path: Path, megapixels: int, orientation: int) -> None:
+    """Write a 3:2 JPEG of roughly the given size with an EXIF orientation."""
+    width = int((megapixels * 1_000_000 * 3 / 2) ** 0.5)
+    height = width * 2 // 3
+    gradient = Image.linear_gradient("L").resize((width, height))
+    radial = Image.radial_gradient("L").resize((width, height))
+    noise = Image.effect_noise((width, height), 40)
+    exif = Image.Exif()
+    exif[ExifTags.Base.Orientation] = orientation
+    Image.merge("RGB", (gradient, radial, noise)).save(path, "JPEG", quality=92, exif=exif)
+
+
+def previous_create_thumbnails(image_path: Path, output_dir: Path) -> None:
+    """Previous pipeline, kept here for comparison."""
+    with Image.open(image_path) as img:
+        orientation = img.getexif().get(ExifTags.Base.Orientation)
+        if orientation == 3:
+            img = img.rotate(180, expand=True)
+        elif orientation == 6:
+            img = img.rotate(270, expand=True)
+        elif orientation == 8:
+            img = img.rotate(90, expand=True)
+
+        for size_name, dimensions in image_utils.THUMBNAIL_SIZES.items():
+            thumbnail_path = output_dir / image_utils.generate_thumbnail_filename(image_path.name, size_name[0])
+            if dimensions is None:
+                thumbnail = img.convert("RGB") if img.mode != "RGB" else img.copy()
+                thumbnail.save(thumbnail_path, "JPEG", optimize=True, quality=90)
+            else:
+                thumbnail = img.copy()
+                thumbnail.thumbnail(dimensions, Image.Resampling.LANCZOS)
+                thumbnail.save(thumbnail_path, "JPEG", optimize=True, quality=85)
+
+
+def run_child(pipeline: str, image_path: Path, output_dir: Path, with_alternatives: bool) -> None:
+    """Run one pipeline in this process and print its wall time and peak RSS as JSON."""
+    if not with_alternatives:
+        # WebP/AVIF生成は比較対象外（以前の処理には存在しない）
+        image_utils.get_alternative_extensions = lambda: []
+
+    start = time.perf_counter()
+    if pipeline == "previous":
+        previous_create_thumbnails(image_path, output_dir)
+    elif pipeline == "current":
+        image_utils.create_thumbnails(image_path, output_dir)
+    seconds = time.perf_counter() - start
+
+    # Linuxではキロバイト単位
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(json.dumps({"seconds": seconds, "max_rss_kb": max_rss_kb}))
+
+
+def spawn(pipeline: str, image_path: Path, output_dir: Path, with_alternatives: bool) -> dict:
+    command = [
+        sys.executable, "-m", "scripts.bench_thumbnails",
+        "--child", pipeline, "--input", str(image_path), "--output", str(output_dir),
+    ]
+    if with_alternatives:
+        command.append("--with-alternatives")
+    result = subprocess.run(
+        command, cwd=Path(__file__).resolve().parent.parent, check=True, capture_output=True, text=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=int, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--orientation", type=int, default=6, help="EXIF orientation of the test photos")
+    parser.add_argument("--with-alternatives", action="store_true", help="also encode WebP/AVIF copies")
+    parser.add_argument("--child", choices=PIPELINES + ("baseline",), help=argparse.SUPPRESS)
+    parser.add_argument("--input", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--output", type=Path, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.child, args.input, args.output, args.with_alternatives)
+        return
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_dir = Path(temp_dir)
+        baseline_mb = spawn("baseline", work_dir / "none.jpg", work_dir, False)["max_rss_kb"] / 1024
+        print(f"baseline RSS (interpreter + Pillow): {baseline_mb:.0f} MB")
+        print(f"{'MP':>4} {'pixels':>11} {'pipeline':>9} {'wall (ms)':>10} {'peak RSS (MB)':>14} {'over base':>10}")
+
+        for megapixels in args.megapixels:
+            image_path = work_dir / f"photo_{megapixels}mp.jpg"
+            make_photo(image_path, megapixels, args.orientation)
+            with Image.open(image_path) as img:
+                pixels = f"{img.width}x{img.height}"
+
+            for pipeline in PIPELINES:
+                runs = [spawn(pipeline, image_path, work_dir, args.with_alternatives) for _ in range(args.repeat)]
+                wall_ms = statistics.median(run["seconds"] for run in runs) * 1000
+                peak_mb = max(run["max_rss_kb"] for run in runs) / 1024
+                print(
+                    f"{megapixels:>4} {pixels:>11} {pipeline:>9} {wall_ms:>10.0f} "
+                    f"{peak_mb:>14.0f} {peak_mb - baseline_mb:>10.0f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+EXPLAIN the read queries issued by the service layer and fail on full scans.
+
+Each read-only service method is executed against the configured MySQL
+database; the SELECT statements it sends are captured and re-run with
+EXPLAIN. The script exits with status 1 if any plan row has type ALL.
+
+The optimizer may legitimately prefer a full scan on nearly empty tables,
+so run this against a database with representative data, or pass
+--allow-table for tables that are known to stay tiny.
+
+Usage (from backend/):
+    python -m scripts.explain_queries [--allow-table users] [--verbose]
+"""
+import argparse
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from sqlalchemy import event  # noqa: E402
+
+from infrastructure.database import SessionLocal, engine  # noqa: E402
+from infrastructure.models import ContentModel, CategoryModel, FileModel, UserModel, UserRole  # noqa: E402
+from services.category_service import CategoryService  # noqa: E402
+from services.content_service import ContentService  # noqa: E402
+from services.file_service import FileService  # noqa: E402
+from services.user_service import UserService  # noqa: E402
+from utils.pagination_utils import encode_cursor  # noqa: E402
+
+
+def build_cases(db) -> list:
+    """Return (name, callable) pairs covering the service read paths."""
+    content = db.query(ContentModel).filter(ContentModel.deleted_at.is_(None)).first()
+    category = db.query(CategoryModel).filter(CategoryModel.deleted_at.is_(None)).first()
+    file = db.query(FileModel).filter(FileModel.deleted_at.is_(None)).first()
+    user = db.query(UserModel).filter(UserModel.deleted_at.is_(None)).first()
+
+    # サービスは role / id しか参照しないため、実ユーザーがいなくても動作する
+    user_id = user.id if user else 1
+    admin = SimpleNamespace(id=user_id, role=UserRole.ADMIN)
+    member = SimpleNamespace(id=user_id, role=UserRole.MEMBER)
+    content_id = content.id if content else 1
+    category_id = category.id if category else 1
+    filename = file.filename if file else "missing.png"
+    cursor = encode_cursor(content.created_at, content.id) if content else None
+
+    contents = ContentService(db)
+    categories = CategoryService(db)
+    files = FileService(db)
+    users = UserService(db)
+
+    cases = [
+        ("contents.published", lambda: contents.get_published_contents()),
+        ("contents.published_summary", lambda: contents.get_published_contents(summary=True)),
+        ("contents.published_page", lambda: contents.get_published_contents_page(20, cursor)),
+        ("contents.admin", lambda: contents.get_all_contents_for_admin(admin)),
+        ("contents.admin_page", lambda: contents.get_all_contents_for_admin_page(admin, 20, cursor)),
+        ("contents.member", lambda: contents.get_all_contents_for_admin(member)),
+        ("contents.member_page", lambda: contents.get_all_contents_for_admin_page(member, 20, cursor)),
+        ("contents.category_names", lambda: contents.get_category_names_by_content_ids([content_id])),
+        ("contents.by_id", lambda: contents.get_content_by_id(content_id)),
+        ("contents.published_by_id", lambda: contents.get_published_content_with_author(content_id)),
+        ("contents.search", lambda: contents.search_published_contents("test")),
+        ("contents.categories", lambda: contents.get_categories()),
+        ("categories.all", lambda: categories.get_all_categories()),
+        ("files.admin", lambda: files.get_files_for_user(admin)),
+        ("files.member", lambda: files.get_files_for_user(member)),
+        ("files.by_id", lambda: files.get_file_by_id(file.id if file else 1)),
+        ("files.by_filename", lambda: files.get_file_by_filename(filename)),
+        ("avatars.by_user", lambda: files.get_user_avatar(user_id)),
+        ("users.by_email", lambda: users.get_user_by_email(user.email if user else "missing@example.com")),
+        ("users.by_id", lambda: users.get_user_by_id(user_id)),
+        ("users.all", lambda: users.get_all_users()),
+    ]
+    if category:
+        cases += [
+            ("categories.contents", lambda: categories.get_category_contents(category_id)),
+            ("categories.contents_page", lambda: categories.get_category_contents_page(category_id, 20, cursor)),
+        ]
+    return cases
+
+
+def capture_selects(func) -> list:
+    """Run func and return the (statement, parameters) of every SELECT it issued."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            captured.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        func()
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+    return captured
+
+
+def explain(db, statement: str, parameters) -> list:
+    """Return EXPLAIN rows as dicts."""
+    result = db.connection().exec_driver_sql("EXPLAIN " + statement, parameters)
+    keys = list(result.keys())
+    return [dict(zip(keys, row)) for row in result]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--allow-table", action="append", default=[], help="table allowed to be full-scanned")
+    parser.add_argument("--verbose", action="store_true", help="print every plan row")
+    args = parser.parse_args()
+
+    if engine.dialect.name != "mysql":
+        print("explain_queries requires MySQL")
+        sys.exit(2)
+
+    db = SessionLocal()
+    failures = []
+    try:
+        for name, func in build_cases(db):
+            for statement, parameters in capture_selects(func):
+                for row in explain(db, statement, parameters):
+                    table, access_type = row.get("table"), row.get("type")
+                    full_scan = access_type == "ALL" and table not in args.allow_table
+                    if args.verbose or full_scan:
+                        print(
+                            f"{'FULL SCAN' if full_scan else 'ok':9} {name:28} table={table} "
+                            f"type={access_type} key={row.get('key')} rows={row.get('rows')} extra={row.get('Extra')}"
+                        )
+                    if full_scan:
+                        failures.append((name, table))
+    finally:
+        db.rollback()
+        db.close()
+
+    if failures:
+        print(f"{len(failures)} full table scan(s) found")
+        sys.exit(1)
+    print("No full table scans found")
+
+
+if __name__ == "__main__":
+    main()
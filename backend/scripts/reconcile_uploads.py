@@ -0,0 +1,74 @@
+"""
+Report (and optionally remove) drift between the uploads tree and the database.
+
+Finds files on disk that no files/avatars row references (crashed uploads,
+thumbnails that outlived their original, stale temp files and resized
+variants), rows whose file is missing, and shared blobs whose reference
+count is off. Everything is processed in batches with an optional pause,
+and files modified within --min-age seconds are left alone, so it is safe
+to run against a live server. Nothing is changed without --apply.
+
+Usage (from backend/):
+    python -m scripts.reconcile_uploads [--apply] [--batch-size 500] [--pause 0.1] [--min-age 3600]
+                                        [--purge-deleted-days 90] [--kind files]
+"""
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from infrastructure.database import SessionLocal  # noqa: E402
+from services.file_service import UPLOAD_KINDS  # noqa: E402
+from services.reconcile_service import ReconcileService  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--apply", action="store_true", help="remove orphans and fix rows (default: dry run)")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.1, help="seconds to sleep between batches")
+    parser.add_argument("--min-age", type=float, default=3600, help="skip files modified within this many seconds")
+    parser.add_argument("--purge-deleted-days", type=int, help="hard-delete rows soft-deleted more than N days ago")
+    parser.add_argument("--kind", choices=UPLOAD_KINDS, action="append", help="limit to files or avatars")
+    args = parser.parse_args()
+
+    purge_before = None
+    if args.purge_deleted_days is not None:
+        purge_before = datetime.now(timezone.utc) - timedelta(days=args.purge_deleted_days)
+
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        report = ReconcileService(db, args.batch_size, args.pause, args.min_age).reconcile(
+            dry_run=not args.apply,
+            kinds=args.kind or UPLOAD_KINDS,
+            purge_deleted_before=purge_before
+        )
+    finally:
+        db.close()
+
+    for kind, counts in report["kinds"].items():
+        for item in counts["samples"]["orphan_files"]:
+            print(f"orphan   {item['path']} ({item['size']} bytes)")
+        for item in counts["samples"]["dangling_rows"]:
+            print(f"missing  {kind}/{item['filename']} (id {item['id']})")
+        for item in counts["samples"]["blob_mismatches"]:
+            print(f"refcount blob {item['blob_id']}: {item['ref_count']} stored, {item['references']} actual")
+        print(
+            f"{kind}: {counts['scanned_files']} scanned, {counts['orphan_files']} orphan files, "
+            f"{counts['temp_files']} temp files ({counts['orphan_bytes']} bytes), "
+            f"{counts['orphan_variants']} orphan variant dirs, {counts['dangling_rows']} missing files, "
+            f"{counts['blob_mismatches']} refcount mismatches, {counts['purged_rows']} old soft-deleted rows"
+        )
+        if args.apply:
+            print(f"{kind}: {counts['reclaimed_bytes']} bytes reclaimed")
+    if not args.apply:
+        print("dry run - nothing was changed (re-run with --apply)")
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Regenerate thumbnails for existing image uploads.
+
+Each row records the THUMBNAIL_VERSION its thumbnails were built with; after
+changing THUMBNAIL_SIZES or the encoder settings in utils.image_utils, bump
+THUMBNAIL_VERSION and run this script to rebuild the variants of every row
+still on an older version (or never processed). Rows are walked in id order
+in batches, rendered on a process pool and committed file by file, so the
+script can be interrupted and re-run at any time: finished rows are skipped.
+
+Usage (from backend/):
+    python -m scripts.regenerate_thumbnails [--batch-size 200] [--workers 4] [--kind files]
+"""
+import argparse
+import multiprocessing
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from sqlalchemy import distinct, func, or_
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from infrastructure.database import SessionLocal  # noqa: E402
+from infrastructure.models import AvatarModel, FileModel  # noqa: E402
+from infrastructure.variant_cache import variant_cache  # noqa: E402
+from services.file_service import UPLOAD_KINDS, FileService  # noqa: E402
+from utils.image_utils import THUMBNAIL_VERSION, create_thumbnails, is_image_file  # noqa: E402
+
+MODELS = {"files": FileModel, "avatars": AvatarModel}
+
+
+def render(path: Path):
+    """Worker: return the ImageMetadata of the rebuilt thumbnails, or the error message."""
+    try:
+        _, metadata = create_thumbnails(path, path.parent)
+        return metadata
+    except Exception as e:
+        return f"{type(e).__name__}: {e}"
+
+
+def stale_filter(model):
+    return [
+        model.deleted_at.is_(None),
+        or_(model.variant_version.is_(None), model.variant_version < THUMBNAIL_VERSION)
+    ]
+
+
+def regenerate(kind: str, batch_size: int, pool: ProcessPoolExecutor) -> dict:
+    model = MODELS[kind]
+    counts = {"regenerated": 0, "missing": 0, "failed": 0}
+    last_id = 0
+    start = time.perf_counter()
+
+    db = SessionLocal()
+    try:
+        # 画像以外の行も含む概数（進捗表示用、共有ファイルは1件として数える）
+        total = db.query(func.count(distinct(model.filename))).filter(*stale_filter(model)).scalar()
+    finally:
+        db.close()
+
+    while True:
+        db = SessionLocal()
+        try:
+            rows = db.query(model.id, model.filename).filter(
+                model.id > last_id,
+                *stale_filter(model)
+            ).order_by(model.id).limit(batch_size).all()
+            if not rows:
+                return counts
+            last_id = rows[-1].id
+
+            # 共有ファイル（upload_blobs）を参照する行は同じファイル名になるため1回だけ生成
+            targets = {}
+            for row in rows:
+                if row.filename in targets or not is_image_file(row.filename):
+                    continue
+                path = FileService.find_upload_path(kind, row.filename)
+                if path is None:
+                    counts["missing"] += 1
+                    print(f"missing  {kind}/{row.filename}")
+                    continue
+                targets[row.filename] = path
+
+            file_service = FileService(db)
+            for filename, result in zip(targets, pool.map(render, targets.values())):
+                if isinstance(result, str):
+                    counts["failed"] += 1
+                    print(f"failed   {kind}/{filename}: {result}")
+                    continue
+                # ファイルごとにコミットされるため、中断しても完了分は再処理されない
+                file_service.update_image_metadata(kind, filename, result)
+                variant_cache.discard(kind, filename)
+                counts["regenerated"] += 1
+        finally:
+            db.close()
+
+        done = counts["regenerated"] + counts["failed"]
+        elapsed = time.perf_counter() - start
+        rate = done / elapsed if elapsed else 0.0
+        eta = f"{max(total - done, 0) / rate:.0f}s" if rate else "-"
+        print(
+            f"{kind}: {done}/{total} processed, {counts['failed']} failed, "
+            f"{counts['missing']} missing, {rate:.1f} images/s, eta {eta}"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--kind", choices=UPLOAD_KINDS, action="append", help="limit to files or avatars")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+        for kind in args.kind or UPLOAD_KINDS:
+            counts = regenerate(kind, args.batch_size, pool)
+            print(f"{kind}: {counts['regenerated']} regenerated, {counts['missing']} missing, {counts['failed']} failed")
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
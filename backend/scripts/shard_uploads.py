@@ -0,0 +1,89 @@
+"""
+Move uploads from the flat layout (files/<name>) into shard directories.
+
+New uploads are written to files/ab/cd/<name> (see FileService.get_upload_dir)
+and reads fall back to the flat location per file, so this can run while the
+application is serving: each file is moved with an atomic rename, in batches
+with an optional pause between them. Thumbnails and WebP/AVIF copies follow
+their original into the same directory. Re-running only picks up what is
+still flat; the script never touches the database.
+
+Usage (from backend/):
+    python -m scripts.shard_uploads [--batch-size 500] [--pause 0.5] [--dry-run] [--kind files]
+"""
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from config import settings  # noqa: E402
+from services.file_service import UPLOAD_KINDS, FileService  # noqa: E402
+
+
+def iter_flat_files(kind: str):
+    """Yield the names of regular files directly under UPLOAD_DIR/<kind>."""
+    directory = settings.UPLOAD_DIR / kind
+    if not directory.is_dir():
+        return
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            # シャードのディレクトリ、アップロード中の一時ファイル、.gitkeepは対象外
+            if entry.name.startswith(".") or not entry.is_file(follow_symlinks=False):
+                continue
+            yield entry.name
+
+
+def shard_kind(kind: str, batch_size: int, pause: float, dry_run: bool) -> dict:
+    counts = {"moved": 0, "conflicts": 0}
+    batch = 0
+
+    for name in iter_flat_files(kind):
+        source = FileService.get_legacy_upload_path(kind, name)
+        destination = FileService.get_upload_path(kind, name)
+
+        if destination.exists():
+            # 同名のファイルが既に移動先にある場合は上書きしない
+            counts["conflicts"] += 1
+            print(f"conflict {kind}/{name} -> {destination.relative_to(settings.UPLOAD_DIR)}")
+            continue
+
+        if not dry_run:
+            destination.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.replace(source, destination)
+            except FileNotFoundError:
+                # 走査後に削除された
+                continue
+        counts["moved"] += 1
+
+        batch += 1
+        if batch >= batch_size:
+            print(f"{kind}: {counts['moved']} {'would be moved' if dry_run else 'moved'}")
+            batch = 0
+            if pause and not dry_run:
+                time.sleep(pause)
+
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.5, help="seconds to sleep between batches")
+    parser.add_argument("--dry-run", action="store_true", help="only report what would be moved")
+    parser.add_argument("--kind", choices=UPLOAD_KINDS, action="append", help="limit to files or avatars")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    for kind in args.kind or UPLOAD_KINDS:
+        counts = shard_kind(kind, args.batch_size, args.pause, args.dry_run)
+        verb = "would be moved" if args.dry_run else "moved"
+        print(f"{kind}: {counts['moved']} {verb}, {counts['conflicts']} conflicts")
+    print(f"done in {time.perf_counter() - start:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
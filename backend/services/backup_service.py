@@ -10,7 +10,10 @@ from pathlib import Path
 from sqlalchemy.orm import Session, selectinload
 from sqlalchemy import text
 
-from infrastructure.models import ContentModel, CategoryModel, UserModel, UserRole, UserTimezone, FileModel, AvatarModel
+from infrastructure.cache import auth_cache, avatar_cache, content_cache, upload_path_cache
+from infrastructure.models import ContentModel, CategoryModel, UserModel, UserRole, UserTimezone, FileModel, AvatarModel, UploadBlobModel
+from infrastructure.variant_cache import variant_cache
+from utils.text_utils import make_excerpt, count_words
 
 
 class BackupService:
@@ -67,6 +70,21 @@ class BackupService:
                 "deleted_at": content.deleted_at.isoformat() if content.deleted_at else None
             })
         
+        # 共有される実ファイル
+        blobs = self.db.query(UploadBlobModel).all()
+        blobs_data = []
+        for blob in blobs:
+            blobs_data.append({
+                "id": blob.id,
+                "kind": blob.kind,
+                "sha256": blob.sha256,
+                "filename": blob.filename,
+                "file_size": blob.file_size,
+                "mime_type": blob.mime_type,
+                "ref_count": blob.ref_count,
+                "created_at": blob.created_at.isoformat()
+            })
+        
         # ファイルデータ（削除されたものも含む）
         files = self.db.query(FileModel).all()
         files_data = []
@@ -77,6 +95,12 @@ class BackupService:
                 "original_filename": file.original_filename,
                 "file_size": file.file_size,
                 "mime_type": file.mime_type,
+                "blob_id": file.blob_id,
+                "width": file.width,
+                "height": file.height,
+                "dominant_color": file.dominant_color,
+                "blurhash": file.blurhash,
+                "variant_version": file.variant_version,
                 "uploaded_by": file.uploaded_by,
                 "created_at": file.created_at.isoformat(),
                 "deleted_at": file.deleted_at.isoformat() if file.deleted_at else None
@@ -93,6 +117,12 @@ class BackupService:
                 "original_filename": avatar.original_filename,
                 "file_size": avatar.file_size,
                 "mime_type": avatar.mime_type,
+                "blob_id": avatar.blob_id,
+                "width": avatar.width,
+                "height": avatar.height,
+                "dominant_color": avatar.dominant_color,
+                "blurhash": avatar.blurhash,
+                "variant_version": avatar.variant_version,
                 "created_at": avatar.created_at.isoformat(),
                 "updated_at": avatar.updated_at.isoformat(),
                 "deleted_at": avatar.deleted_at.isoformat() if avatar.deleted_at else None
@@ -104,6 +134,7 @@ class BackupService:
             "contents": contents_data,
             "files": files_data,
             "avatars": avatars_data,
+            "upload_blobs": blobs_data,
             "exported_at": datetime.now().isoformat()
         }
     
@@ -161,6 +192,9 @@ class BackupService:
             self.db.query(FileModel).delete()
             self.db.commit()
             
+            self.db.query(UploadBlobModel).delete()
+            self.db.commit()
+            
             self.db.query(ContentModel).delete()
             self.db.commit()
             
@@ -213,6 +247,8 @@ class BackupService:
                 id=content_data["id"],
                 title=content_data["title"],
                 content=content_data["content"],
+                excerpt=make_excerpt(content_data["content"]),
+                word_count=count_words(content_data["content"]),
                 is_published=content_data.get("is_published", False),
                 author_id=content_data["author_id"],
                 created_at=datetime.fromisoformat(content_data["created_at"]),
@@ -227,6 +263,21 @@ class BackupService:
             
             self.db.add(content)
         
+        # 共有される実ファイルを復元（ファイル・アバターから参照されるため先に作成）
+        for blob_data in data.get("upload_blobs", []):
+            blob = UploadBlobModel(
+                id=blob_data["id"],
+                kind=blob_data["kind"],
+                sha256=blob_data["sha256"],
+                filename=blob_data["filename"],
+                file_size=blob_data["file_size"],
+                mime_type=blob_data["mime_type"],
+                ref_count=blob_data["ref_count"],
+                created_at=datetime.fromisoformat(blob_data["created_at"])
+            )
+            self.db.add(blob)
+        self.db.flush()
+        
         # ファイルデータを復元
         for file_data in data.get("files", []):
             file_record = FileModel(
@@ -235,6 +286,13 @@ class BackupService:
                 original_filename=file_data["original_filename"],
                 file_size=file_data["file_size"],
                 mime_type=file_data["mime_type"],
+                # 旧バージョンのバックアップには含まれない
+                blob_id=file_data.get("blob_id"),
+                width=file_data.get("width"),
+                height=file_data.get("height"),
+                dominant_color=file_data.get("dominant_color"),
+                blurhash=file_data.get("blurhash"),
+                variant_version=file_data.get("variant_version"),
                 uploaded_by=file_data["uploaded_by"],
                 created_at=datetime.fromisoformat(file_data["created_at"]),
                 deleted_at=datetime.fromisoformat(file_data["deleted_at"]) if file_data.get("deleted_at") else None
@@ -250,6 +308,12 @@ class BackupService:
                 original_filename=avatar_data["original_filename"],
                 file_size=avatar_data["file_size"],
                 mime_type=avatar_data["mime_type"],
+                blob_id=avatar_data.get("blob_id"),
+                width=avatar_data.get("width"),
+                height=avatar_data.get("height"),
+                dominant_color=avatar_data.get("dominant_color"),
+                blurhash=avatar_data.get("blurhash"),
+                variant_version=avatar_data.get("variant_version"),
                 created_at=datetime.fromisoformat(avatar_data["created_at"]),
                 updated_at=datetime.fromisoformat(avatar_data["updated_at"]),
                 deleted_at=datetime.fromisoformat(avatar_data["deleted_at"]) if avatar_data.get("deleted_at") else None
@@ -257,6 +321,11 @@ class BackupService:
             self.db.add(avatar_record)
         
         self.db.commit()
+        content_cache.bump_version()
+        upload_path_cache.bump_version()
+        avatar_cache.bump_version()
+        # ユーザーが入れ替わるため認証キャッシュも破棄
+        auth_cache.clear()
     
     def restore_files(self, backup_zip_path: Path, upload_dir: Path) -> None:
         """バックアップからファイルを復元"""
@@ -323,6 +392,9 @@ class BackupService:
             
             # ファイルを復元
             self.restore_files(zip_file_path, upload_dir)
+            
+            # 復元前のアップロードから作られたリサイズ画像を破棄（必要になったときに作り直される）
+            variant_cache.clear()
     
     def get_backup_info(self, upload_dir: Path) -> Dict[str, Any]:
         """バックアップ情報を取得"""
@@ -337,7 +409,10 @@ class BackupService:
         
         if upload_dir.exists():
             for file_path in upload_dir.rglob('*'):
-                if file_path.is_file() and not file_path.name.startswith('.'):
+                # 隠しファイルとリサイズ画像のキャッシュ（.variant_cache）はバックアップ対象外
+                if file_path.is_file() and not any(
+                    part.startswith('.') for part in file_path.relative_to(upload_dir).parts
+                ):
                     file_count += 1
                     total_size += file_path.stat().st_size
         
@@ -1,9 +1,11 @@
 """カテゴリ関連のビジネスロジック"""
-from typing import List, Optional
-from sqlalchemy.orm import Session, selectinload
+from typing import List, Optional, Tuple
+from sqlalchemy.orm import Session
 from datetime import datetime
 
-from infrastructure.models import CategoryModel, ContentModel, UserModel
+from infrastructure.cache import content_cache
+from infrastructure.models import CategoryModel, ContentModel, content_categories
+from services.content_service import ContentService, ContentListItem
 
 
 class CategoryService:
@@ -36,6 +38,7 @@ class CategoryService:
         self.db.add(category)
         self.db.commit()
         self.db.refresh(category)
+        content_cache.bump_version()
         
         return category
     
@@ -75,6 +78,7 @@ class CategoryService:
         
         self.db.commit()
         self.db.refresh(category)
+        content_cache.bump_version()
         
         return category
     
@@ -90,6 +94,7 @@ class CategoryService:
         
         category.deleted_at = datetime.utcnow()
         self.db.commit()
+        content_cache.bump_version()
         
         return True
     
@@ -99,27 +104,37 @@ class CategoryService:
             CategoryModel.deleted_at.is_(None)
         ).order_by(CategoryModel.sort_order, CategoryModel.name).all()
     
-    def get_category_contents(self, category_id: int) -> List[tuple]:
-        """特定カテゴリのコンテンツ一覧取得"""
+    def _category_contents_query(self, category_id: int, summary: bool = False):
+        """特定カテゴリの公開コンテンツ一覧のベースクエリ"""
         # カテゴリが存在するかチェック
         category = self.get_category_by_id(category_id)
         if not category:
             raise ValueError("カテゴリが見つかりません")
         
         # カテゴリに属する公開コンテンツを取得
-        results = self.db.query(ContentModel, UserModel.username).join(
-            UserModel, ContentModel.author_id == UserModel.id
-        ).join(
-            ContentModel.categories
-        ).options(
-            selectinload(ContentModel.categories)
-        ).filter(
-            CategoryModel.id == category_id,
+        return ContentService.list_select(summary).join(
+            content_categories, content_categories.c.content_id == ContentModel.id
+        ).where(
+            content_categories.c.category_id == category_id,
             ContentModel.deleted_at.is_(None),
             ContentModel.is_published == True
-        ).order_by(ContentModel.created_at.desc()).all()
-        
-        return results
+        )
+    
+    def get_category_contents(self, category_id: int, summary: bool = False) -> List[ContentListItem]:
+        """特定カテゴリのコンテンツ一覧取得"""
+        return ContentService(self.db).fetch_list_items(
+            self._category_contents_query(category_id, summary).order_by(ContentModel.created_at.desc())
+        )
+    
+    def get_category_contents_page(
+        self,
+        category_id: int,
+        limit: int,
+        cursor: Optional[str] = None,
+        summary: bool = False
+    ) -> Tuple[List[ContentListItem], Optional[str]]:
+        """特定カテゴリのコンテンツ一覧取得（カーソルページング）"""
+        return ContentService(self.db).paginate(self._category_contents_query(category_id, summary), limit, cursor)
     
     def update_category_sort_orders(self, category_orders: List[dict]) -> bool:
         """カテゴリの並び順を一括更新"""
@@ -136,6 +151,7 @@ class CategoryService:
                     category.sort_order = sort_order
             
             self.db.commit()
+            content_cache.bump_version()
             return True
         except Exception:
             self.db.rollback()
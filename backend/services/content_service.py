@@ -1,9 +1,40 @@
 """コンテンツ関連のビジネスロジック"""
-from typing import List, Optional
+import threading
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional, Tuple
+from sqlalchemy import func, select
+from sqlalchemy.dialects.mysql import match
 from sqlalchemy.orm import Session, selectinload
 from datetime import datetime
 
-from infrastructure.models import ContentModel, CategoryModel, UserModel, UserRole
+from infrastructure.cache import AuthPrincipal, content_cache
+from infrastructure.models import AvatarModel, ContentModel, CategoryModel, UserModel, UserRole, content_categories
+from utils.pagination_utils import keyset_paginate
+from utils.search_utils import NgramSearchIndex
+from utils.text_utils import make_excerpt, count_words
+
+# MySQL以外（SQLiteでのテスト実行など）で使う全文検索インデックス
+# (コンテンツバージョン, インデックス)
+_fallback_search_index: Optional[Tuple[int, NgramSearchIndex]] = None
+_fallback_search_lock = threading.Lock()
+
+# カテゴリ未設定のコンテンツに表示するカテゴリ名
+UNCATEGORIZED = "未分類"
+
+
+class ContentListItem(NamedTuple):
+    """一覧表示用の読み取り専用コンテンツ行（ORMインスタンスを生成しない）"""
+    id: int
+    title: str
+    content: Optional[str]
+    excerpt: Optional[str]
+    word_count: int
+    is_published: bool
+    author_name: str
+    created_at: datetime
+    updated_at: Optional[datetime]
+    categories: List[str]
+    author_avatar_url: Optional[str] = None
 
 
 class ContentService:
@@ -22,6 +53,8 @@ class ContentService:
         content_model = ContentModel(
             title=title,
             content=content,
+            excerpt=make_excerpt(content),
+            word_count=count_words(content),
             is_published=is_published,
             author_id=author_id
         )
@@ -40,6 +73,8 @@ class ContentService:
             self.db.commit()
             self.db.refresh(content_model)
         
+        content_cache.bump_version()
+        
         return content_model
     
     def get_content_by_id(self, content_id: int) -> Optional[ContentModel]:
@@ -68,7 +103,7 @@ class ContentService:
         content: Optional[str] = None,
         category_ids: Optional[List[int]] = None,
         is_published: Optional[bool] = None,
-        current_user: UserModel = None
+        current_user: AuthPrincipal = None
     ) -> ContentModel:
         """コンテンツ更新"""
         content_model = self.get_content_by_id(content_id)
@@ -84,6 +119,8 @@ class ContentService:
             content_model.title = title
         if content is not None:
             content_model.content = content
+            content_model.excerpt = make_excerpt(content)
+            content_model.word_count = count_words(content)
         if is_published is not None:
             content_model.is_published = is_published
         
@@ -100,10 +137,11 @@ class ContentService:
         
         self.db.commit()
         self.db.refresh(content_model)
+        content_cache.bump_version()
         
         return content_model
     
-    def delete_content(self, content_id: int, current_user: UserModel) -> bool:
+    def delete_content(self, content_id: int, current_user: AuthPrincipal) -> bool:
         """コンテンツ削除（論理削除）"""
         content_model = self.get_content_by_id(content_id)
         if not content_model:
@@ -115,43 +153,199 @@ class ContentService:
         
         content_model.deleted_at = datetime.utcnow()
         self.db.commit()
+        content_cache.bump_version()
         
         return True
     
-    def get_all_contents_for_admin(self, current_user: UserModel) -> List[tuple]:
-        """管理画面用コンテンツ一覧（権限に応じてフィルタリング）"""
-        query = self.db.query(ContentModel, UserModel.username).join(
-            UserModel, ContentModel.author_id == UserModel.id
-        ).options(
-            selectinload(ContentModel.categories)
-        ).filter(
+    def _admin_contents_query(self, current_user: AuthPrincipal, summary: bool = False):
+        """管理画面用コンテンツ一覧のベースクエリ（権限に応じてフィルタリング）"""
+        query = self.list_select(summary).where(
             ContentModel.deleted_at.is_(None)
         )
         
         # 権限に応じたフィルタリング
-        if current_user.role == UserRole.ADMIN:
-            # 管理者は全てのコンテンツを表示
-            results = query.order_by(ContentModel.created_at.desc()).all()
-        else:
+        if current_user.role != UserRole.ADMIN:
             # メンバーは自分のコンテンツのみ表示
-            results = query.filter(
-                ContentModel.author_id == current_user.id
-            ).order_by(ContentModel.created_at.desc()).all()
+            query = query.where(ContentModel.author_id == current_user.id)
         
-        return results
+        return query
     
-    def get_published_contents(self) -> List[tuple]:
-        """公開コンテンツ一覧（一般ユーザー用）"""
-        results = self.db.query(ContentModel, UserModel.username).join(
-            UserModel, ContentModel.author_id == UserModel.id
-        ).options(
-            selectinload(ContentModel.categories)
-        ).filter(
+    def get_all_contents_for_admin(self, current_user: AuthPrincipal, summary: bool = False) -> List[ContentListItem]:
+        """管理画面用コンテンツ一覧（権限に応じてフィルタリング）"""
+        return self.fetch_list_items(
+            self._admin_contents_query(current_user, summary).order_by(ContentModel.created_at.desc())
+        )
+    
+    def get_all_contents_for_admin_page(
+        self,
+        current_user: AuthPrincipal,
+        limit: int,
+        cursor: Optional[str] = None,
+        summary: bool = False
+    ) -> Tuple[List[ContentListItem], Optional[str]]:
+        """管理画面用コンテンツ一覧（カーソルページング）"""
+        return self.paginate(self._admin_contents_query(current_user, summary), limit, cursor)
+    
+    def _published_contents_query(self, summary: bool = False):
+        """公開コンテンツ一覧のベースクエリ"""
+        return self.list_select(summary).where(
             ContentModel.deleted_at.is_(None),
             ContentModel.is_published == True
-        ).order_by(ContentModel.created_at.desc()).all()
+        )
+    
+    def get_published_contents(self, summary: bool = False) -> List[ContentListItem]:
+        """公開コンテンツ一覧（一般ユーザー用）"""
+        return self.fetch_list_items(
+            self._published_contents_query(summary).order_by(ContentModel.created_at.desc())
+        )
+    
+    def get_published_contents_page(
+        self,
+        limit: int,
+        cursor: Optional[str] = None,
+        summary: bool = False
+    ) -> Tuple[List[ContentListItem], Optional[str]]:
+        """公開コンテンツ一覧（カーソルページング）"""
+        return self.paginate(self._published_contents_query(summary), limit, cursor)
+    
+    @staticmethod
+    def list_select(summary: bool = False):
+        """一覧取得用のCore select（summary時は本文カラムを読み込まない）"""
+        # 作者のアバターはサブクエリで取得（結合で一覧の行が増えないように）
+        author_avatar = select(AvatarModel.filename).where(
+            AvatarModel.user_id == ContentModel.author_id,
+            AvatarModel.deleted_at.is_(None)
+        ).limit(1).scalar_subquery()
+        columns = [
+            ContentModel.id,
+            ContentModel.title,
+            ContentModel.excerpt,
+            ContentModel.word_count,
+            ContentModel.is_published,
+            ContentModel.created_at,
+            ContentModel.updated_at,
+            UserModel.username.label("author_name"),
+            author_avatar.label("author_avatar_filename"),
+        ]
+        if not summary:
+            columns.append(ContentModel.content)
+        return select(*columns).join_from(
+            ContentModel, UserModel, ContentModel.author_id == UserModel.id
+        )
+    
+    def fetch_list_items(self, statement) -> List[ContentListItem]:
+        """一覧用selectを実行してDTOのリストに変換"""
+        return self.to_list_items(self.db.execute(statement).all())
+    
+    def to_list_items(self, rows: list) -> List[ContentListItem]:
+        """list_select() の結果行にカテゴリ名を付けてDTOに変換"""
+        category_names = self.get_category_names_by_content_ids([row.id for row in rows])
+        return [
+            ContentListItem(
+                id=row.id,
+                title=row.title,
+                content=getattr(row, "content", None),
+                excerpt=row.excerpt,
+                word_count=row.word_count,
+                is_published=row.is_published,
+                author_name=row.author_name,
+                created_at=row.created_at,
+                updated_at=row.updated_at,
+                categories=category_names.get(row.id) or [UNCATEGORIZED],
+                author_avatar_url=(
+                    f"/uploads/avatars/{row.author_avatar_filename}" if row.author_avatar_filename else None
+                )
+            )
+            for row in rows
+        ]
+    
+    def get_category_names_by_content_ids(self, content_ids: List[int]) -> Dict[int, List[str]]:
+        """複数コンテンツのカテゴリ名を1回のクエリでまとめて取得"""
+        if not content_ids:
+            return {}
+        
+        rows = self.db.execute(
+            select(content_categories.c.content_id, CategoryModel.name).join_from(
+                content_categories, CategoryModel, content_categories.c.category_id == CategoryModel.id
+            ).where(
+                content_categories.c.content_id.in_(content_ids),
+                CategoryModel.deleted_at.is_(None)
+            ).order_by(content_categories.c.content_id, CategoryModel.id)
+        ).all()
         
-        return results
+        category_names: Dict[int, List[str]] = defaultdict(list)
+        for content_id, name in rows:
+            category_names[content_id].append(name)
+        return category_names
+    
+    def paginate(self, query, limit: int, cursor: Optional[str] = None) -> Tuple[List[ContentListItem], Optional[str]]:
+        """list_select() ベースのクエリを (created_at, id) のキーセットでページング"""
+        rows, next_cursor = keyset_paginate(
+            query,
+            ContentModel.created_at,
+            ContentModel.id,
+            limit,
+            cursor,
+            key=lambda row: (row.created_at, row.id),
+            fetch=lambda statement: self.db.execute(statement).all()
+        )
+        return self.to_list_items(rows), next_cursor
+    
+    def search_published_contents(
+        self,
+        query: str,
+        page: int = 1,
+        per_page: int = 20,
+        summary: bool = False
+    ) -> Tuple[List[ContentListItem], int]:
+        """公開コンテンツの全文検索（関連度順、ページ番号指定）"""
+        offset = (page - 1) * per_page
+        
+        if self.db.bind.dialect.name == "mysql":
+            # FULLTEXTインデックス（ngramパーサー）による検索
+            relevance = match(ContentModel.title, ContentModel.content, against=query).in_natural_language_mode()
+            total = self.db.execute(
+                select(func.count(ContentModel.id)).where(
+                    ContentModel.deleted_at.is_(None),
+                    ContentModel.is_published == True,
+                    relevance
+                )
+            ).scalar_one()
+            results = self.fetch_list_items(
+                self._published_contents_query(summary).where(relevance).order_by(
+                    relevance.desc(), ContentModel.created_at.desc(), ContentModel.id.desc()
+                ).offset(offset).limit(per_page)
+            )
+            return results, total
+        
+        # フォールバック: Python実装のn-gramインデックス
+        ranked_ids = [content_id for content_id, _ in self._get_fallback_search_index().search(query)]
+        page_ids = ranked_ids[offset:offset + per_page]
+        if not page_ids:
+            return [], len(ranked_ids)
+        
+        rows = self.fetch_list_items(
+            self._published_contents_query(summary).where(ContentModel.id.in_(page_ids))
+        )
+        position = {content_id: index for index, content_id in enumerate(page_ids)}
+        rows.sort(key=lambda row: position[row.id])
+        return rows, len(ranked_ids)
+    
+    def _get_fallback_search_index(self) -> NgramSearchIndex:
+        """コンテンツバージョンに対応するフォールバック検索インデックスを取得（更新時に再構築）"""
+        global _fallback_search_index
+        
+        with _fallback_search_lock:
+            version = content_cache.version
+            if _fallback_search_index is None or _fallback_search_index[0] != version:
+                documents = self.db.query(
+                    ContentModel.id, ContentModel.title, ContentModel.content
+                ).filter(
+                    ContentModel.deleted_at.is_(None),
+                    ContentModel.is_published == True
+                ).all()
+                _fallback_search_index = (version, NgramSearchIndex(documents))
+            return _fallback_search_index[1]
     
     def get_published_content_with_author(self, content_id: int) -> Optional[tuple]:
         """公開コンテンツを作者名付きで取得"""
@@ -179,5 +373,5 @@ class ContentService:
         """コンテンツのカテゴリ名を取得し、空の場合は「未分類」を返す"""
         category_names = [cat.name for cat in content_model.categories if cat.deleted_at is None]
         if not category_names:
-            category_names = ["未分類"]
+            category_names = [UNCATEGORIZED]
         return category_names
\ No newline at end of file
@@ -1,31 +1,134 @@
 """ファイル関連のビジネスロジック"""
-from typing import List, Optional, Dict, Any
+from typing import List, NamedTuple, Optional, Dict, Any, Tuple
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 from datetime import datetime, timezone
 from pathlib import Path
+import hashlib
 import os
+import re
 import uuid
 
-from infrastructure.models import FileModel, AvatarModel, UserModel, UserRole
+from config import settings
+from infrastructure.cache import AuthPrincipal, avatar_cache, content_cache, upload_path_cache
+from infrastructure.models import FileModel, AvatarModel, UploadBlobModel, UserModel, UserRole
+from infrastructure.thumbnail_jobs import thumbnail_jobs
+from infrastructure.variant_cache import variant_cache
+from utils.pagination_utils import keyset_paginate
+from utils.image_utils import (
+    ALTERNATIVE_FORMATS,
+    THUMBNAIL_VERSION,
+    ImageMetadata,
+    cleanup_thumbnails,
+    generate_thumbnail_filename,
+    is_image_file
+)
+
+# アップロードの保存先サブディレクトリ
+UPLOAD_KINDS = ("files", "avatars")
+
+# サムネイルのファイル名（{元ファイル名の拡張子なし}_{s|m|l}{拡張子}）
+_THUMBNAIL_NAME_RE = re.compile(r"^(?P<stem>.+)_(?P<suffix>[sml])(?P<ext>\.[^./]+)$")
+
+
+class FileListItem(NamedTuple):
+    """ファイル一覧用の読み取り専用行（アップロードしたユーザー名を結合済み、ORMインスタンスを生成しない）"""
+    id: int
+    filename: str
+    original_filename: str
+    file_size: int
+    mime_type: str
+    width: Optional[int]
+    height: Optional[int]
+    dominant_color: Optional[str]
+    blurhash: Optional[str]
+    uploaded_by: int
+    uploader_name: Optional[str]
+    created_at: datetime
+
+
+class FileFilter(NamedTuple):
+    """ファイル一覧の絞り込み条件（Noneは条件なし）"""
+    mime_type: Optional[str] = None
+    min_size: Optional[int] = None
+    max_size: Optional[int] = None
+    uploaded_by: Optional[int] = None
+    created_from: Optional[datetime] = None
+    created_to: Optional[datetime] = None
 
 
 class FileService:
     def __init__(self, db: Session):
         self.db = db
     
-    def get_files_for_user(self, current_user: UserModel) -> List[FileModel]:
-        """ユーザーの権限に応じたファイル一覧を取得"""
-        if current_user.role == UserRole.ADMIN:
-            # 管理者は全ファイル表示（新しい順）
-            return self.db.query(FileModel).filter(
-                FileModel.deleted_at.is_(None)
-            ).order_by(FileModel.created_at.desc()).all()
-        else:
-            # メンバーは自分のファイルのみ表示（新しい順）
-            return self.db.query(FileModel).filter(
-                FileModel.deleted_at.is_(None),
-                FileModel.uploaded_by == current_user.id
-            ).order_by(FileModel.created_at.desc()).all()
+    def _files_query(self, current_user: AuthPrincipal, filters: Optional[FileFilter] = None):
+        """ファイル一覧のベースクエリ（権限と絞り込み条件を適用）"""
+        query = self.list_select().where(FileModel.deleted_at.is_(None))
+        
+        # メンバーは自分のファイルのみ表示
+        if current_user.role != UserRole.ADMIN:
+            query = query.where(FileModel.uploaded_by == current_user.id)
+        
+        if filters is not None:
+            if filters.mime_type is not None:
+                query = query.where(FileModel.mime_type == filters.mime_type)
+            if filters.min_size is not None:
+                query = query.where(FileModel.file_size >= filters.min_size)
+            if filters.max_size is not None:
+                query = query.where(FileModel.file_size <= filters.max_size)
+            if filters.uploaded_by is not None:
+                query = query.where(FileModel.uploaded_by == filters.uploaded_by)
+            if filters.created_from is not None:
+                query = query.where(FileModel.created_at >= filters.created_from)
+            if filters.created_to is not None:
+                query = query.where(FileModel.created_at < filters.created_to)
+        
+        return query
+    
+    def get_files_for_user(self, current_user: AuthPrincipal, filters: Optional[FileFilter] = None) -> List[FileListItem]:
+        """ユーザーの権限に応じたファイル一覧を取得（新しい順）"""
+        statement = self._files_query(current_user, filters).order_by(
+            FileModel.created_at.desc(), FileModel.id.desc()
+        )
+        return [FileListItem(*row) for row in self.db.execute(statement).all()]
+    
+    def get_files_for_user_page(
+        self,
+        current_user: AuthPrincipal,
+        limit: int,
+        cursor: Optional[str] = None,
+        filters: Optional[FileFilter] = None
+    ) -> Tuple[List[FileListItem], Optional[str]]:
+        """ファイル一覧（カーソルページング）"""
+        rows, next_cursor = keyset_paginate(
+            self._files_query(current_user, filters),
+            FileModel.created_at,
+            FileModel.id,
+            limit,
+            cursor,
+            key=lambda row: (row.created_at, row.id),
+            fetch=lambda statement: self.db.execute(statement).all()
+        )
+        return [FileListItem(*row) for row in rows], next_cursor
+    
+    @staticmethod
+    def list_select():
+        """一覧取得用のCore select（アップロードしたユーザー名を1回のクエリで結合）"""
+        return select(
+            FileModel.id,
+            FileModel.filename,
+            FileModel.original_filename,
+            FileModel.file_size,
+            FileModel.mime_type,
+            FileModel.width,
+            FileModel.height,
+            FileModel.dominant_color,
+            FileModel.blurhash,
+            FileModel.uploaded_by,
+            UserModel.username.label("uploader_name"),
+            FileModel.created_at,
+        ).outerjoin_from(FileModel, UserModel, FileModel.uploaded_by == UserModel.id)
     
     def save_file(
         self,
@@ -33,7 +136,8 @@ class FileService:
         original_filename: str,
         file_size: int,
         mime_type: str,
-        uploaded_by: int
+        uploaded_by: int,
+        blob_id: Optional[int] = None
     ) -> FileModel:
         """ファイル情報をデータベースに保存"""
         utc_now = datetime.now(timezone.utc)
@@ -43,12 +147,15 @@ class FileService:
             file_size=file_size,
             mime_type=mime_type,
             uploaded_by=uploaded_by,
+            blob_id=blob_id,
             created_at=utc_now
         )
+        self._inherit_image_metadata(FileModel, file_record)
         
         self.db.add(file_record)
         self.db.commit()
         self.db.refresh(file_record)
+        _upload_paths_changed("files", added=filename)
         
         return file_record
     
@@ -59,40 +166,48 @@ class FileService:
             FileModel.deleted_at.is_(None)
         ).first()
     
-    def get_file_by_filename(self, filename: str) -> Optional[FileModel]:
-        """ファイル名でファイル記録を取得"""
-        return self.db.query(FileModel).filter(
+    def get_file_by_filename(self, filename: str, uploaded_by: Optional[int] = None) -> Optional[FileModel]:
+        """ファイル名でファイル記録を取得（同じ内容のファイルは複数の記録が同じファイル名を共有する）"""
+        query = self.db.query(FileModel).filter(
             FileModel.filename == filename,
             FileModel.deleted_at.is_(None)
-        ).first()
+        )
+        if uploaded_by is not None:
+            query = query.filter(FileModel.uploaded_by == uploaded_by)
+        return query.first()
     
-    def delete_file(self, file_id: int, current_user: UserModel) -> bool:
-        """ファイル削除（論理削除）"""
+    def delete_file(self, file_id: int, current_user: AuthPrincipal) -> bool:
+        """ファイル削除（論理削除、最後の参照だった場合は実ファイルも削除）"""
         file_record = self.get_file_by_id(file_id)
         if not file_record:
             return False
         
-        # 権限チェック：管理者または作成者のみ削除可能
-        if current_user.role != UserRole.ADMIN and file_record.uploaded_by != current_user.id:
-            raise ValueError("このファイルを削除する権限がありません")
-        
-        file_record.deleted_at = datetime.now(timezone.utc)
-        self.db.commit()
-        
-        return True
+        return self._delete_file_record(file_record, current_user)
     
-    def delete_file_by_filename(self, filename: str, current_user: UserModel) -> bool:
-        """ファイル名によるファイル削除（論理削除）"""
-        file_record = self.get_file_by_filename(filename)
+    def delete_file_by_filename(self, filename: str, current_user: AuthPrincipal) -> bool:
+        """ファイル名によるファイル削除（論理削除、最後の参照だった場合は実ファイルも削除）"""
+        # 共有されている場合は自分の記録を優先して削除する
+        file_record = (
+            self.get_file_by_filename(filename, uploaded_by=current_user.id)
+            or self.get_file_by_filename(filename)
+        )
         if not file_record:
             return False
         
+        return self._delete_file_record(file_record, current_user)
+    
+    def _delete_file_record(self, file_record: FileModel, current_user: AuthPrincipal) -> bool:
         # 権限チェック：管理者または作成者のみ削除可能
         if current_user.role != UserRole.ADMIN and file_record.uploaded_by != current_user.id:
             raise ValueError("このファイルを削除する権限がありません")
         
         file_record.deleted_at = datetime.now(timezone.utc)
+        orphan = self.release_upload(file_record)
         self.db.commit()
+        _upload_paths_changed("files", removed=file_record.filename)
+        
+        if orphan:
+            self.delete_upload_files("files", orphan)
         
         return True
     
@@ -103,28 +218,77 @@ class FileService:
             AvatarModel.deleted_at.is_(None)
         ).first()
     
+    def get_avatar_infos(self, user_ids: List[int]) -> Dict[int, Optional[Dict[str, Any]]]:
+        """
+        複数ユーザーのアバター情報をまとめて取得（未設定のユーザーはNone）
+        
+        キャッシュにないユーザーの分だけを1回のINクエリで読み込む
+        """
+        def load(missing: List[int]) -> Dict[int, Dict[str, Any]]:
+            avatars = self.db.query(AvatarModel).filter(
+                AvatarModel.user_id.in_(missing),
+                AvatarModel.deleted_at.is_(None)
+            ).all()
+            return {avatar.user_id: self.create_avatar_info_dict(avatar) for avatar in avatars}
+        
+        return avatar_cache.get_many_or_load(user_ids, load)
+    
+    def delete_avatar(self, user_id: int) -> bool:
+        """アバター削除（論理削除、他から共有されていなければ実ファイルも削除）"""
+        avatar = self.get_user_avatar(user_id)
+        if not avatar:
+            return False
+        
+        avatar.deleted_at = datetime.now(timezone.utc)
+        orphan = self.release_upload(avatar)
+        self.db.commit()
+        _upload_paths_changed("avatars", removed=avatar.filename)
+        _avatars_changed()
+        
+        if orphan:
+            self.delete_upload_files("avatars", orphan)
+        
+        return True
+    
     def save_avatar(
         self,
         user_id: int,
         filename: str,
         original_filename: str,
         file_size: int,
-        mime_type: str
+        mime_type: str,
+        blob_id: Optional[int] = None
     ) -> AvatarModel:
-        """アバターを保存または更新"""
+        """
+        アバターを保存または更新
+        
+        既存アバターの実ファイルの参照はrelease_uploadで先に外しておくこと
+        """
         # 既存のアバターをチェック
         existing_avatar = self.get_user_avatar(user_id)
         
         if existing_avatar:
+            # 同じ内容の再アップロードでは実ファイル・サムネイルが変わらないためメタデータを残す
+            previous_filename = existing_avatar.filename
+            same_file = previous_filename == filename
+            
             # 既存のアバターを更新
             existing_avatar.filename = filename
             existing_avatar.original_filename = original_filename
             existing_avatar.file_size = file_size
             existing_avatar.mime_type = mime_type
+            existing_avatar.blob_id = blob_id
+            if not same_file:
+                # 新しい画像のメタデータはサムネイル生成後に設定される
+                for field in ImageMetadata._fields + ("variant_version",):
+                    setattr(existing_avatar, field, None)
+                self._inherit_image_metadata(AvatarModel, existing_avatar)
             existing_avatar.updated_at = datetime.now(timezone.utc)
             
             self.db.commit()
             self.db.refresh(existing_avatar)
+            _upload_paths_changed("avatars", added=filename, removed=None if same_file else previous_filename)
+            _avatars_changed()
             
             return existing_avatar
         else:
@@ -134,15 +298,236 @@ class FileService:
                 filename=filename,
                 original_filename=original_filename,
                 file_size=file_size,
-                mime_type=mime_type
+                mime_type=mime_type,
+                blob_id=blob_id
             )
+            self._inherit_image_metadata(AvatarModel, avatar_record)
             
             self.db.add(avatar_record)
             self.db.commit()
             self.db.refresh(avatar_record)
+            _upload_paths_changed("avatars", added=filename)
+            _avatars_changed()
             
             return avatar_record
     
+    def update_image_metadata(self, kind: str, filename: str, metadata: ImageMetadata) -> bool:
+        """サムネイル生成で得た画像の幅・高さ・プレースホルダーと生成時の版数を保存"""
+        model = FileModel if kind == "files" else AvatarModel
+        updated = self.db.query(model).filter(
+            model.filename == filename,
+            model.deleted_at.is_(None)
+        ).update({**metadata._asdict(), "variant_version": THUMBNAIL_VERSION}, synchronize_session=False)
+        self.db.commit()
+        if updated and kind == "avatars":
+            avatar_cache.bump_version()
+        return updated > 0
+    
+    def _inherit_image_metadata(self, model, record) -> None:
+        """共有する実ファイルのメタデータが既に計算済みなら引き継ぐ（サムネイルは再生成しないため）"""
+        if record.blob_id is None:
+            return
+        source = self.db.query(model).filter(
+            model.blob_id == record.blob_id,
+            model.width.isnot(None)
+        ).first()
+        if source is not None:
+            for field in ImageMetadata._fields + ("variant_version",):
+                setattr(record, field, getattr(source, field))
+    
+    def acquire_blob(self, kind: str, sha256: str) -> Optional[UploadBlobModel]:
+        """
+        同じ内容の保存済み実ファイルがあれば参照数を増やして返す（コミットは呼び出し側で行う）
+        
+        見つからない場合（同時に最後の参照が削除された場合も含む）はNone
+        """
+        blob = self.db.query(UploadBlobModel).filter(
+            UploadBlobModel.kind == kind,
+            UploadBlobModel.sha256 == sha256
+        ).first()
+        if blob is None:
+            return None
+        
+        updated = self.db.query(UploadBlobModel).filter(
+            UploadBlobModel.id == blob.id
+        ).update({UploadBlobModel.ref_count: UploadBlobModel.ref_count + 1}, synchronize_session=False)
+        return blob if updated else None
+    
+    def register_blob(
+        self,
+        kind: str,
+        sha256: str,
+        filename: str,
+        file_size: int,
+        mime_type: str
+    ) -> Optional[UploadBlobModel]:
+        """
+        新しく保存した実ファイルを登録（参照数1、コミットは呼び出し側で行う）
+        
+        同じ内容が同時にアップロードされて登録済みだった場合はNoneを返し、
+        そのファイルは共有せずに保存する
+        """
+        blob = UploadBlobModel(
+            kind=kind,
+            sha256=sha256,
+            filename=filename,
+            file_size=file_size,
+            mime_type=mime_type,
+            ref_count=1
+        )
+        self.db.add(blob)
+        try:
+            self.db.flush()
+        except IntegrityError:
+            self.db.rollback()
+            return None
+        return blob
+    
+    def release_upload(self, record) -> Optional[str]:
+        """
+        ファイル・アバターの記録から実ファイルへの参照を外す（コミットは呼び出し側で行う）
+        
+        最後の参照だった場合は、コミット後にdelete_upload_filesで削除すべきファイル名を返す
+        """
+        if record.blob_id is None:
+            # 重複排除の導入前のファイルは共有されていない
+            return record.filename
+        
+        blob_id = record.blob_id
+        record.blob_id = None
+        self.db.flush()
+        self.db.query(UploadBlobModel).filter(
+            UploadBlobModel.id == blob_id
+        ).update({UploadBlobModel.ref_count: UploadBlobModel.ref_count - 1}, synchronize_session=False)
+        deleted = self.db.query(UploadBlobModel).filter(
+            UploadBlobModel.id == blob_id,
+            UploadBlobModel.ref_count <= 0
+        ).delete(synchronize_session=False)
+        return record.filename if deleted else None
+    
+    @staticmethod
+    def image_metadata_dict(record) -> Dict[str, Any]:
+        """ファイル・アバターの画像メタデータを辞書形式に変換（未計算の場合はNone）"""
+        return {
+            "width": record.width,
+            "height": record.height,
+            "dominant_color": record.dominant_color,
+            "blurhash": record.blurhash
+        }
+    
+    @staticmethod
+    def get_upload_dir(kind: str, filename: str) -> Path:
+        """
+        保存ファイル名からシャードされた保存先ディレクトリを取得（例: files/ab/cd）
+        
+        サムネイル・WebP/AVIF版は元ファイルと同じディレクトリになる
+        """
+        digest = hashlib.md5(_shard_key(filename).encode("utf-8")).hexdigest()
+        return settings.UPLOAD_DIR / kind / digest[:2] / digest[2:4]
+    
+    @staticmethod
+    def get_upload_path(kind: str, filename: str) -> Path:
+        """保存ファイル名から新規保存先のパスを取得"""
+        return FileService.get_upload_dir(kind, filename) / filename
+    
+    @staticmethod
+    def get_legacy_upload_path(kind: str, filename: str) -> Path:
+        """シャード導入前の保存先（files/<ファイル名>）のパスを取得"""
+        return settings.UPLOAD_DIR / kind / filename
+    
+    @staticmethod
+    def find_upload_path(kind: str, filename: str) -> Optional[Path]:
+        """実ファイルのパスを取得（移行前の旧レイアウトも参照、存在しない場合はNone）"""
+        for path in (FileService.get_upload_path(kind, filename), FileService.get_legacy_upload_path(kind, filename)):
+            if path.is_file():
+                return path
+        return None
+    
+    @staticmethod
+    def delete_upload_files(kind: str, filename: str) -> None:
+        """アップロードの実ファイル・サムネイル・リサイズ画像を削除（新旧どちらのレイアウトも対象）"""
+        thumbnail_jobs.cancel(kind, filename)
+        for path in (FileService.get_upload_path(kind, filename), FileService.get_legacy_upload_path(kind, filename)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass  # 既に削除済み、または別のレイアウトに存在
+            if is_image_file(filename):
+                cleanup_thumbnails(filename, path.parent)
+        variant_cache.discard(kind, filename)
+    
+    @staticmethod
+    def original_filename_candidates(filename: str) -> List[str]:
+        """
+        保存されているファイル（元画像・サムネイル・WebP/AVIF版）が属しうる元ファイル名の候補
+        
+        大サイズのサムネイルは拡張子がJPGに統一されるため、許可された拡張子をすべて候補にする
+        """
+        candidates = [filename]
+        base = _strip_alternative_extension(filename)
+        match = _THUMBNAIL_NAME_RE.match(base)
+        if match:
+            stem = match.group("stem")
+            if match.group("suffix") != "l":
+                candidates.append(stem + match.group("ext"))
+            candidates.extend(stem + extension for extension in sorted(settings.ALLOWED_EXTENSIONS))
+        return candidates
+    
+    def resolve_upload_path(self, requested: str) -> Optional[Path]:
+        """
+        リクエストされたパス（"files/x.png", "avatars/x_s.jpg", "x.png" など）を実ファイルに解決
+        
+        files/avatarsテーブルに登録されたファイルとそのサムネイルのみを対象とし、
+        解決結果（見つからない場合も含む）はメモリにキャッシュする
+        """
+        kind, _, name = requested.rpartition("/")
+        if kind and kind not in UPLOAD_KINDS:
+            return None
+        if not name or "/" in kind or ".." in name or "\\" in name:
+            return None
+        
+        resolved = upload_path_cache.get_or_load(
+            (kind, name), lambda: self._lookup_upload(kind or None, name)
+        )
+        if resolved is None:
+            return None
+        
+        # サムネイル生成中などでファイルがまだ存在しない場合はNone
+        return self.find_upload_path(*resolved)
+    
+    def _lookup_upload(self, kind: Optional[str], name: str) -> Optional[Tuple[str, str]]:
+        """ファイル名（またはサムネイル名）に対応するレコードを検索して (種別, ファイル名) を返す"""
+        kinds = [kind] if kind else list(UPLOAD_KINDS)
+        
+        for upload_kind in kinds:
+            if self._find_active_upload(upload_kind, name, exact=True):
+                return upload_kind, name
+        
+        match = _THUMBNAIL_NAME_RE.match(name)
+        if not match:
+            return None
+        
+        for upload_kind in kinds:
+            for original in self._find_active_upload(upload_kind, match.group("stem") + ".", exact=False):
+                if generate_thumbnail_filename(original, match.group("suffix")) == name:
+                    return upload_kind, name
+        return None
+    
+    def _find_active_upload(self, kind: str, value: str, exact: bool) -> List[str]:
+        """files/avatarsテーブルから未削除のファイル名を検索（exact=Falseは前方一致）"""
+        model = FileModel if kind == "files" else AvatarModel
+        condition = model.filename == value if exact else model.filename.startswith(value, autoescape=True)
+        rows = self.db.query(model.filename).filter(
+            condition,
+            model.deleted_at.is_(None)
+        ).limit(10).all()
+        return [row[0] for row in rows]
+    
+    @staticmethod
+    def is_thumbnail(filename: str) -> bool:
+        """サムネイル（WebP/AVIF版を含む）のファイル名か（元ファイルはUUIDのため"_"を含まない）"""
+        return _THUMBNAIL_NAME_RE.match(_strip_alternative_extension(filename)) is not None
+    
     @staticmethod
     def generate_unique_filename(original_filename: str) -> str:
         """ユニークなファイル名を生成"""
@@ -158,12 +543,24 @@ class FileService:
             ".jpeg": "image/jpeg", 
             ".png": "image/png",
             ".gif": "image/gif",
-            ".webp": "image/webp"
+            ".webp": "image/webp",
+            ".avif": "image/avif"
         }
         return mime_types.get(extension, "application/octet-stream")
     
     @staticmethod
-    def create_file_info_dict(file: FileModel) -> Dict[str, Any]:
+    def create_avatar_info_dict(avatar: AvatarModel) -> Dict[str, Any]:
+        """アバター情報を辞書形式に変換"""
+        return {
+            "avatar_url": f"/uploads/avatars/{avatar.filename}",
+            "original_filename": avatar.original_filename,
+            "file_size": avatar.file_size,
+            **FileService.image_metadata_dict(avatar),
+            "updated_at": avatar.updated_at.isoformat()
+        }
+    
+    @staticmethod
+    def create_file_info_dict(file: FileListItem) -> Dict[str, Any]:
         """ファイル情報を辞書形式に変換"""
         return {
             "id": file.id,
@@ -172,6 +569,49 @@ class FileService:
             "file_size": file.file_size,
             "mime_type": file.mime_type,
             "url": f"/uploads/files/{file.filename}",
+            **FileService.image_metadata_dict(file),
             "created_at": file.created_at.isoformat(),
-            "uploader": file.uploader.username if file.uploader else "Unknown"
-        }
\ No newline at end of file
+            "uploaded_by": file.uploaded_by,
+            "uploader": file.uploader_name or "Unknown"
+        }
+
+
+def _avatars_changed() -> None:
+    """アバターの追加・変更・削除後に関連するキャッシュを無効化"""
+    avatar_cache.bump_version()
+    # コンテンツ一覧に作者のアバターURLを含むため
+    content_cache.bump_version()
+
+
+def _upload_paths_changed(kind: str, added: Optional[str] = None, removed: Optional[str] = None) -> None:
+    """
+    ファイルの追加・削除で結果が変わるパス解決のキャッシュだけを除く
+    
+    追加されたファイル（とサムネイル）の「見つからない」結果と、削除されたファイル
+    （とサムネイル）の解決結果が対象。他のファイルの結果はそのまま残す。
+    """
+    added_key = _shard_key(added) if added else None
+    removed_key = _shard_key(removed) if removed else None
+    
+    def affected(key: Tuple[str, str], value: Optional[Tuple[str, str]]) -> bool:
+        if value is None:
+            return added_key is not None and key[0] in ("", kind) and _shard_key(key[1]) == added_key
+        return removed_key is not None and value[0] == kind and _shard_key(value[1]) == removed_key
+    
+    if added_key or removed_key:
+        upload_path_cache.invalidate(affected)
+
+
+def _strip_alternative_extension(filename: str) -> str:
+    """サムネイルのWebP/AVIF版の名前から追加された拡張子を除く（xxx_s.jpg.webp -> xxx_s.jpg）"""
+    for extension in ALTERNATIVE_FORMATS:
+        if filename.endswith(extension) and _THUMBNAIL_NAME_RE.match(filename[:-len(extension)]):
+            return filename[:-len(extension)]
+    return filename
+
+
+def _shard_key(filename: str) -> str:
+    """シャードを決める元ファイル名の拡張子なし部分（サムネイル名からも同じ値を返す）"""
+    filename = _strip_alternative_extension(filename)
+    match = _THUMBNAIL_NAME_RE.match(filename)
+    return match.group("stem") if match else Path(filename).stem
@@ -0,0 +1,381 @@
+"""アップロードの実ファイルとfiles/avatarsテーブルの突き合わせ（孤立ファイル・参照切れレコードの検出と回収）"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from sqlalchemy import and_, func, select
+from sqlalchemy.orm import Session
+
+from config import settings
+from infrastructure.cache import avatar_cache, upload_path_cache
+from infrastructure.database import SessionLocal
+from infrastructure.models import AvatarModel, FileModel, UploadBlobModel
+from infrastructure.variant_cache import variant_cache
+from services.file_service import UPLOAD_KINDS, FileService
+
+# レポートに含める個別項目の上限（件数・バイト数は全体を集計する）
+REPORT_SAMPLE_LIMIT = 100
+
+# アップロード中の一時ファイル（utils.file_utils.stream_upload_to_temp）
+_TEMP_PREFIX = ".upload-"
+
+_MODELS = {"files": FileModel, "avatars": AvatarModel}
+
+# 同じプロセス内での同時実行を防ぐ
+_reconcile_lock = threading.Lock()
+
+
+class ReconcileInProgressError(Exception):
+    """Raised when another reconciliation is already running in this process."""
+
+
+class ReconcileService:
+    def __init__(self, db: Session, batch_size: int = 500, pause: float = 0.0, min_age: float = 3600):
+        self.db = db
+        self.batch_size = batch_size
+        # バッチごとの待機秒数（稼働中のサーバーでディスク・DBの負荷を抑える）
+        self.pause = pause
+        # 更新からこの秒数以内のファイルはアップロード処理中の可能性があるため対象外
+        self.min_age = min_age
+
+    def reconcile(
+        self,
+        dry_run: bool = True,
+        kinds: Iterable[str] = UPLOAD_KINDS,
+        purge_deleted_before: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        ディレクトリの走査結果とテーブルをバッチ単位で突き合わせてレポートを返す
+
+        dry_run=Falseの場合は見つかった不整合を解消する:
+        - 参照数が実際の参照と合わない共有ファイル（upload_blobs）を修正
+        - 実ファイルが存在しないレコードを論理削除
+        - purge_deleted_beforeより前に論理削除されたレコードを物理削除
+        - どのレコードからも参照されない実ファイル・サムネイル・一時ファイル・リサイズ画像を削除
+        """
+        if not _reconcile_lock.acquire(blocking=False):
+            raise ReconcileInProgressError()
+        try:
+            report: Dict[str, Any] = {"dry_run": dry_run, "kinds": {}}
+            for kind in kinds:
+                counts = _new_counts()
+                self._check_blobs(kind, dry_run, counts)
+                self._check_rows(kind, dry_run, counts)
+                if purge_deleted_before is not None:
+                    self._purge_deleted(kind, purge_deleted_before, dry_run, counts)
+                self._check_disk(kind, dry_run, counts)
+                self._check_variants(kind, dry_run, counts)
+                report["kinds"][kind] = counts
+            return report
+        finally:
+            _reconcile_lock.release()
+
+    def _check_blobs(self, kind: str, dry_run: bool, counts: Dict[str, Any]) -> None:
+        """共有ファイルの参照数を未削除レコードの実数と比較"""
+        model = _MODELS[kind]
+        last_id = 0
+
+        while True:
+            rows = self.db.execute(
+                select(
+                    UploadBlobModel.id,
+                    UploadBlobModel.ref_count,
+                    func.count(model.id).label("references")
+                ).outerjoin(
+                    model, and_(model.blob_id == UploadBlobModel.id, model.deleted_at.is_(None))
+                ).where(
+                    UploadBlobModel.kind == kind,
+                    UploadBlobModel.id > last_id
+                ).group_by(
+                    UploadBlobModel.id, UploadBlobModel.ref_count
+                ).order_by(UploadBlobModel.id).limit(self.batch_size)
+            ).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+
+            for row in rows:
+                # 参照のない共有ファイルの行は残らない（最後の参照の削除時に消える）はず
+                if row.ref_count == row.references and row.references:
+                    continue
+                counts["blob_mismatches"] += 1
+                _sample(counts, "blob_mismatches", {
+                    "blob_id": row.id, "ref_count": row.ref_count, "references": row.references
+                })
+                if dry_run:
+                    continue
+
+                # 集計後に参照数が変わっていた場合（同時アップロード・削除）は何もしない
+                blob = self.db.query(UploadBlobModel).filter(
+                    UploadBlobModel.id == row.id,
+                    UploadBlobModel.ref_count == row.ref_count
+                )
+                if row.references:
+                    blob.update({UploadBlobModel.ref_count: row.references}, synchronize_session=False)
+                else:
+                    # 論理削除済みレコードからの参照を外してから削除（実ファイルは後のディレクトリ走査で回収）
+                    self.db.query(model).filter(model.blob_id == row.id).update(
+                        {model.blob_id: None}, synchronize_session=False
+                    )
+                    blob.delete(synchronize_session=False)
+
+            if not dry_run:
+                self.db.commit()
+            self._sleep()
+
+    def _check_rows(self, kind: str, dry_run: bool, counts: Dict[str, Any]) -> None:
+        """実ファイルが存在しない未削除レコードを検出"""
+        model = _MODELS[kind]
+        file_service = FileService(self.db)
+        last_id = 0
+
+        while True:
+            rows = self.db.query(model.id, model.filename).filter(
+                model.id > last_id,
+                model.deleted_at.is_(None)
+            ).order_by(model.id).limit(self.batch_size).all()
+            if not rows:
+                return
+            last_id = rows[-1].id
+
+            orphans = []
+            for row in rows:
+                if FileService.find_upload_path(kind, row.filename) is not None:
+                    continue
+                counts["dangling_rows"] += 1
+                _sample(counts, "dangling_rows", {"id": row.id, "filename": row.filename})
+                if dry_run:
+                    continue
+
+                record = self.db.get(model, row.id)
+                # シャード移行中のファイルを見失った可能性があるため直前に再確認
+                if record is None or record.deleted_at is not None or FileService.find_upload_path(kind, row.filename):
+                    continue
+                record.deleted_at = datetime.now(timezone.utc)
+                orphan = file_service.release_upload(record)
+                if orphan:
+                    orphans.append(orphan)
+
+            if not dry_run:
+                self.db.commit()
+                upload_path_cache.bump_version()
+                avatar_cache.bump_version()
+                # サムネイル・リサイズ画像が残っていれば削除
+                for filename in orphans:
+                    FileService.delete_upload_files(kind, filename)
+            self._sleep()
+
+    def _purge_deleted(self, kind: str, before: datetime, dry_run: bool, counts: Dict[str, Any]) -> None:
+        """指定日時より前に論理削除されたレコードを物理削除"""
+        model = _MODELS[kind]
+        last_id = 0
+
+        while True:
+            ids = [row.id for row in self.db.query(model.id).filter(
+                model.id > last_id,
+                model.deleted_at.isnot(None),
+                model.deleted_at < before
+            ).order_by(model.id).limit(self.batch_size).all()]
+            if not ids:
+                return
+            last_id = ids[-1]
+            counts["purged_rows"] += len(ids)
+
+            if not dry_run:
+                self.db.query(model).filter(model.id.in_(ids)).delete(synchronize_session=False)
+                self.db.commit()
+            self._sleep()
+
+    def _check_disk(self, kind: str, dry_run: bool, counts: Dict[str, Any]) -> None:
+        """ディレクトリを走査し、どのレコードからも参照されないファイルを検出"""
+        batch: List[Tuple[Path, os.stat_result]] = []
+        for entry in _iter_files(settings.UPLOAD_DIR / kind):
+            counts["scanned_files"] += 1
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                self._check_disk_batch(kind, batch, dry_run, counts)
+                batch = []
+                self._sleep()
+        if batch:
+            self._check_disk_batch(kind, batch, dry_run, counts)
+
+    def _check_disk_batch(
+        self,
+        kind: str,
+        batch: List[Tuple[Path, os.stat_result]],
+        dry_run: bool,
+        counts: Dict[str, Any]
+    ) -> None:
+        candidates = {
+            path: FileService.original_filename_candidates(path.name)
+            for path, _ in batch if not path.name.startswith(_TEMP_PREFIX)
+        }
+        claimed = self._claimed_filenames(kind, {name for names in candidates.values() for name in names})
+        cutoff = time.time() - self.min_age
+
+        for path, stat in batch:
+            if stat.st_mtime > cutoff:
+                continue
+            if path.name.startswith(_TEMP_PREFIX):
+                # 処理が中断されたアップロードの一時ファイル
+                counts["temp_files"] += 1
+            elif any(name in claimed for name in candidates[path]):
+                continue
+            else:
+                counts["orphan_files"] += 1
+                _sample(counts, "orphan_files", {
+                    "path": path.relative_to(settings.UPLOAD_DIR).as_posix(), "size": stat.st_size
+                })
+            counts["orphan_bytes"] += stat.st_size
+
+            if not dry_run:
+                try:
+                    path.unlink()
+                    counts["reclaimed_bytes"] += stat.st_size
+                except FileNotFoundError:
+                    pass  # 走査後に削除された
+
+    def _claimed_filenames(self, kind: str, names: set) -> set:
+        """未削除のレコード、または参照中の共有ファイルとして登録されているファイル名"""
+        if not names:
+            return set()
+        model = _MODELS[kind]
+        rows = self.db.query(model.filename).filter(
+            model.filename.in_(names),
+            model.deleted_at.is_(None)
+        ).all()
+        blob_rows = self.db.query(UploadBlobModel.filename).filter(
+            UploadBlobModel.kind == kind,
+            UploadBlobModel.filename.in_(names),
+            UploadBlobModel.ref_count > 0
+        ).all()
+        return {row[0] for row in rows} | {row[0] for row in blob_rows}
+
+    def _check_variants(self, kind: str, dry_run: bool, counts: Dict[str, Any]) -> None:
+        """元ファイルが削除されたリサイズ画像のキャッシュを検出"""
+        directory = variant_cache.directory / kind
+        if not directory.is_dir():
+            return
+
+        with os.scandir(directory) as entries:
+            names = [entry.name for entry in entries if entry.is_dir(follow_symlinks=False)]
+
+        for start in range(0, len(names), self.batch_size):
+            batch = names[start:start + self.batch_size]
+            claimed = self._claimed_filenames(kind, set(batch))
+            for name in batch:
+                if name in claimed:
+                    continue
+                counts["orphan_variants"] += 1
+                if not dry_run:
+                    variant_cache.discard(kind, name)
+            self._sleep()
+
+    def _sleep(self) -> None:
+        if self.pause:
+            time.sleep(self.pause)
+
+
+class ReconcileRunner:
+    """
+    Runs one reconciliation at a time on a background thread.
+
+    A large tree can take longer than the proxy timeout, so the request only
+    starts the run; the progress and the last report are read via status().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._state: Dict[str, Any] = {"status": "idle"}
+
+    def start(self, dry_run: bool, batch_size: int, pause: float, min_age: float,
+              purge_deleted_before: Optional[datetime] = None) -> Dict[str, Any]:
+        """
+        Start a reconciliation in the background and return its status.
+
+        Raises:
+            ReconcileInProgressError: a run is already in progress
+        """
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                raise ReconcileInProgressError()
+            self._state = {
+                "status": "running",
+                "dry_run": dry_run,
+                "started_at": datetime.now(timezone.utc).isoformat(),
+                "finished_at": None,
+                "report": None,
+                "error": None
+            }
+            self._thread = threading.Thread(
+                target=self._run,
+                args=(dry_run, batch_size, pause, min_age, purge_deleted_before),
+                name="reconcile-uploads",
+                daemon=True
+            )
+            self._thread.start()
+            return dict(self._state)
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._state)
+
+    def _run(self, dry_run: bool, batch_size: int, pause: float, min_age: float,
+             purge_deleted_before: Optional[datetime]) -> None:
+        db = SessionLocal()
+        try:
+            report = ReconcileService(db, batch_size, pause, min_age).reconcile(
+                dry_run, purge_deleted_before=purge_deleted_before
+            )
+            result = {"status": "done", "report": report}
+        except Exception as e:
+            db.rollback()
+            result = {"status": "failed", "error": str(e)}
+        finally:
+            db.close()
+
+        with self._lock:
+            self._state.update(result, finished_at=datetime.now(timezone.utc).isoformat())
+
+
+def _new_counts() -> Dict[str, Any]:
+    return {
+        "scanned_files": 0,
+        "orphan_files": 0,
+        "temp_files": 0,
+        "orphan_bytes": 0,
+        "reclaimed_bytes": 0,
+        "orphan_variants": 0,
+        "dangling_rows": 0,
+        "blob_mismatches": 0,
+        "purged_rows": 0,
+        "samples": {"orphan_files": [], "dangling_rows": [], "blob_mismatches": []}
+    }
+
+
+def _sample(counts: Dict[str, Any], key: str, item: Dict[str, Any]) -> None:
+    samples = counts["samples"][key]
+    if len(samples) < REPORT_SAMPLE_LIMIT:
+        samples.append(item)
+
+
+def _iter_files(directory: Path) -> Iterator[Tuple[Path, os.stat_result]]:
+    """directory配下（シャードのディレクトリを含む）のファイルを1件ずつ返す（.gitkeepなどは除く）"""
+    if not directory.is_dir():
+        return
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _iter_files(Path(entry.path))
+            elif entry.is_file(follow_symlinks=False):
+                if entry.name.startswith(".") and not entry.name.startswith(_TEMP_PREFIX):
+                    continue
+                yield Path(entry.path), entry.stat(follow_symlinks=False)
+
+
+# 管理画面（POST /uploads/reconcile）からのバックグラウンド実行
+reconcile_runner = ReconcileRunner()
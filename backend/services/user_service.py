@@ -3,8 +3,9 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from datetime import datetime
 
+from infrastructure.cache import auth_cache, content_cache
 from infrastructure.models import UserModel, UserRole
-from utils.auth_utils import hash_password, verify_password
+from utils.auth_utils import hash_password_pooled, verify_password_pooled
 
 
 class UserService:
@@ -26,15 +27,19 @@ class UserService:
         ).first()
     
     def authenticate_user(self, email: str, password: str) -> Optional[UserModel]:
-        """ユーザー認証"""
+        """ユーザー認証（bcryptはワーカープールで実行）"""
         user = self.get_user_by_email(email)
-        if not user or not verify_password(password, user.password_hash):
+        if not user or not verify_password_pooled(password, user.password_hash):
             return None
         return user
     
     def create_user(self, username: str, email: str, password: str, role: UserRole = UserRole.MEMBER) -> UserModel:
-        """新規ユーザー作成"""
-        # 重複チェック
+        """新規ユーザー作成（bcryptはワーカープールで実行）"""
+        self._check_new_user(username, email)
+        return self._add_user(username, email, hash_password_pooled(password), role)
+    
+    def _check_new_user(self, username: str, email: str) -> None:
+        """新規ユーザーのメールアドレス・ユーザー名の重複チェック"""
         existing_user = self.get_user_by_email(email)
         if existing_user:
             raise ValueError("このメールアドレスは既に使用されています")
@@ -46,11 +51,9 @@ class UserService:
         ).first()
         if existing_username:
             raise ValueError("このユーザー名は既に使用されています")
-        
-        # パスワードハッシュ化
-        password_hash = hash_password(password)
-        
-        # ユーザー作成
+    
+    def _add_user(self, username: str, email: str, password_hash: str, role: UserRole) -> UserModel:
+        """ハッシュ化済みパスワードでユーザーを作成"""
         user = UserModel(
             username=username,
             email=email,
@@ -78,7 +81,8 @@ class UserService:
             raise ValueError("ユーザーが見つかりません")
         
         # ユーザー名更新チェック
-        if username and username != user.username:
+        username_changed = bool(username and username != user.username)
+        if username_changed:
             existing = self.db.query(UserModel).filter(
                 UserModel.username == username,
                 UserModel.deleted_at.is_(None),
@@ -105,22 +109,27 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(user)
+        auth_cache.invalidate_user(user.id)
+        # コンテンツ一覧の作者名が変わるためキャッシュを無効化
+        if username_changed:
+            content_cache.bump_version()
         
         return user
     
     def change_password(self, user_id: int, current_password: str, new_password: str) -> bool:
-        """パスワード変更"""
+        """パスワード変更（bcryptはワーカープールで実行）"""
         user = self.get_user_by_id(user_id)
         if not user:
             raise ValueError("ユーザーが見つかりません")
         
         # 現在のパスワード確認
-        if not verify_password(current_password, user.password_hash):
+        if not verify_password_pooled(current_password, user.password_hash):
             raise ValueError("現在のパスワードが正しくありません")
         
         # 新しいパスワードをハッシュ化して保存
-        user.password_hash = hash_password(new_password)
+        user.password_hash = hash_password_pooled(new_password)
         self.db.commit()
+        auth_cache.invalidate_user(user.id)
         
         return True
     
@@ -135,6 +144,7 @@ class UserService:
         
         self.db.commit()
         self.db.refresh(user)
+        auth_cache.invalidate_user(user.id)
         
         return user
     
@@ -146,6 +156,7 @@ class UserService:
         
         user.deleted_at = datetime.utcnow()
         self.db.commit()
+        auth_cache.invalidate_user(user.id)
         
         return True
     
@@ -1,13 +1,30 @@
 """Authentication utilities."""
+import asyncio
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from passlib.context import CryptContext
-from typing import Optional
+from typing import Any, Callable, Optional
 
 from config import settings
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
+# bcrypt専用のワーカープール（イベントループと汎用スレッドプールを塞がないため）
+_password_executor = ThreadPoolExecutor(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash"
+)
+# 実行中 + 待機中のタスク数の上限
+_password_slots = threading.BoundedSemaphore(
+    settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_SIZE
+)
+
+
+class PasswordHasherBusyError(Exception):
+    """Raised when the password worker pool queue is full."""
+
 
 def hash_password(password: str) -> str:
     """Hash a password using bcrypt."""
@@ -19,6 +36,40 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+def _submit_password_task(func: Callable[..., Any], *args: Any) -> Future:
+    """Queue a bcrypt operation on the password worker pool."""
+    if not _password_slots.acquire(blocking=False):
+        raise PasswordHasherBusyError("Password worker queue is full")
+    try:
+        future = _password_executor.submit(func, *args)
+    except BaseException:
+        _password_slots.release()
+        raise
+    # 呼び出し側がキャンセルされても、実際にタスクが終わるまで枠を解放しない
+    future.add_done_callback(lambda _: _password_slots.release())
+    return future
+
+
+def hash_password_pooled(password: str) -> str:
+    """Hash a password on the password worker pool (for sync handlers running in the threadpool)."""
+    return _submit_password_task(hash_password, password).result()
+
+
+def verify_password_pooled(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool (for sync handlers running in the threadpool)."""
+    return _submit_password_task(verify_password, plain_password, hashed_password).result()
+
+
+async def hash_password_async(password: str) -> str:
+    """Hash a password on the password worker pool."""
+    return await asyncio.wrap_future(_submit_password_task(hash_password, password))
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password on the password worker pool."""
+    return await asyncio.wrap_future(_submit_password_task(verify_password, plain_password, hashed_password))
+
+
 def create_access_token(data: dict) -> str:
     """Create a JWT access token."""
     to_encode = data.copy()
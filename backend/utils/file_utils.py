@@ -1,8 +1,32 @@
 """File handling utilities."""
+import hashlib
+import os
+import tempfile
 import uuid
-import urllib.parse
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+# アップロードを読み書きする単位（1リクエストあたりのピークメモリはこのサイズに収まる）
+UPLOAD_CHUNK_SIZE = 256 * 1024
+
+# マジックバイト -> MIMEタイプ
+_IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+
+class UploadTooLargeError(Exception):
+    """Raised when an upload exceeds the configured size limit."""
+
+
+class UnsupportedFileContentError(Exception):
+    """Raised when the uploaded bytes are not a supported image format."""
 
 
 def generate_unique_filename(original_filename: str) -> str:
@@ -34,67 +58,92 @@ def generate_unique_filename_with_path(original_filename: str, file_type: str =
         return f"files/{unique_filename}"
 
 
-def find_file_by_name(directory: Path, filename: str) -> Optional[Path]:
-    """Find file by name with hierarchical structure support."""
-    if not directory.exists():
-        return None
-    
-    # If filename contains path (e.g., "avatars/file.jpg"), use it directly
-    if "/" in filename:
-        file_path = directory / filename
-        if file_path.exists():
-            return file_path
-    else:
-        # Try direct match in root
-        file_path = directory / filename
-        if file_path.exists():
-            return file_path
-        
-        # Search in subdirectories
-        for subdir in ["files", "avatars"]:
-            subdir_path = directory / subdir
-            if subdir_path.exists():
-                file_path = subdir_path / filename
-                if file_path.exists():
-                    return file_path
-    
-    # Try URL decoded filename
-    try:
-        decoded_filename = urllib.parse.unquote(filename)
-        if "/" in decoded_filename:
-            decoded_path = directory / decoded_filename
-            if decoded_path.exists():
-                return decoded_path
-        else:
-            # Search in subdirectories for decoded filename
-            for subdir in ["files", "avatars"]:
-                subdir_path = directory / subdir
-                if subdir_path.exists():
-                    decoded_path = subdir_path / decoded_filename
-                    if decoded_path.exists():
-                        return decoded_path
-    except Exception:
-        pass
-    
-    # Recursive search through all subdirectories
-    for root_dir in directory.rglob("*"):
-        if not root_dir.is_file():
-            continue
-            
-        if root_dir.name == filename:
-            return root_dir
-            
-        try:
-            if (urllib.parse.quote(root_dir.name) == filename or 
-                urllib.parse.unquote(root_dir.name) == filename):
-                return root_dir
-        except Exception:
-            continue
-    
-    return None
-
-
 def ensure_upload_directories(base_upload_dir: Path) -> None:
     """Ensure upload directories exist."""
     (base_upload_dir / "files").mkdir(parents=True, exist_ok=True)
-    (base_upload_dir / "avatars").mkdir(parents=True, exist_ok=True)
\ No newline at end of file
+    (base_upload_dir / "avatars").mkdir(parents=True, exist_ok=True)
+
+
+def sniff_image_mime_type(head: bytes) -> Optional[str]:
+    """Detect the image MIME type from the leading bytes of a file."""
+    for signature, mime_type in _IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return mime_type
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return "image/webp"
+    return None
+
+
+async def stream_upload_to_temp(
+    upload: UploadFile,
+    directory: Path,
+    max_size: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> Tuple[Path, int, str, str]:
+    """
+    Stream an upload into a temporary file inside directory.
+
+    The size limit is enforced while reading, the file type is sniffed
+    from the first chunk and the SHA-256 of the content is computed on the
+    way through. The temp file lives next to the final location so it can
+    be moved into place atomically with os.replace().
+
+    Returns:
+        (temp_path, file_size, mime_type, sha256 hex digest)
+
+    Raises:
+        UploadTooLargeError: the upload exceeds max_size
+        UnsupportedFileContentError: the content is not a supported image
+    """
+    # Content-Lengthが分かっている場合は読み込む前に拒否
+    if upload.size is not None and upload.size > max_size:
+        raise UploadTooLargeError()
+
+    directory.mkdir(parents=True, exist_ok=True)
+    fd, temp_name = await run_in_threadpool(
+        tempfile.mkstemp, prefix=".upload-", suffix=".tmp", dir=str(directory)
+    )
+    temp_path = Path(temp_name)
+    file_size = 0
+    mime_type = None
+    digest = hashlib.sha256()
+
+    try:
+        with os.fdopen(fd, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+
+                if mime_type is None:
+                    mime_type = sniff_image_mime_type(chunk)
+                    if mime_type is None:
+                        raise UnsupportedFileContentError()
+
+                file_size += len(chunk)
+                if file_size > max_size:
+                    raise UploadTooLargeError()
+
+                digest.update(chunk)
+                await run_in_threadpool(buffer.write, chunk)
+
+        if mime_type is None:
+            # 空ファイル
+            raise UnsupportedFileContentError()
+    except BaseException:
+        await run_in_threadpool(_unlink_quietly, temp_path)
+        raise
+
+    return temp_path, file_size, mime_type, digest.hexdigest()
+
+
+async def commit_upload(temp_path: Path, destination: Path) -> None:
+    """Atomically move a streamed upload into its final location."""
+    await run_in_threadpool(os.replace, temp_path, destination)
+
+
+def _unlink_quietly(path: Path) -> None:
+    try:
+        path.unlink()
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,202 @@
+"""HTTP conditional request (ETag / Last-Modified) utilities."""
+import hashlib
+import os
+import re
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from pathlib import Path
+from typing import Any, Iterator, Optional, Set, Tuple
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse, StreamingResponse
+
+# 内容が変わらないファイル（UUIDファイル名）向けのキャッシュ指定
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# 同じ名前のまま作り直されるファイル（バージョン指定のないサムネイル）向け: 毎回ETagで再検証させる
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+_FILE_CHUNK_SIZE = 64 * 1024
+
+
+def make_etag(*parts: Any) -> str:
+    """Build a strong ETag from the given parts."""
+    digest = hashlib.sha1("|".join(str(part) for part in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def format_http_date(value: datetime) -> str:
+    """Format a datetime as an HTTP-date (RFC 7231)."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(request: Request, etag: str, last_modified: Optional[datetime] = None) -> bool:
+    """Check If-None-Match / If-Modified-Since against the current validators."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        # If-None-Match が指定されている場合は If-Modified-Since を無視する (RFC 7232)
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        if last_modified.tzinfo is None:
+            last_modified = last_modified.replace(tzinfo=timezone.utc)
+        # HTTP-dateは秒精度
+        return last_modified.replace(microsecond=0) <= since
+
+    return False
+
+
+def validator_headers(etag: str, last_modified: Optional[datetime] = None, cache_control: str = "no-cache") -> dict:
+    """Return ETag / Last-Modified / Cache-Control headers."""
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_http_date(last_modified)
+    return headers
+
+
+def conditional_get(
+    request: Request,
+    response: Response,
+    etag: str,
+    last_modified: Optional[datetime] = None,
+    cache_control: str = "no-cache"
+) -> Optional[Response]:
+    """
+    Handle a conditional GET before the body is built.
+
+    Returns a 304 response when the client's copy is current; otherwise sets
+    the validator headers on response and returns None.
+    """
+    headers = validator_headers(etag, last_modified, cache_control)
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    response.headers.update(headers)
+    return None
+
+
+def accepted_media_types(accept_header: Optional[str]) -> Set[str]:
+    """
+    Return the media types explicitly listed in an Accept header (q > 0).
+
+    Wildcards are ignored on purpose: clients only get a newer image format
+    when they name it.
+    """
+    accepted = set()
+    for item in (accept_header or "").split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        if media_type and quality > 0:
+            accepted.add(media_type.lower())
+    return accepted
+
+
+def parse_range(range_header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single "bytes=" range into an inclusive (start, end) pair.
+
+    Returns None for headers that should be ignored (multiple ranges or
+    malformed values); raises ValueError when the range is unsatisfiable.
+    """
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first and not last:
+        return None
+
+    if not first:
+        # 末尾からのサイズ指定（bytes=-500）
+        length = int(last)
+        if length == 0:
+            raise ValueError("Unsatisfiable range")
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError("Unsatisfiable range")
+    return start, end
+
+
+def _if_range_matches(request: Request, etag: str, last_modified: datetime) -> bool:
+    if_range = request.headers.get("if-range")
+    if if_range is None:
+        return True
+    if if_range.startswith('"') or if_range.startswith("W/"):
+        return if_range == etag
+    return if_range == format_http_date(last_modified)
+
+
+def _iter_file_range(path: Path, start: int, length: int) -> Iterator[bytes]:
+    with open(path, "rb") as file:
+        file.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = file.read(min(_FILE_CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_response(
+    request: Request,
+    path: Path,
+    media_type: Optional[str] = None,
+    cache_control: str = IMMUTABLE_CACHE_CONTROL,
+    vary: Optional[str] = None
+) -> Response:
+    """
+    Serve a file with ETag / Last-Modified validators, 304 handling and
+    single byte-range (206) support.
+    """
+    stat = os.stat(path)
+    last_modified = datetime.fromtimestamp(stat.st_mtime, tz=timezone.utc)
+    etag = make_etag(path.name, stat.st_size, stat.st_mtime_ns)
+
+    headers = validator_headers(etag, last_modified, cache_control)
+    headers["Accept-Ranges"] = "bytes"
+    if vary:
+        headers["Vary"] = vary
+    if is_not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            headers["Content-Range"] = f"bytes */{stat.st_size}"
+            return Response(status_code=416, headers=headers)
+
+        if byte_range is not None:
+            start, end = byte_range
+            length = end - start + 1
+            headers["Content-Range"] = f"bytes {start}-{end}/{stat.st_size}"
+            headers["Content-Length"] = str(length)
+            return StreamingResponse(
+                _iter_file_range(path, start, length),
+                status_code=206,
+                headers=headers,
+                media_type=media_type
+            )
+
+    return FileResponse(path, headers=headers, media_type=media_type, stat_result=stat)
@@ -1,8 +1,16 @@
 """Image processing utilities for thumbnail generation."""
-from PIL import Image
+from PIL import ExifTags, Image, ImageOps
 import os
 from pathlib import Path
-from typing import Dict, Optional, Tuple
+from typing import Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from utils.placeholder_utils import dominant_color, encode_blurhash
+
+try:
+    # Pillow 11.2未満でAVIFを扱うためのプラグイン（任意）
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
 
 # サムネイルサイズ設定
 THUMBNAIL_SIZES = {
@@ -11,15 +19,105 @@ THUMBNAIL_SIZES = {
     'large': None,          # 大サイズ (_l) - 原寸、JPG高画質圧縮
 }
 
+# サムネイル・WebP/AVIF版の生成方法の版数
+# サイズ・画質・形式を変えたら上げる（files/avatarsのvariant_versionがこれより古いものは
+# scripts.regenerate_thumbnails で作り直す）
+THUMBNAIL_VERSION = 1
+
+# 生成順（大きいサイズから順に、直前の結果を縮小して次のサイズを作る）
+_THUMBNAIL_CASCADE = ('large', 'medium', 'small')
+
+# 向きの補正で縦横が入れ替わるEXIF Orientationの値
+_TRANSPOSED_ORIENTATIONS = {5, 6, 7, 8}
+
 # サポートする画像形式
 SUPPORTED_IMAGE_FORMATS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
 
+# オンデマンドリサイズの切り抜き方法
+# contain: 指定枠に収まるよう縮小, cover: 指定枠を埋めるよう縮小して中央を切り抜き
+VARIANT_FITS = ('contain', 'cover')
+
+# 元画像の拡張子 -> リサイズ画像の保存形式と拡張子
+_VARIANT_FORMATS = {
+    '.png': ('PNG', '.png'),
+    '.gif': ('PNG', '.png'),
+    '.webp': ('WEBP', '.webp'),
+}
+
+# サムネイルと併せて生成する次世代フォーマット（拡張子 -> Pillowの形式名, MIMEタイプ）
+# 配信時はAcceptで許可された中から最も小さいファイルを選ぶ
+ALTERNATIVE_FORMATS = {
+    '.avif': ('AVIF', 'image/avif'),
+    '.webp': ('WEBP', 'image/webp'),
+}
+
+# 拡張子 -> Pillowの保存形式
+_SAVE_FORMATS = {
+    '.jpg': 'JPEG',
+    '.png': 'PNG',
+    '.webp': 'WEBP',
+    '.avif': 'AVIF',
+}
+
+
+# メタデータ（主要色・BlurHash）の計算に使う縮小画像の一辺（px）
+_METADATA_SAMPLE_SIZE = 64
+
+
+class ImageMetadata(NamedTuple):
+    """表示前にレイアウトやプレースホルダーを決めるための画像情報"""
+    width: int
+    height: int
+    dominant_color: str
+    blurhash: str
+
 
 def is_image_file(filename: str) -> bool:
     """画像ファイルかどうかを判定"""
     return Path(filename).suffix.lower() in SUPPORTED_IMAGE_FORMATS
 
 
+def get_alternative_extensions() -> List[str]:
+    """このPillowで書き出せる次世代フォーマットの拡張子（優先順）"""
+    Image.init()
+    return [ext for ext, (image_format, _) in ALTERNATIVE_FORMATS.items() if image_format in Image.SAVE]
+
+
+def generate_alternative_filename(filename: str, extension: str) -> str:
+    """サムネイルの次世代フォーマット版のファイル名を生成（例: xxx_s.jpg.webp）"""
+    return f"{filename}{extension}"
+
+
+def find_smallest_alternative(image_path: Path, accepted_types: Set[str]) -> Optional[Tuple[Path, str]]:
+    """
+    生成済みの次世代フォーマット版のうち、クライアントが受け付ける最小のものを取得
+    
+    Returns:
+        (パス, MIMEタイプ)。受け付け可能な版がない場合はNone
+    """
+    candidates = []
+    for extension, (_, media_type) in ALTERNATIVE_FORMATS.items():
+        if media_type not in accepted_types:
+            continue
+        alternative_path = image_path.with_name(generate_alternative_filename(image_path.name, extension))
+        try:
+            candidates.append((alternative_path.stat().st_size, alternative_path, media_type))
+        except FileNotFoundError:
+            continue
+    if not candidates:
+        return None
+    _, path, media_type = min(candidates)
+    return path, media_type
+
+
+def has_alternatives(image_path: Path) -> bool:
+    """次世代フォーマット版が1つでも生成されているか"""
+    return any(
+        image_path.with_name(generate_alternative_filename(image_path.name, extension)).exists()
+        for extension in ALTERNATIVE_FORMATS
+    )
+
+
 def generate_thumbnail_filename(original_filename: str, size_suffix: str) -> str:
     """サムネイルファイル名を生成（大サイズはJPG拡張子に統一）"""
     path = Path(original_filename)
@@ -34,92 +132,250 @@ def generate_thumbnail_filename(original_filename: str, size_suffix: str) -> str
         return f"{name}_{size_suffix}{extension}"
 
 
-def create_thumbnails(image_path: Path, output_dir: Path) -> Dict[str, str]:
+def create_thumbnails(image_path: Path, output_dir: Path) -> Tuple[Dict[str, str], ImageMetadata]:
     """
     画像から複数サイズのサムネイルを生成
     
+    元画像のデコードと向きの補正は1回だけ行い、各サイズは直前に生成した
+    サイズから縮小する（大→中→小）。全画素の複製を作らないため、
+    大きな写真でもピークメモリはデコード後の画像1枚分程度に収まる。
+    
     Args:
         image_path: 元画像のパス
         output_dir: サムネイル保存先ディレクトリ
     
     Returns:
-        生成されたサムネイルファイルのパス辞書
+        (生成されたサムネイルファイルのパス辞書, 向き補正後の画像メタデータ)
     """
     if not is_image_file(image_path.name):
         raise ValueError(f"Unsupported image format: {image_path}")
     
     try:
-        with Image.open(image_path) as img:
-            # 画像の向き情報を適用
-            img = _fix_image_orientation(img)
-            
-            thumbnails = {}
-            original_filename = image_path.name
+        with Image.open(image_path) as source:
+            # 透過を持つ画像は小・中サイズをPNGで保存
+            is_lossless = source.format == 'PNG' or 'transparency' in source.info
+            img = _load_oriented(source)
+        
+        if img.mode == 'P':
+            img = img.convert('RGBA' if is_lossless else 'RGB')
+        
+        thumbnails = {}
+        original_filename = image_path.name
+        original_size = img.size
+        previous = img
+        
+        for size_name in _THUMBNAIL_CASCADE:
+            size_suffix = size_name[0]  # s, m, l
+            thumbnail_filename = generate_thumbnail_filename(original_filename, size_suffix)
+            thumbnail_path = output_dir / thumbnail_filename
+            dimensions = THUMBNAIL_SIZES[size_name]
             
-            for size_name, dimensions in THUMBNAIL_SIZES.items():
-                size_suffix = size_name[0]  # s, m, l
-                thumbnail_filename = generate_thumbnail_filename(original_filename, size_suffix)
-                thumbnail_path = output_dir / thumbnail_filename
+            if dimensions is None:
+                # 大サイズ: 原寸でJPG高画質圧縮（RGB画像はそのまま保存）
+                thumbnail = _create_large_thumbnail(img)
+                _write_atomically(thumbnail_path, lambda path: thumbnail.save(path, 'JPEG', optimize=True, quality=90))
+                _save_alternatives(thumbnail, thumbnail_path, False)
+                if not is_lossless:
+                    previous = thumbnail
+                # 以降は縮小済みの画像だけを参照し、原寸の画像を解放する
+                img = thumbnail = None
+            else:
+                # 小・中サイズ: 直前のサイズから縮小
+                width, height = dimensions
+                thumbnail = _create_thumbnail(previous, width, height)
                 
-                if size_name == 'large':
-                    # 大サイズ: 原寸でJPG高画質圧縮
-                    thumbnail = _create_large_thumbnail(img)
-                    thumbnail.save(thumbnail_path, 'JPEG', optimize=True, quality=90)
+                # 元の形式を保持して保存
+                if is_lossless:
+                    _write_atomically(thumbnail_path, lambda path: thumbnail.save(path, 'PNG', optimize=True))
                 else:
-                    # 小・中サイズ: リサイズ
-                    width, height = dimensions
-                    thumbnail = _create_thumbnail(img, width, height)
-                    
-                    # 元の形式を保持して保存
-                    if img.format == 'PNG' or 'transparency' in img.info:
-                        thumbnail.save(thumbnail_path, 'PNG', optimize=True)
-                    else:
-                        thumbnail.save(thumbnail_path, 'JPEG', optimize=True, quality=85)
-                
-                thumbnails[size_name] = thumbnail_filename
+                    _write_atomically(thumbnail_path, lambda path: thumbnail.save(path, 'JPEG', optimize=True, quality=85))
+                _save_alternatives(thumbnail, thumbnail_path, is_lossless)
+                previous = thumbnail
             
-            return thumbnails
+            thumbnails[size_name] = thumbnail_filename
+        
+        # 最小サイズから主要色とBlurHashを計算
+        return thumbnails, describe_image(previous, original_size)
     
     except Exception as e:
         raise Exception(f"Failed to create thumbnails for {image_path}: {str(e)}")
 
 
-def _fix_image_orientation(img: Image.Image) -> Image.Image:
-    """EXIF情報に基づいて画像の向きを修正"""
+def describe_image(img: Image.Image, size: Tuple[int, int]) -> ImageMetadata:
+    """
+    画像のメタデータを作成
+    
+    Args:
+        img: 向き補正済みの画像（縮小済みでよい）
+        size: 向き補正後の元画像の幅・高さ
+    """
+    if img.width > _METADATA_SAMPLE_SIZE or img.height > _METADATA_SAMPLE_SIZE:
+        img = _create_thumbnail(img, _METADATA_SAMPLE_SIZE, _METADATA_SAMPLE_SIZE)
+    width, height = size
+    return ImageMetadata(width, height, dominant_color(img), encode_blurhash(img))
+
+
+def read_image_metadata(image_path: Path) -> ImageMetadata:
+    """既存の画像ファイルからメタデータを作成（JPEGは縮小デコード）"""
+    with Image.open(image_path) as source:
+        width, height = source.size
+        if source.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS:
+            width, height = height, width
+        img = _load_oriented(source, (_METADATA_SAMPLE_SIZE, _METADATA_SAMPLE_SIZE))
+        return describe_image(img, (width, height))
+
+
+def _save_alternatives(thumbnail: Image.Image, thumbnail_path: Path, is_lossless: bool) -> None:
+    """サムネイルのWebP/AVIF版を保存（元より小さくならなかったもの・保存に失敗したものは残さない）"""
+    base_size = thumbnail_path.stat().st_size
+    for extension in get_alternative_extensions():
+        alternative_path = thumbnail_path.with_name(generate_alternative_filename(thumbnail_path.name, extension))
+        temp_path = _temp_path(alternative_path)
+        try:
+            _save_image(thumbnail, temp_path, extension, is_lossless)
+            if temp_path.stat().st_size < base_size:
+                os.replace(temp_path, alternative_path)
+                continue
+        except Exception:
+            # エンコードに失敗した形式は省く（元の形式のサムネイルと他の形式は利用できる）
+            pass
+        finally:
+            temp_path.unlink(missing_ok=True)
+        # 再生成で小さくならなくなった・失敗した場合は以前の版を残さない
+        alternative_path.unlink(missing_ok=True)
+
+
+def _temp_path(path: Path) -> Path:
+    """pathと同じディレクトリの一時ファイル名（ドットで始まるため配信・突き合わせの対象外）"""
+    return path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+
+def _write_atomically(path: Path, write: Callable[[Path], None]) -> None:
+    """一時ファイルに書き込んでから置き換える（書き込み途中のファイルが配信されないように）"""
+    temp_path = _temp_path(path)
+    try:
+        write(temp_path)
+        os.replace(temp_path, path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+def _save_image(img: Image.Image, path: Path, extension: str, is_lossless: bool = False) -> None:
+    """拡張子に応じた形式・画質で保存"""
+    image_format = _SAVE_FORMATS[extension]
+    if image_format == 'JPEG':
+        _create_large_thumbnail(img).save(path, 'JPEG', optimize=True, quality=85)
+        return
+    
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        img = img.convert('RGBA')
+    if image_format == 'PNG':
+        img.save(path, 'PNG', optimize=True)
+    elif image_format == 'WEBP':
+        if img.mode == 'P':
+            img = img.convert('RGBA')
+        # 透過画像（PNG由来）はロスレス、それ以外は写真向けの画質
+        if is_lossless:
+            img.save(path, 'WEBP', lossless=True, method=4)
+        else:
+            img.save(path, 'WEBP', quality=80, method=4)
+    else:
+        if img.mode in ('P', 'LA', 'L'):
+            img = img.convert('RGBA')
+        img.save(path, image_format, quality=60)
+
+
+def get_variant_format(original_filename: str) -> Tuple[str, str]:
+    """リサイズ画像の保存形式と拡張子を取得（透過を持ちうる形式は保持、それ以外はJPG）"""
+    return _VARIANT_FORMATS.get(Path(original_filename).suffix.lower(), ('JPEG', '.jpg'))
+
+
+def render_variant(image_path: Path, output_path: Path, width: int, height: int, fit: str) -> int:
+    """
+    元画像から指定サイズの画像を生成（拡大はしない）
+    
+    Args:
+        image_path: 元画像のパス
+        output_path: 保存先のパス（拡張子で保存形式を決定、一時ファイルに書き込んでから置き換える）
+        width: 幅の上限（0は指定なし）
+        height: 高さの上限（0は指定なし）
+        fit: 'contain' または 'cover'
+    
+    Returns:
+        生成したファイルのサイズ（バイト）
+    """
+    if fit not in VARIANT_FITS:
+        raise ValueError(f"Unsupported fit: {fit}")
+    
+    if output_path.suffix not in _SAVE_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_path.suffix}")
+    
+    original_format, _ = get_variant_format(image_path.name)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = _temp_path(output_path)
+    
     try:
-        from PIL.ExifTags import ORIENTATION
+        with Image.open(image_path) as source:
+            # JPEGは必要な大きさ以上を保つ範囲で1/2〜1/8に縮小してデコード
+            img = _load_oriented(source, (width or 1, height or 1))
+            original_width, original_height = img.size
+            
+            if fit == 'cover' and width and height:
+                # 元画像より大きい枠は同じ比率のまま元画像に収まるよう縮める
+                scale = min(1.0, original_width / width, original_height / height)
+                size = (max(1, round(width * scale)), max(1, round(height * scale)))
+                variant = ImageOps.fit(img, size, Image.Resampling.LANCZOS)
+            else:
+                variant = _create_thumbnail(img, width or original_width, height or original_height)
+            
+            _save_image(variant, temp_path, output_path.suffix, is_lossless=original_format == 'PNG')
         
-        if hasattr(img, '_getexif'):
-            exif = img._getexif()
-            if exif is not None:
-                orientation = exif.get(ORIENTATION)
-                if orientation == 3:
-                    img = img.rotate(180, expand=True)
-                elif orientation == 6:
-                    img = img.rotate(270, expand=True)
-                elif orientation == 8:
-                    img = img.rotate(90, expand=True)
+        os.replace(temp_path, output_path)
+    except Exception:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    
+    return output_path.stat().st_size
+
+
+def _load_oriented(img: Image.Image, draft_size: Optional[Tuple[int, int]] = None) -> Image.Image:
+    """
+    画像をデコードしてEXIFの向きを補正（1回のtransposeのみ）
+    
+    draft_sizeを指定するとJPEGはその大きさを下回らない範囲で縮小デコードする。
+    """
+    if draft_size is not None and img.format == 'JPEG':
+        width, height = draft_size
+        if img.getexif().get(ExifTags.Base.Orientation) in _TRANSPOSED_ORIENTATIONS:
+            # 補正前の画像に対する大きさに変換
+            width, height = height, width
+        img.draft('RGB', (width, height))
+    
+    img.load()
+    try:
+        # 補正不要な場合は複製を作らない
+        ImageOps.exif_transpose(img, in_place=True)
     except Exception:
         # EXIF処理でエラーが発生した場合は元画像をそのまま使用
         pass
-    
     return img
 
 
 def _create_thumbnail(img: Image.Image, width: int, height: int) -> Image.Image:
-    """アスペクト比を保持してサムネイル作成"""
+    """アスペクト比を保持してサムネイル作成（元画像は変更しない）"""
     # 元画像のサイズ
     original_width, original_height = img.size
     
     # 指定サイズより小さい場合はそのまま
     if original_width <= width and original_height <= height:
-        return img.copy()
+        return img
     
     # アスペクト比を保持してリサイズ
-    img_copy = img.copy()
-    img_copy.thumbnail((width, height), Image.Resampling.LANCZOS)
-    
-    return img_copy
+    scale = min(width / original_width, height / original_height)
+    size = (max(1, round(original_width * scale)), max(1, round(original_height * scale)))
+    # reducing_gapで先に整数倍の縮小（reduce）を行い、原寸の複製を作らずに縮小する
+    return img.resize(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
 
 
 def _create_large_thumbnail(img: Image.Image) -> Image.Image:
@@ -135,7 +391,8 @@ def _create_large_thumbnail(img: Image.Image) -> Image.Image:
     elif img.mode != 'RGB':
         return img.convert('RGB')
     else:
-        return img.copy()
+        # 保存するだけなので複製しない
+        return img
 
 
 def get_thumbnail_path(original_filename: str, size: str, base_dir: Path) -> Optional[Path]:
@@ -165,10 +422,14 @@ def cleanup_thumbnails(original_filename: str, base_dir: Path) -> None:
     for size_name in THUMBNAIL_SIZES.keys():
         size_suffix = size_name[0]
         thumbnail_filename = generate_thumbnail_filename(original_filename, size_suffix)
-        thumbnail_path = base_dir / thumbnail_filename
+        paths = [base_dir / thumbnail_filename] + [
+            base_dir / generate_alternative_filename(thumbnail_filename, extension)
+            for extension in ALTERNATIVE_FORMATS
+        ]
         
-        if thumbnail_path.exists():
-            try:
-                thumbnail_path.unlink()
-            except Exception:
-                pass  # 削除に失敗しても継続
\ No newline at end of file
+        for thumbnail_path in paths:
+            if thumbnail_path.exists():
+                try:
+                    thumbnail_path.unlink()
+                except Exception:
+                    pass  # 削除に失敗しても継続
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Keyset (cursor) pagination utilities."""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Callable, List, Optional, Tuple
+
+from sqlalchemy import and_, or_
+
+DEFAULT_PAGE_LIMIT = 20
+MAX_PAGE_LIMIT = 100
+
+
+def encode_cursor(created_at: datetime, item_id: int) -> str:
+    """Encode a (created_at, id) position as an opaque cursor string."""
+    raw = json.dumps([created_at.isoformat(), item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Decode an opaque cursor string into a (created_at, id) position."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, item_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(created_at), int(item_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_paginate(
+    query,
+    created_column,
+    id_column,
+    limit: int,
+    cursor: Optional[str],
+    key: Callable[[Any], Tuple[datetime, int]],
+    fetch: Optional[Callable[[Any], List[Any]]] = None
+) -> Tuple[List[Any], Optional[str]]:
+    """
+    Fetch one page ordered by (created_at DESC, id DESC) starting after cursor.
+
+    Args:
+        query: SQLAlchemy query or Core select to paginate (must not be ordered yet)
+        created_column: created_at column used as the primary sort key
+        id_column: id column used as the tie-breaker
+        limit: maximum number of rows to return
+        cursor: opaque cursor returned by a previous page, or None
+        key: function returning (created_at, id) for a fetched row
+        fetch: function executing the final statement and returning its rows
+            (required for Core selects; ORM queries default to .all())
+
+    Returns:
+        (rows, next_cursor) - next_cursor is None on the last page
+    """
+    if cursor:
+        created_at, item_id = decode_cursor(cursor)
+        query = query.filter(
+            or_(
+                created_column < created_at,
+                and_(created_column == created_at, id_column < item_id)
+            )
+        )
+
+    # 1件多く取得して次ページの有無を判定
+    query = query.order_by(created_column.desc(), id_column.desc()).limit(limit + 1)
+    rows = fetch(query) if fetch else query.all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+
+    return rows, next_cursor
@@ -0,0 +1,113 @@
+"""Image placeholder utilities (dominant color and BlurHash)."""
+import math
+from typing import List, Tuple
+
+from PIL import Image
+
+# BlurHashの計算に使う縮小画像の一辺（px）
+_SAMPLE_SIZE = 32
+
+_BASE83_CHARACTERS = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def dominant_color(img: Image.Image) -> str:
+    """Return the most common color of an image as "#rrggbb"."""
+    sample = _flatten(img).resize((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.Resampling.BOX)
+    quantized = sample.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(quantized.getcolors())
+    palette = quantized.getpalette()
+    red, green, blue = palette[index * 3:index * 3 + 3]
+    return f"#{red:02x}{green:02x}{blue:02x}"
+
+
+def encode_blurhash(img: Image.Image, x_components: int = 4, y_components: int = 3) -> str:
+    """
+    Encode an image as a BlurHash string (https://blurha.sh).
+
+    The image is downscaled first, so the cost does not depend on its size.
+    With the default 4x3 components the result is 28 characters long.
+    """
+    if not (1 <= x_components <= 9 and 1 <= y_components <= 9):
+        raise ValueError("BlurHash components must be between 1 and 9")
+
+    sample = _flatten(img)
+    sample.thumbnail((_SAMPLE_SIZE, _SAMPLE_SIZE), Image.Resampling.BOX)
+    width, height = sample.size
+    pixels = [tuple(_srgb_to_linear(value) for value in pixel) for pixel in sample.getdata()]
+
+    factors: List[Tuple[float, float, float]] = []
+    for j in range(y_components):
+        cos_y = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            cos_x = [math.cos(math.pi * i * x / width) for x in range(width)]
+            normalisation = 1 if i == 0 and j == 0 else 2
+            red = green = blue = 0.0
+            for y in range(height):
+                row = y * width
+                for x in range(width):
+                    basis = cos_x[x] * cos_y[y]
+                    pixel = pixels[row + x]
+                    red += basis * pixel[0]
+                    green += basis * pixel[1]
+                    blue += basis * pixel[2]
+            scale = normalisation / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((x_components - 1) + (y_components - 1) * 9, 1)
+
+    if ac:
+        actual_max = max(abs(value) for factor in ac for value in factor)
+        quantised_max = max(0, min(82, math.floor(actual_max * 166 - 0.5)))
+        max_value = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        max_value = 1.0
+        result += _encode83(0, 1)
+
+    result += _encode83(_encode_dc(dc), 4)
+    for factor in ac:
+        result += _encode83(_encode_ac(factor, max_value), 2)
+    return result
+
+
+def _flatten(img: Image.Image) -> Image.Image:
+    """Convert to RGB, compositing transparency over white."""
+    if img.mode in ('RGBA', 'LA', 'P'):
+        img = img.convert('RGBA')
+        background = Image.new('RGB', img.size, (255, 255, 255))
+        background.paste(img, mask=img.split()[-1])
+        return background
+    return img.convert('RGB') if img.mode != 'RGB' else img
+
+
+def _srgb_to_linear(value: int) -> float:
+    value = value / 255
+    return value / 12.92 if value <= 0.04045 else ((value + 0.055) / 1.055) ** 2.4
+
+
+def _linear_to_srgb(value: float) -> int:
+    value = max(0.0, min(1.0, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _encode_dc(factor: Tuple[float, float, float]) -> int:
+    red, green, blue = (_linear_to_srgb(value) for value in factor)
+    return (red << 16) + (green << 8) + blue
+
+
+def _encode_ac(factor: Tuple[float, float, float], max_value: float) -> int:
+    def quantise(value: float) -> int:
+        return max(0, min(18, math.floor(math.copysign(abs(value / max_value) ** 0.5, value) * 9 + 9.5)))
+
+    red, green, blue = (quantise(value) for value in factor)
+    return red * 19 * 19 + green * 19 + blue
+
+
+def _encode83(value: int, length: int) -> str:
+    return "".join(
+        _BASE83_CHARACTERS[(value // 83 ** (length - index)) % 83]
+        for index in range(1, length + 1)
+    )
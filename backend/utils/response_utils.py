@@ -1,6 +1,8 @@
 """Response handling utilities."""
-from typing import Dict, Any, List, Optional
-from fastapi import HTTPException
+from typing import Dict, Any, List, Mapping, Optional
+
+import orjson
+from fastapi import HTTPException, Response
 
 
 def create_error_response(status_code: int, message: str, details: Optional[str] = None) -> HTTPException:
@@ -31,4 +33,14 @@ def paginate_results(items: List[Any], page: int = 1, per_page: int = 10) -> Dic
         "per_page": per_page,
         "total": total,
         "pages": (total + per_page - 1) // per_page
-    }
\ No newline at end of file
+    }
+
+
+def dump_json(payload: Any) -> bytes:
+    """Encode plain dicts/lists (datetimes included) to JSON bytes with orjson."""
+    return orjson.dumps(payload)
+
+
+def json_bytes_response(body: bytes, headers: Optional[Mapping[str, str]] = None) -> Response:
+    """Return pre-encoded JSON bytes as-is, skipping response_model validation and re-encoding."""
+    return Response(content=body, media_type="application/json", headers=dict(headers) if headers else None)
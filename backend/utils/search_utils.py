@@ -0,0 +1,55 @@
+"""Pure-Python n-gram search index (fallback when MySQL FULLTEXT is unavailable)."""
+import math
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Tuple
+
+# MySQLのngram_token_sizeのデフォルト値に合わせる
+NGRAM_SIZE = 2
+# タイトル一致の重み
+TITLE_WEIGHT = 2.0
+
+
+def normalize_text(text: str) -> str:
+    """NFKC normalize, lowercase and collapse whitespace."""
+    return " ".join(unicodedata.normalize("NFKC", text or "").lower().split())
+
+
+def ngrams(text: str, n: int = NGRAM_SIZE) -> List[str]:
+    """Split text into character n-grams per whitespace-separated token."""
+    grams = []
+    for token in normalize_text(text).split(" "):
+        if not token:
+            continue
+        if len(token) <= n:
+            grams.append(token)
+        else:
+            grams.extend(token[i:i + n] for i in range(len(token) - n + 1))
+    return grams
+
+
+class NgramSearchIndex:
+    """In-memory inverted index over (id, title, content) documents."""
+
+    def __init__(self, documents: Iterable[Tuple[int, str, str]]):
+        self._postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self._document_count = 0
+        for doc_id, title, content in documents:
+            self._document_count += 1
+            weights = Counter(ngrams(content))
+            for gram, count in Counter(ngrams(title)).items():
+                weights[gram] += count * TITLE_WEIGHT
+            for gram, weight in weights.items():
+                self._postings[gram][doc_id] = weight
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """Return (id, score) pairs ordered by descending relevance."""
+        scores: Dict[int, float] = defaultdict(float)
+        for gram in set(ngrams(query)):
+            postings = self._postings.get(gram)
+            if not postings:
+                continue
+            idf = math.log(1 + self._document_count / len(postings))
+            for doc_id, weight in postings.items():
+                scores[doc_id] += (1 + math.log(weight)) * idf
+        return sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
@@ -0,0 +1,51 @@
+"""Text processing utilities for content summaries."""
+import re
+
+# 一覧表示用の抜粋の最大文字数
+EXCERPT_LENGTH = 200
+
+_CODE_BLOCK_RE = re.compile(r"```.*?```", re.DOTALL)
+_INLINE_CODE_RE = re.compile(r"`([^`]*)`")
+_IMAGE_RE = re.compile(r"!\[([^\]]*)\]\([^)]*\)")
+_LINK_RE = re.compile(r"\[([^\]]*)\]\([^)]*\)")
+_HTML_TAG_RE = re.compile(r"<[^>]+>")
+_LINE_PREFIX_RE = re.compile(r"^\s{0,3}(?:#{1,6}\s+|>\s?|[-*+]\s+|\d+\.\s+)", re.MULTILINE)
+# 対になった強調記号のみ外す（snake_case や 2*3 の記号は残す、"_"は単語の途中では強調にならない）
+_EMPHASIS_RES = (
+    re.compile(r"(\*\*|~~)(?=\S)(?P<text>.+?)(?<=\S)\1"),
+    re.compile(r"(?<!\w)__(?=\S)(?P<text>.+?)(?<=\S)__(?!\w)"),
+    re.compile(r"\*(?=\S)(?P<text>.+?)(?<=\S)\*"),
+    re.compile(r"(?<!\w)_(?=\S)(?P<text>.+?)(?<=\S)_(?!\w)"),
+)
+_WHITESPACE_RE = re.compile(r"\s+")
+
+_LATIN_WORD_RE = re.compile(r"[A-Za-z0-9]+(?:['’\-][A-Za-z0-9]+)*")
+# ひらがな・カタカナ・漢字は1文字を1語として数える
+_CJK_CHAR_RE = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff66-\uff9f]")
+
+
+def strip_markdown(markdown: str) -> str:
+    """Convert markdown to plain text on a single line."""
+    text = _CODE_BLOCK_RE.sub(" ", markdown)
+    text = _INLINE_CODE_RE.sub(r"\1", text)
+    text = _IMAGE_RE.sub(r"\1", text)
+    text = _LINK_RE.sub(r"\1", text)
+    text = _HTML_TAG_RE.sub(" ", text)
+    text = _LINE_PREFIX_RE.sub("", text)
+    for pattern in _EMPHASIS_RES:
+        text = pattern.sub(r"\g<text>", text)
+    return _WHITESPACE_RE.sub(" ", text).strip()
+
+
+def make_excerpt(markdown: str, max_length: int = EXCERPT_LENGTH) -> str:
+    """Build a plain-text excerpt of at most max_length characters."""
+    text = strip_markdown(markdown or "")
+    if len(text) <= max_length:
+        return text
+    return text[:max_length - 1].rstrip() + "…"
+
+
+def count_words(markdown: str) -> int:
+    """Count words, treating each Japanese/CJK character as one word."""
+    text = strip_markdown(markdown or "")
+    return len(_LATIN_WORD_RE.findall(text)) + len(_CJK_CHAR_RE.findall(text))